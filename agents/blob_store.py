@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from core.config import settings
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+THREAD_INDEX_DIR = "_threads"
+
+
+class BlobStore:
+    """
+    콘텐츠 주소 기반(content-addressed) 블롭 저장소.
+
+    단계별 ReAct 대화 기록처럼 크기가 큰 데이터를 그래프 상태 밖에 보관하고,
+    상태에는 sha256 기반 id만 남기기 위해 사용합니다. 같은 내용은 같은 id를 가지므로
+    재시도나 중복 저장 시에도 한 번만 저장됩니다.
+
+    메모리에는 최근에 쓰거나 읽은 블롭만 LRU로 캐시합니다. 디렉터리를 쓰는 경우 블롭을
+    저장한 스레드(thread_id)별 인덱스 파일을 남기고, 체크포인트 보존 정책이 스레드를
+    지우면 collect_garbage가 더 이상 참조되지 않는 블롭 파일을 지웁니다.
+
+    Args:
+        directory: 블롭을 파일로 보관할 디렉터리. None이면 메모리에만 보관하며
+            cache_max_items를 넘는 오래된 블롭은 사라집니다.
+        cache_max_items: 메모리 LRU 캐시 크기. 기본값은 SEARCH_BLOB_CACHE_MAX_ITEMS.
+    """
+
+    def __init__(
+        self, directory: Optional[str] = None, cache_max_items: Optional[int] = None
+    ):
+        self.directory = directory
+        self.cache_max_items = (
+            cache_max_items
+            if cache_max_items is not None
+            else settings.search_blob_cache_max_items
+        )
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(os.path.join(directory, THREAD_INDEX_DIR), exist_ok=True)
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        if isinstance(value, str):
+            return value.encode("utf-8")
+        return json.dumps(
+            value, ensure_ascii=False, separators=(",", ":"), default=str
+        ).encode("utf-8")
+
+    def _path(self, blob_id: str) -> str:
+        return os.path.join(self.directory, blob_id[:2], blob_id)
+
+    def _thread_index_path(self, thread_id: str) -> str:
+        # thread_id에는 파일 이름에 쓸 수 없는 문자가 들어갈 수 있어 해시로 바꿉니다.
+        name = hashlib.sha256(thread_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, THREAD_INDEX_DIR, name)
+
+    def _cache(self, blob_id: str, data: bytes) -> None:
+        with self._lock:
+            self._blobs[blob_id] = data
+            self._blobs.move_to_end(blob_id)
+            while len(self._blobs) > max(self.cache_max_items, 1):
+                self._blobs.popitem(last=False)
+
+    def put(self, value: Any, thread_id: Optional[str] = None) -> str:
+        """
+        블롭을 저장하고 id를 반환합니다. thread_id를 넘기면 그 스레드가 지워질 때까지
+        블롭 파일이 보존됩니다.
+        """
+        data = self._encode(value)
+        blob_id = hashlib.sha256(data).hexdigest()
+        self._cache(blob_id, data)
+        if not self.directory:
+            return blob_id
+        path = self._path(blob_id)
+        if os.path.exists(path):
+            # GC 유예 시간이 새로 쓴 시각부터 다시 계산되도록 합니다.
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp_path, path)
+        if thread_id:
+            with open(self._thread_index_path(thread_id), "a") as fp:
+                fp.write(f"{blob_id}\n")
+        return blob_id
+
+    def get_bytes(self, blob_id: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._blobs.get(blob_id)
+            if data is not None:
+                self._blobs.move_to_end(blob_id)
+                return data
+        if self.directory:
+            path = self._path(blob_id)
+            if os.path.exists(path):
+                with open(path, "rb") as fp:
+                    data = fp.read()
+                self._cache(blob_id, data)
+        return data
+
+    def get_text(self, blob_id: str) -> Optional[str]:
+        data = self.get_bytes(blob_id)
+        return data.decode("utf-8") if data is not None else None
+
+    def get_json(self, blob_id: str) -> Any:
+        data = self.get_bytes(blob_id)
+        return json.loads(data) if data is not None else None
+
+    def collect_garbage(
+        self, live_thread_ids: Iterable[str], grace_seconds: Optional[float] = None
+    ) -> Dict[str, int]:
+        """
+        살아 있는 스레드가 참조하지 않는 블롭 파일과 지워진 스레드의 인덱스를 삭제합니다.
+
+        grace_seconds 안에 쓰인 인덱스와 블롭은 남겨 두어, 아직 체크포인트 레지스트리에
+        반영되지 않은 실행 중인 스레드(다른 워커 프로세스 포함)의 블롭을 보호합니다.
+        디렉터리 I/O를 하므로 이벤트 루프에서는 asyncio.to_thread로 호출하세요.
+        """
+        if not self.directory:
+            return {"deleted_blobs": 0, "deleted_threads": 0}
+        grace = (
+            grace_seconds
+            if grace_seconds is not None
+            else settings.search_blob_gc_grace_seconds
+        )
+        cutoff = time.time() - grace
+        live_indexes = {
+            os.path.basename(self._thread_index_path(thread_id))
+            for thread_id in live_thread_ids
+        }
+
+        index_dir = os.path.join(self.directory, THREAD_INDEX_DIR)
+        referenced = set()
+        deleted_threads = 0
+        for entry in os.scandir(index_dir):
+            if entry.name in live_indexes or entry.stat().st_mtime >= cutoff:
+                with open(entry.path) as fp:
+                    referenced.update(line.strip() for line in fp if line.strip())
+            else:
+                os.remove(entry.path)
+                deleted_threads += 1
+
+        deleted_blobs = 0
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir() or prefix.name == THREAD_INDEX_DIR:
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name in referenced or entry.stat().st_mtime >= cutoff:
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                deleted_blobs += 1
+                with self._lock:
+                    self._blobs.pop(entry.name, None)
+
+        if deleted_blobs or deleted_threads:
+            logger.info(
+                "블롭 GC: 스레드 인덱스 %d개, 블롭 %d개 삭제",
+                deleted_threads,
+                deleted_blobs,
+            )
+        return {"deleted_blobs": deleted_blobs, "deleted_threads": deleted_threads}
+
+    def __contains__(self, blob_id: str) -> bool:
+        return self.get_bytes(blob_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._blobs)
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Dict, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from core.config import settings
+
+USAGE_KEYS = ("tool_calls", "llm_iterations", "input_tokens", "output_tokens")
+
+
+@dataclass
+class Budget:
+    """도구 호출, LLM 반복, 토큰, 경과 시간 한도. 0 이하는 무제한을 뜻합니다."""
+
+    max_tool_calls: int = 0
+    max_llm_iterations: int = 0
+    max_input_tokens: int = 0
+    max_output_tokens: int = 0
+    deadline_seconds: float = 0
+
+    def limits(self) -> Dict[str, float]:
+        return {
+            "tool_calls": self.max_tool_calls,
+            "llm_iterations": self.max_llm_iterations,
+            "input_tokens": self.max_input_tokens,
+            "output_tokens": self.max_output_tokens,
+        }
+
+    def exceeded(self, usage: Dict[str, int]) -> Optional[str]:
+        for key, limit in self.limits().items():
+            if limit <= 0:
+                continue
+            used = usage.get(key, 0)
+            # 도구 호출은 요청 시점에 세므로 한도를 "넘는" 요청부터 막고,
+            # 나머지는 한도에 닿으면 다음 LLM 호출을 하지 않습니다.
+            if used > limit if key == "tool_calls" else used >= limit:
+                return f"max_{key}"
+        return None
+
+    def with_overrides(self, overrides: Optional[Dict]) -> "Budget":
+        if not overrides:
+            return self
+        known = {k: v for k, v in overrides.items() if k in asdict(self)}
+        return replace(self, **known)
+
+
+def default_step_budget() -> Budget:
+    return Budget(
+        max_tool_calls=settings.step_max_tool_calls,
+        max_llm_iterations=settings.step_max_llm_iterations,
+        max_input_tokens=settings.step_max_input_tokens,
+        max_output_tokens=settings.step_max_output_tokens,
+        deadline_seconds=settings.step_deadline_seconds,
+    )
+
+
+def default_run_budget() -> Budget:
+    return Budget(
+        max_tool_calls=settings.run_max_tool_calls,
+        max_llm_iterations=settings.run_max_llm_iterations,
+        max_input_tokens=settings.run_max_input_tokens,
+        max_output_tokens=settings.run_max_output_tokens,
+        deadline_seconds=settings.run_deadline_seconds,
+    )
+
+
+def merge_budget_usage(
+    left: Optional[Dict[str, int]], right: Optional[Dict[str, int]]
+) -> Dict[str, int]:
+    """실행 전체 사용량 리듀서. 노드가 반환한 사용량을 더하고, None이면 초기화합니다."""
+    if right is None:
+        return {}
+    merged = dict(left or {})
+    for key, value in right.items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+@dataclass
+class BudgetTracker:
+    """
+    단계 하나의 ReAct 실행 중 사용량을 집계합니다.
+
+    단계 한도와 실행 전체의 남은 한도를 함께 보고, 먼저 닿는 쪽에서 중단 사유를 돌려줍니다.
+    """
+
+    step_budget: Budget
+    run_budget: Budget
+    run_usage: Dict[str, int] = field(default_factory=dict)
+    run_deadline: Optional[float] = None
+    # 클라이언트 연결 종료 등으로 실행을 멈출 때 set 되는 이벤트
+    stop_event: Optional[asyncio.Event] = None
+    started_at: float = field(default_factory=time.monotonic)
+    usage: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(USAGE_KEYS, 0))
+    _seen: int = 0
+
+    def observe(self, messages) -> None:
+        """ReAct 에이전트 상태의 messages 중 아직 보지 않은 메시지만 집계합니다."""
+        for message in messages[self._seen :]:
+            self._observe_one(message)
+        self._seen = len(messages)
+
+    def _observe_one(self, message: BaseMessage) -> None:
+        if isinstance(message, AIMessage):
+            self.usage["llm_iterations"] += 1
+            usage_metadata = getattr(message, "usage_metadata", None) or {}
+            self.usage["input_tokens"] += usage_metadata.get("input_tokens", 0)
+            self.usage["output_tokens"] += usage_metadata.get("output_tokens", 0)
+            # 요청된 도구 호출을 미리 세어, 한도를 넘는 호출은 실행되기 전에 끊습니다.
+            self.usage["tool_calls"] += len(message.tool_calls or [])
+
+    def exhausted(self) -> Optional[str]:
+        if self.stop_event is not None and self.stop_event.is_set():
+            return "run:cancelled"
+        reason = self.step_budget.exceeded(self.usage)
+        if reason:
+            return f"step:{reason}"
+        combined = {
+            key: self.run_usage.get(key, 0) + self.usage[key] for key in USAGE_KEYS
+        }
+        reason = self.run_budget.exceeded(combined)
+        if reason:
+            return f"run:{reason}"
+        return None
+
+    def remaining_seconds(self) -> Optional[float]:
+        candidates = []
+        if self.step_budget.deadline_seconds > 0:
+            candidates.append(
+                self.step_budget.deadline_seconds
+                - (time.monotonic() - self.started_at)
+            )
+        if self.run_deadline is not None:
+            candidates.append(self.run_deadline - time.time())
+        return max(0.0, min(candidates)) if candidates else None
+
+    def report(self, exhausted: Optional[str]) -> Dict:
+        return {
+            "usage": dict(self.usage),
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 3),
+            "exhausted": exhausted,
+        }
+
+
+def budgets_from_config(config: Optional[Dict]) -> Tuple[Budget, Budget]:
+    """
+    실행 config의 configurable.budget({"step": {...}, "run": {...}})으로 기본 예산을 덮어써
+    (단계 예산, 실행 예산)을 반환합니다.
+    """
+    overrides = ((config or {}).get("configurable") or {}).get("budget") or {}
+    return (
+        default_step_budget().with_overrides(overrides.get("step")),
+        default_run_budget().with_overrides(overrides.get("run")),
+    )
+
+
+def run_deadline_from_config(config: Optional[Dict]) -> Optional[float]:
+    return ((config or {}).get("configurable") or {}).get("run_deadline")
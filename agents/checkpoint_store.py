@@ -0,0 +1,342 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from agents.blob_store import BlobStore
+from core.config import settings
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# contents_research.db 연결에 적용할 PRAGMA. WAL + synchronous=NORMAL 조합은
+# 커밋마다 fsync 하지 않으면서도 프로세스 크래시에 대해 안전합니다.
+SQLITE_PRAGMAS = (
+    # auto_vacuum은 테이블이 만들어지기 전(새 DB)에만 바로 적용됩니다.
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+    "PRAGMA wal_autocheckpoint=1000",
+    "PRAGMA journal_size_limit=67108864",
+)
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ManagedAsyncSqliteSaver(AsyncSqliteSaver):
+    """쓰기 지연 시간과 스레드별 마지막 쓰기 시각을 CheckpointStore에 기록하는 체크포인터."""
+
+    def __init__(self, conn: aiosqlite.Connection, store: "CheckpointStore"):
+        super().__init__(conn)
+        self.store = store
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        start = time.perf_counter()
+        result = await super().aput(config, checkpoint, metadata, new_versions)
+        self.store.record_write(
+            config["configurable"]["thread_id"], time.perf_counter() - start
+        )
+        return result
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = ""):
+        start = time.perf_counter()
+        await super().aput_writes(config, writes, task_id, task_path)
+        self.store.record_write(
+            config["configurable"]["thread_id"], time.perf_counter() - start
+        )
+
+
+class CheckpointStore:
+    """
+    SearchAgent 체크포인트 DB(contents_research.db) 관리 계층.
+
+    - 연결 시 WAL 및 튜닝된 PRAGMA 적용
+    - 스레드별 마지막 쓰기 시각을 기록해 나이/스레드 수 기준 보존 정책 적용
+    - 백그라운드에서 주기적으로 보존 정책, WAL 체크포인트, vacuum 수행
+    - 보존 정책으로 지운 스레드의 블롭을 BlobStore에서 회수
+
+    연결은 AsyncSqliteSaver와 공유하므로, 이 클래스가 직접 실행하는 쓰기는 모두
+    saver.lock을 잡고 실행해 체크포인터의 트랜잭션과 섞이지 않게 합니다.
+    - 관리자 엔드포인트용 DB 크기, 체크포인트 수, 쓰기 지연 통계 제공
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_age_seconds: Optional[float] = None,
+        max_threads: Optional[int] = None,
+        maintenance_interval_seconds: Optional[float] = None,
+        blob_store: Optional[BlobStore] = None,
+        extra_live_threads: Optional[Callable[[], Iterable[str]]] = None,
+    ):
+        self.db_path = db_path
+        self.max_age_seconds = (
+            max_age_seconds
+            if max_age_seconds is not None
+            else settings.checkpoint_max_age_hours * 3600
+        )
+        self.max_threads = (
+            max_threads if max_threads is not None else settings.checkpoint_max_threads
+        )
+        self.maintenance_interval_seconds = (
+            maintenance_interval_seconds
+            if maintenance_interval_seconds is not None
+            else settings.checkpoint_maintenance_interval_seconds
+        )
+        self.blob_store = blob_store
+        # 체크포인트 DB 밖에 있는 살아 있는 스레드 (메모리 체크포인트, 실행 중인 스레드)
+        self.extra_live_threads = extra_live_threads
+        self.conn: Optional[aiosqlite.Connection] = None
+        self.saver: Optional[ManagedAsyncSqliteSaver] = None
+        self._touched: Dict[str, float] = {}
+        self._write_latencies = deque(maxlen=1000)
+        self._write_count = 0
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._maintenance_lock = asyncio.Lock()
+        self.last_maintenance: Dict[str, Any] = {}
+
+    async def open(self) -> ManagedAsyncSqliteSaver:
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = await aiosqlite.connect(self.db_path)
+        for pragma in SQLITE_PRAGMAS:
+            await self.conn.execute(pragma)
+        self.saver = ManagedAsyncSqliteSaver(self.conn, self)
+        await self.saver.setup()
+        await self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoint_threads (
+                thread_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        await self.conn.commit()
+        logger.info(f"체크포인트 DB '{self.db_path}' 연결 완료 (WAL 모드).")
+        return self.saver
+
+    def start_maintenance(self, retention: bool = True) -> None:
+        """
+        주기적 유지보수를 시작합니다. 같은 DB를 여는 프로세스가 여럿이면(검색 워커)
+        보존 정책과 vacuum은 한 프로세스(API)만 실행하고, 나머지는 retention=False로
+        스레드별 마지막 쓰기 시각만 레지스트리에 반영합니다.
+        """
+        if self.maintenance_interval_seconds <= 0:
+            return
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.create_task(
+                self._maintenance_loop(retention)
+            )
+
+    async def close(self) -> None:
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+        if self.conn:
+            async with self.saver.lock:
+                await self._flush_touched()
+            await self.conn.close()
+            self.conn = None
+
+    def record_write(self, thread_id: str, seconds: float) -> None:
+        # 쓰기 경로에서는 메모리에만 기록하고, 레지스트리 반영은 유지보수 주기에 몰아서 합니다.
+        self._touched[thread_id] = time.time()
+        self._write_latencies.append(seconds)
+        self._write_count += 1
+
+    async def delete_thread(self, thread_id: str) -> None:
+        await self.saver.adelete_thread(thread_id)
+        self._touched.pop(thread_id, None)
+        async with self.saver.lock:
+            await self.conn.execute(
+                "DELETE FROM checkpoint_threads WHERE thread_id = ?", (thread_id,)
+            )
+            await self.conn.commit()
+
+    async def _flush_touched(self) -> None:
+        """saver.lock을 잡은 상태에서 호출해야 합니다."""
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, {}
+        await self.conn.executemany(
+            """
+            INSERT INTO checkpoint_threads (thread_id, updated_at) VALUES (?, ?)
+            ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at
+            """,
+            list(touched.items()),
+        )
+        await self.conn.commit()
+
+    async def _maintenance_loop(self, retention: bool) -> None:
+        while True:
+            await asyncio.sleep(self.maintenance_interval_seconds)
+            try:
+                if retention:
+                    await self.run_maintenance()
+                else:
+                    async with self.saver.lock:
+                        await self._flush_touched()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"체크포인트 DB 유지보수 중 오류: {e}", exc_info=True)
+
+    async def run_maintenance(self) -> Dict[str, Any]:
+        """보존 정책 적용 후 WAL을 정리하고 빈 페이지를 회수합니다."""
+        async with self._maintenance_lock:
+            start = time.perf_counter()
+            async with self.saver.lock:
+                deleted_threads = await self._apply_retention()
+                live_threads = await self._live_threads()
+            blob_gc = await self._collect_blobs(live_threads)
+
+            self.last_maintenance = {
+                "finished_at": time.time(),
+                "duration_seconds": time.perf_counter() - start,
+                "deleted_threads": deleted_threads,
+                "blob_gc": blob_gc,
+            }
+            logger.info(
+                "체크포인트 DB 유지보수 완료: 스레드 %d개 삭제, %.3fs",
+                deleted_threads,
+                self.last_maintenance["duration_seconds"],
+            )
+            return self.last_maintenance
+
+    async def _apply_retention(self) -> int:
+        """saver.lock을 잡은 상태에서 호출해야 합니다. 삭제한 스레드 수를 반환합니다."""
+        await self._flush_touched()
+        now = time.time()
+
+        # 레지스트리가 도입되기 전에 만들어진 스레드는 지금 시각으로 등록합니다.
+        await self.conn.execute(
+            """
+            INSERT OR IGNORE INTO checkpoint_threads (thread_id, updated_at)
+            SELECT DISTINCT thread_id, ? FROM checkpoints
+            """,
+            (now,),
+        )
+
+        expired = set()
+        if self.max_age_seconds > 0:
+            async with self.conn.execute(
+                "SELECT thread_id FROM checkpoint_threads WHERE updated_at < ?",
+                (now - self.max_age_seconds,),
+            ) as cursor:
+                expired.update(row[0] for row in await cursor.fetchall())
+        if self.max_threads > 0:
+            async with self.conn.execute(
+                """
+                SELECT thread_id FROM checkpoint_threads
+                ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                """,
+                (self.max_threads,),
+            ) as cursor:
+                expired.update(row[0] for row in await cursor.fetchall())
+
+        if expired:
+            rows = [(thread_id,) for thread_id in expired]
+            await self.conn.executemany(
+                "DELETE FROM checkpoints WHERE thread_id = ?", rows
+            )
+            await self.conn.executemany("DELETE FROM writes WHERE thread_id = ?", rows)
+            await self.conn.executemany(
+                "DELETE FROM checkpoint_threads WHERE thread_id = ?", rows
+            )
+        await self.conn.commit()
+
+        # VACUUM은 열린 트랜잭션 안에서 실행할 수 없으므로 위에서 커밋한 뒤에 실행합니다.
+        await self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        auto_vacuum = await self._pragma("auto_vacuum")
+        freelist_count = await self._pragma("freelist_count")
+        page_count = await self._pragma("page_count")
+        if auto_vacuum == 2:
+            await self.conn.execute("PRAGMA incremental_vacuum")
+        elif page_count and freelist_count / page_count > 0.2:
+            # auto_vacuum=NONE으로 만들어진 기존 DB는 VACUUM 한 번으로 INCREMENTAL로 전환됩니다.
+            await self.conn.execute("VACUUM")
+        await self.conn.commit()
+        return len(expired)
+
+    async def _live_threads(self) -> set:
+        """saver.lock을 잡은 상태에서 호출해야 합니다."""
+        async with self.conn.execute(
+            "SELECT thread_id FROM checkpoint_threads"
+        ) as cursor:
+            live = {row[0] for row in await cursor.fetchall()}
+        live.update(self._touched)
+        if self.extra_live_threads is not None:
+            live.update(self.extra_live_threads())
+        return live
+
+    async def _collect_blobs(self, live_threads: set) -> Optional[Dict[str, int]]:
+        """체크포인트가 남아 있는 스레드의 블롭만 남기고 나머지를 회수합니다."""
+        if self.blob_store is None:
+            return None
+        return await asyncio.to_thread(self.blob_store.collect_garbage, live_threads)
+
+    async def _pragma(self, name: str) -> Any:
+        async with self.conn.execute(f"PRAGMA {name}") as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def _count(self, query: str) -> int:
+        async with self.conn.execute(query) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def stats(self) -> Dict[str, Any]:
+        def file_size(path: str) -> int:
+            return os.path.getsize(path) if os.path.exists(path) else 0
+
+        latencies = list(self._write_latencies)
+        page_size = await self._pragma("page_size")
+        return {
+            "db_path": self.db_path,
+            "db_size_bytes": file_size(self.db_path),
+            "wal_size_bytes": file_size(f"{self.db_path}-wal"),
+            "page_count": await self._pragma("page_count"),
+            "freelist_bytes": await self._pragma("freelist_count") * page_size,
+            "journal_mode": await self._pragma("journal_mode"),
+            "thread_count": await self._count(
+                "SELECT COUNT(DISTINCT thread_id) FROM checkpoints"
+            ),
+            "checkpoint_count": await self._count("SELECT COUNT(*) FROM checkpoints"),
+            "pending_write_count": await self._count("SELECT COUNT(*) FROM writes"),
+            "retention": {
+                "max_age_seconds": self.max_age_seconds,
+                "max_threads": self.max_threads,
+                "maintenance_interval_seconds": self.maintenance_interval_seconds,
+            },
+            "write_latency_ms": {
+                "count": self._write_count,
+                "p50": _ms(_percentile(latencies, 0.5)),
+                "p95": _ms(_percentile(latencies, 0.95)),
+                "p99": _ms(_percentile(latencies, 0.99)),
+                "max": _ms(max(latencies) if latencies else None),
+            },
+            "last_maintenance": self.last_maintenance,
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 3) if seconds is not None else None
@@ -0,0 +1,222 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.client import MultiServerMCPClient
+
+from core.config import settings
+from core.logger import get_logger
+from core.tracing import tracer
+
+logger = get_logger(__name__)
+
+
+def default_mcp_servers() -> Dict[str, Dict]:
+    """SearchAgent가 사용하는 MCP 서버 연결 설정."""
+    return {
+        "firecrawl-mcp": {
+            "command": "npx",
+            "args": ["-y", "firecrawl-mcp"],
+            "env": {"FIRECRAWL_API_KEY": os.getenv("FIRECRAWL_API_KEY")},
+        },
+        "tavily-mcp": {
+            "command": "npx",
+            "args": ["-y", "tavily-mcp@0.1.2"],
+            "env": {"TAVILY_API_KEY": os.getenv("TAVILY_API_KEY")},
+        },
+    }
+
+
+class McpServer:
+    """
+    MCP 서버 하나의 연결을 유지합니다.
+
+    stdio 연결은 연 태스크에서 닫아야 하므로, 전용 태스크가 연결을 열고 close()가
+    호출되거나 서버 프로세스가 종료될 때까지 유지합니다.
+
+    서버 프로세스가 죽어도 연결 태스크가 바로 끝나지 않을 수 있으므로, 연결 태스크는
+    MCP_HEALTH_CHECK_INTERVAL_SECONDS마다 ping을 보내고, tools()도 마지막 응답 확인 후
+    그 시간이 지났으면 도구를 내주기 전에 ping을 보냅니다. 응답이 없으면 연결을 닫고
+    그 자리에서 다시 시작합니다.
+    """
+
+    def __init__(self, name: str, connection: Dict):
+        self.name = name
+        self.connection = connection
+        self._tools: List[BaseTool] = []
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+        self._session = None
+        self.last_error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.last_ping_at: Optional[float] = None
+        self.starts = 0
+        self.restarts = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self._task is not None and not self._task.done() and bool(self._tools)
+
+    async def _hold_connection(self) -> None:
+        interval = settings.mcp_health_check_interval_seconds
+        try:
+            async with MultiServerMCPClient({self.name: self.connection}) as client:
+                self._session = client.sessions[self.name]
+                self._tools = client.get_tools()
+                self.last_error = None
+                self.last_ping_at = time.time()
+                self._ready.set()
+                while True:
+                    try:
+                        await asyncio.wait_for(
+                            self._stop.wait(), interval if interval > 0 else None
+                        )
+                        return
+                    except asyncio.TimeoutError:
+                        pass
+                    if not await self._ping():
+                        return
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"MCP 서버 {self.name} 연결 오류: {e}", exc_info=True)
+        finally:
+            self._session = None
+            self._tools = []
+            self._ready.set()
+
+    async def _ping(self) -> bool:
+        """서버가 ping에 응답하면 True. 응답이 없으면 도구를 비워 unhealthy로 만듭니다."""
+        session = self._session
+        if session is None:
+            return False
+        try:
+            await asyncio.wait_for(
+                session.send_ping(), settings.mcp_ping_timeout_seconds
+            )
+        except Exception as e:
+            self.last_error = f"ping failed: {e!r}"
+            logger.warning("MCP 서버 %s가 ping에 응답하지 않습니다: %s", self.name, repr(e))
+            self._tools = []
+            return False
+        self.last_ping_at = time.time()
+        return True
+
+    def _ping_due(self) -> bool:
+        interval = settings.mcp_health_check_interval_seconds
+        return (
+            interval > 0
+            and self.last_ping_at is not None
+            and time.time() - self.last_ping_at > interval
+        )
+
+    async def tools(self) -> List[BaseTool]:
+        if self.healthy and not self._ping_due():
+            return self._tools
+        async with self._lock:
+            if self.healthy and (not self._ping_due() or await self._ping()):
+                return self._tools
+            if self._task is not None:
+                # 프로세스가 죽었거나 응답이 없거나 도구를 못 읽은 경우: 정리 후 다시 연결합니다.
+                if self.starts:
+                    self.restarts += 1
+                    logger.warning(
+                        "MCP 서버 %s 연결이 끊겼습니다 (%s). 다시 시작합니다.",
+                        self.name,
+                        self.last_error,
+                    )
+                await self._close_task()
+            with tracer.span("mcp.start", server=self.name) as start_span:
+                logger.info(f"MCP 서버 {self.name} 시작 중...")
+                self._ready = asyncio.Event()
+                self._stop = asyncio.Event()
+                self._task = asyncio.create_task(self._hold_connection())
+                self.starts += 1
+                try:
+                    await asyncio.wait_for(
+                        self._ready.wait(), settings.mcp_start_timeout_seconds
+                    )
+                except asyncio.TimeoutError:
+                    self.last_error = "start timeout"
+                    await self._close_task()
+                start_span.set_attribute("tools", len(self._tools))
+                if not self.healthy:
+                    raise RuntimeError(
+                        f"MCP server {self.name} is unavailable: {self.last_error}"
+                    )
+            self.started_at = time.time()
+            logger.info(f"MCP 서버 {self.name} 준비 완료: 도구 {len(self._tools)}개")
+            return self._tools
+
+    async def _close_task(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, 10)
+        except Exception:
+            self._task.cancel()
+        self._task = None
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._close_task()
+
+    def stats(self) -> Dict:
+        return {
+            "healthy": self.healthy,
+            "tools": [tool.name for tool in self._tools],
+            "starts": self.starts,
+            "restarts": self.restarts,
+            "started_at": self.started_at,
+            "last_ping_at": self.last_ping_at,
+            "last_error": self.last_error,
+        }
+
+
+class McpPool:
+    """
+    SearchAgent 단계들이 공유하는 MCP 서버 연결 풀.
+
+    단계마다 npx로 서버를 새로 띄우지 않고, 처음 필요할 때 연결한 서버를 프로세스 수명 동안
+    재사용합니다. 서버는 단계에 필요한 것만 시작됩니다.
+    """
+
+    def __init__(self, servers: Optional[Dict[str, Dict]] = None):
+        self.servers: Dict[str, McpServer] = {
+            name: McpServer(name, connection)
+            for name, connection in (servers or default_mcp_servers()).items()
+        }
+
+    async def tools(self, server_name: str) -> List[BaseTool]:
+        server = self.servers.get(server_name)
+        if server is None:
+            raise KeyError(f"Unknown MCP server: {server_name}")
+        return await server.tools()
+
+    async def all_tools(self) -> List[BaseTool]:
+        """연결 가능한 모든 서버의 도구. 시작에 실패한 서버는 건너뜁니다."""
+        results = await asyncio.gather(
+            *(server.tools() for server in self.servers.values()),
+            return_exceptions=True,
+        )
+        tools: List[BaseTool] = []
+        for name, result in zip(self.servers, results):
+            if isinstance(result, Exception):
+                logger.warning(f"MCP 서버 {name} 시작 실패: {result}")
+            else:
+                tools.extend(result)
+        return tools
+
+    async def start_all(self) -> None:
+        """모든 서버를 미리 띄웁니다. 실패한 서버는 첫 사용 시 다시 시도합니다."""
+        await self.all_tools()
+
+    async def close(self) -> None:
+        await asyncio.gather(*(server.close() for server in self.servers.values()))
+
+    def stats(self) -> Dict:
+        return {name: server.stats() for name, server in self.servers.items()}
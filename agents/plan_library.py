@@ -0,0 +1,323 @@
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from core.config import settings
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 요청 형태(signature)를 만들 때 쓰는 키워드. 영어/한국어 요청을 모두 고려합니다.
+MEDIA_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "music": (
+        "music",
+        "song",
+        "track",
+        "playlist",
+        "album",
+        "노래",
+        "음악",
+        "곡",
+        "플레이리스트",
+        "앨범",
+    ),
+    "image": (
+        "image",
+        "photo",
+        "picture",
+        "illustration",
+        "이미지",
+        "사진",
+        "그림",
+        "일러스트",
+    ),
+    "video": ("video", "film", "movie", "clip", "영상", "비디오", "영화", "뮤직비디오"),
+    "text": ("article", "book", "essay", "text", "글", "기사", "책", "에세이", "소설"),
+}
+INTENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "similar": ("similar", "same mood", "비슷한", "유사한", "같은 분위기", "닮은"),
+    "reference": (
+        "reference",
+        "concept",
+        "inspiration",
+        "레퍼런스",
+        "참고",
+        "컨셉",
+        "콘셉트",
+        "영감",
+    ),
+}
+
+# 한국어 키워드 뒤에 붙어도 같은 단어로 보는 조사/접미사 ("곡을", "노래들과" 등)
+KOREAN_SUFFIXES = (
+    "",
+    "들",
+    "을",
+    "를",
+    "이",
+    "가",
+    "은",
+    "는",
+    "과",
+    "와",
+    "의",
+    "로",
+    "으로",
+    "도",
+    "만",
+    "에",
+    "에서",
+    "처럼",
+    "이나",
+    "나",
+    "들을",
+    "들이",
+    "들과",
+    "들의",
+)
+
+# 요청 속 따옴표로 감싼 대상(곡명, 작품명 등)
+SUBJECT_PATTERN = re.compile(r"['\"‘’“”「」『』](.+?)['\"‘’“”「」『』]")
+
+
+def _matches_token(token: str, keyword: str) -> bool:
+    if token == keyword:
+        return True
+    if keyword.isascii():
+        return token in (f"{keyword}s", f"{keyword}es")
+    # 부분 문자열이 아니라 단어 단위로 비교해 "구글"의 "글", "곡선"의 "곡"은 제외합니다.
+    return token.startswith(keyword) and token[len(keyword) :] in KOREAN_SUFFIXES
+
+
+def _contains_keyword(tokens: List[str], keyword: str) -> bool:
+    words = keyword.split()
+    for start in range(len(tokens) - len(words) + 1):
+        window = tokens[start : start + len(words)]
+        # 여러 단어 키워드는 마지막 단어에만 조사가 붙을 수 있습니다.
+        if window[:-1] == words[:-1] and _matches_token(window[-1], words[-1]):
+            return True
+    return False
+
+
+def request_signature(request: str) -> Optional[str]:
+    """요청을 'intent:media+media' 형태의 signature로 바꿉니다. 판별이 안 되면 None."""
+    tokens = re.findall(r"\w+", request.lower())
+    media = sorted(
+        name
+        for name, keywords in MEDIA_KEYWORDS.items()
+        if any(_contains_keyword(tokens, keyword) for keyword in keywords)
+    )
+    intents = [
+        name
+        for name, keywords in INTENT_KEYWORDS.items()
+        if any(_contains_keyword(tokens, keyword) for keyword in keywords)
+    ]
+    if not media and not intents:
+        return None
+    intent = intents[0] if intents else "find"
+    return f"{intent}:{'+'.join(media) or 'any'}"
+
+
+def extract_subject(request: str) -> Optional[str]:
+    match = SUBJECT_PATTERN.search(request)
+    return match.group(1).strip() if match else None
+
+
+@dataclass
+class PlanTemplate:
+    template_id: str
+    signature: str
+    source_request: str
+    subject: Optional[str]
+    steps: List[Dict]
+    successes: int = 1
+    failures: int = 0
+    created_at: float = field(default_factory=time.time)
+    last_used_at: Optional[float] = None
+    # 템플릿을 만든 사용자. 다른 사용자의 요청에는 재사용하지 않습니다.
+    scope: Optional[str] = None
+
+
+def _library_key(scope: Optional[str], signature: str) -> str:
+    return f"{scope}|{signature}" if scope else signature
+
+
+class PlanLibrary:
+    """
+    성공한 검색 계획(모든 단계 완료 + 참고 자료 확보)을 사용자(scope)와 요청 형태별로
+    저장하고, 같은 사용자의 같은 형태 요청에 템플릿 계획을 돌려줘 create_plan의 LLM 호출을
+    생략하게 합니다.
+
+    템플릿의 단계에는 원래 요청의 대상(따옴표로 감싼 곡명/작품명)이 들어 있으므로, 두 요청
+    모두 대상이 있어 치환할 수 있을 때만 재사용하고 그렇지 않으면 새 계획을 만들게 합니다.
+    파일 저장을 하므로 record_* 메서드는 이벤트 루프 밖(asyncio.to_thread)에서 호출합니다.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_per_signature: int = 5):
+        self.path = path
+        self.max_per_signature = max_per_signature
+        self._templates: Dict[str, List[PlanTemplate]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fp:
+                raw = json.load(fp)
+            for signature, templates in raw.items():
+                self._templates[signature] = [PlanTemplate(**t) for t in templates]
+            logger.info(f"계획 라이브러리 로드: {len(self._templates)}개 signature")
+        except (IOError, ValueError, TypeError) as e:
+            logger.warning(
+                f"계획 라이브러리 로드 실패, 빈 라이브러리로 시작합니다: {e}"
+            )
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            signature: [asdict(t) for t in templates]
+            for signature, templates in self._templates.items()
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            json.dump(data, fp, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def match(
+        self, request: str, scope: Optional[str] = None
+    ) -> Optional[Tuple[PlanTemplate, List[Dict]]]:
+        """
+        같은 사용자의 같은 형태 템플릿을 찾아 (템플릿, 인스턴스화된 plan_steps)를 반환합니다.
+        대상을 치환할 수 있는 템플릿이 없으면 None.
+        """
+        signature = request_signature(request)
+        with self._lock:
+            candidates = (
+                [
+                    t
+                    for t in self._templates.get(_library_key(scope, signature), [])
+                    if t.successes > t.failures
+                ]
+                if signature
+                else []
+            )
+            candidates.sort(
+                key=lambda t: (t.successes - t.failures, t.created_at), reverse=True
+            )
+            for template in candidates:
+                plan_steps = self.instantiate(template, request)
+                if plan_steps is not None:
+                    template.last_used_at = time.time()
+                    self.hits += 1
+                    return template, plan_steps
+            self.misses += 1
+            return None
+
+    @staticmethod
+    def instantiate(template: PlanTemplate, request: str) -> Optional[List[Dict]]:
+        """템플릿의 대상을 요청의 대상으로 바꾼 plan_steps. 치환할 수 없으면 None."""
+        subject = extract_subject(request)
+        if not template.subject or not subject:
+            return None
+
+        def fill(text: str) -> str:
+            return text.replace(template.subject, subject)
+
+        filled = [(fill(step["task"]), fill(step["action"])) for step in template.steps]
+        if subject != template.subject and any(
+            template.subject in text for pair in filled for text in pair
+        ):
+            return None
+
+        plan_steps = []
+        for step, (task, action) in zip(template.steps, filled):
+            plan_steps.append(
+                {
+                    "plan_sequence": step["plan_sequence"],
+                    "task": task,
+                    # 템플릿은 다른 요청에서 만들어졌으므로 실행 단계가 원래 요청을 알 수 있게 덧붙입니다.
+                    "action": f"{action}\\n사용자 요청: {request}",
+                    "status": "not_started",
+                    "transcript_ref": None,
+                    "result": "",
+                }
+            )
+        return plan_steps
+
+    def record_success(
+        self, request: str, plan_steps: List[Dict], scope: Optional[str] = None
+    ) -> None:
+        signature = request_signature(request)
+        # 대상이 없는 요청의 계획은 치환할 수 없어 재사용되지 않으므로 저장하지 않습니다.
+        if not signature or not plan_steps or not extract_subject(request):
+            return
+        template = PlanTemplate(
+            template_id=str(uuid4()),
+            signature=signature,
+            source_request=request,
+            subject=extract_subject(request),
+            steps=[
+                {
+                    "plan_sequence": step["plan_sequence"],
+                    "task": step["task"],
+                    "action": step["action"],
+                }
+                for step in plan_steps
+            ],
+            scope=scope,
+        )
+        with self._lock:
+            templates = self._templates.setdefault(_library_key(scope, signature), [])
+            templates.append(template)
+            templates.sort(
+                key=lambda t: (t.successes - t.failures, t.created_at), reverse=True
+            )
+            del templates[self.max_per_signature :]
+            self._save()
+        logger.info(
+            f"계획 템플릿 저장: signature={signature}, 단계 {len(plan_steps)}개"
+        )
+
+    def record_outcome(self, template_id: str, succeeded: bool) -> None:
+        with self._lock:
+            for templates in self._templates.values():
+                for template in templates:
+                    if template.template_id == template_id:
+                        if succeeded:
+                            template.successes += 1
+                        else:
+                            template.failures += 1
+                        self._save()
+                        return
+
+    def stats(self) -> Dict:
+        signatures: Dict[str, int] = {}
+        scopes = set()
+        for templates in list(self._templates.values()):
+            for template in templates:
+                signatures[template.signature] = signatures.get(template.signature, 0) + 1
+                scopes.add(template.scope)
+        return {
+            "signatures": signatures,
+            "scopes": len(scopes),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def create_plan_library() -> Optional[PlanLibrary]:
+    if not settings.plan_library_enabled:
+        return None
+    return PlanLibrary(settings.plan_library_path)
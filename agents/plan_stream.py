@@ -0,0 +1,78 @@
+import json
+from typing import Dict, List
+
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class IncrementalPlanParser:
+    """
+    스트리밍되는 계획 JSON 배열에서 완성된 단계 객체를 바로 꺼내는 파서.
+
+    응답 앞의 ```json 펜스나 설명 문장은 건너뛰고, 최상위 배열의 원소 객체가 닫히는
+    순간 그 객체를 파싱해 돌려줍니다. 문자열 안의 괄호와 이스케이프도 고려합니다.
+
+    계획 배열은 공백 다음 바로 '{'가 오는 '['에서 시작한다고 봅니다. 설명 문장 속
+    "[참고]", "[1]" 같은 대괄호는 배열 시작으로 보지 않습니다.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self._object_start = None
+        self.entries: List[Dict] = []
+
+    def feed(self, text: str) -> List[Dict]:
+        """text를 이어 붙이고, 이번에 완성된 단계 객체들을 반환합니다."""
+        self.buffer += text
+        completed: List[Dict] = []
+        while self._position < len(self.buffer):
+            ch = self.buffer[self._position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif not self._started:
+                if ch == "[":
+                    following = self.buffer[self._position + 1 :].lstrip()
+                    if not following:
+                        # '[' 다음 내용이 아직 도착하지 않았으면 다음 청크에서 다시 봅니다.
+                        break
+                    if following[0] == "{":
+                        self._started = True
+                        self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                if ch == "{" and self._depth == 1:
+                    self._object_start = self._position
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if ch == "}" and self._depth == 1 and self._object_start is not None:
+                    entry = self._parse(
+                        self.buffer[self._object_start : self._position + 1]
+                    )
+                    self._object_start = None
+                    if entry is not None:
+                        self.entries.append(entry)
+                        completed.append(entry)
+            self._position += 1
+        return completed
+
+    @staticmethod
+    def _parse(text: str):
+        try:
+            entry = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.debug("스트리밍 계획 단계 파싱 실패, 건너뜁니다: %s", e)
+            return None
+        return entry if isinstance(entry, dict) else None
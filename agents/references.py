@@ -0,0 +1,292 @@
+"""
+도구 호출 결과에서 참고 자료(URL, 제목, 요약)를 구조적으로 모읍니다.
+
+단계 실행 중 수집한 참고 자료는 URL 기준으로 중복을 없애 R1, R2... id로 그래프 상태에 두고,
+요약 LLM은 본문에서 [R1] 형태로 id만 인용하고, 본문 뒤 참고 자료 노트에 id별 관련성 설명을 씁니다.
+최종 references 목록은 서버가 인용된 id와 그 설명으로 만듭니다.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+SNIPPET_CHARS = 300
+
+CITATION_PATTERN = re.compile(r"\[(R\d+)\]")
+REFERENCE_NOTES_MARKER = "---REFERENCE NOTES---"
+REFERENCE_NOTE_PATTERN = re.compile(r"^\s*[-*]?\s*\[(R\d+)\]\s*:?\s*(.+?)\s*$", re.M)
+URL_PATTERN = re.compile(r"https?://[^\s<>()\"'\]]+")
+FIELD_PATTERN = re.compile(
+    r"^\s*(title|url|link|content|description|snippet)\s*:\s*(.*)$", re.I
+)
+HEADING_PATTERN = re.compile(r"^\s*#{1,3}\s+(.+)$", re.M)
+HTML_TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+HTML_SKIP_PATTERN = re.compile(
+    r"<(script|style|title|head)[^>]*>.*?</\1>|<[^>]+>", re.I | re.S
+)
+
+TYPE_BY_EXTENSION = {
+    (".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"): "image",
+    (".mp4", ".mov", ".webm"): "video",
+    (".mp3", ".wav", ".flac", ".m4a"): "music",
+    (".pdf", ".doc", ".docx", ".ppt", ".pptx"): "document",
+}
+TYPE_BY_DOMAIN = {
+    ("youtube.com", "youtu.be", "vimeo.com", "tiktok.com"): "video",
+    (
+        "spotify.com",
+        "soundcloud.com",
+        "music.apple.com",
+        "melon.com",
+        "genie.co.kr",
+        "bandcamp.com",
+    ): "music",
+    ("pinterest.", "unsplash.com", "flickr.com", "behance.net", "dribbble.com"): "image",
+}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+TRACKING_PARAMS = ("fbclid", "gclid", "ref")
+
+
+def normalize_url(url: str) -> str:
+    """중복 판별용 URL. fragment, 추적 파라미터, 끝의 '/'를 없앱니다."""
+    parts = urlsplit(url.strip().rstrip(".,;"))
+    query = urlencode(
+        [
+            (k, v)
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not k.lower().startswith(TRACKING_PARAM_PREFIXES)
+            and k.lower() not in TRACKING_PARAMS
+        ]
+    )
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path.rstrip("/"), query, ""))
+
+
+def infer_type(url: str) -> str:
+    parts = urlsplit(url)
+    path = parts.path.lower()
+    for extensions, ref_type in TYPE_BY_EXTENSION.items():
+        if path.endswith(extensions):
+            return ref_type
+    netloc = parts.netloc.lower()
+    for domains, ref_type in TYPE_BY_DOMAIN.items():
+        if any(domain in netloc for domain in domains):
+            return ref_type
+    return "webpage"
+
+
+def _snippet(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()[:SNIPPET_CHARS]
+
+
+def _reference(url: str, title: str = "", snippet: str = "") -> Dict[str, str]:
+    url = url.strip().rstrip(".,;")
+    return {
+        "url": url,
+        "title": _snippet(title) or url,
+        "snippet": _snippet(snippet),
+        "type": infer_type(url),
+    }
+
+
+def _from_json(value: Any) -> Iterable[Dict[str, str]]:
+    if isinstance(value, dict):
+        url = value.get("url") or value.get("link") or value.get("sourceURL")
+        if isinstance(url, str) and url.startswith("http"):
+            yield _reference(
+                url,
+                value.get("title") or "",
+                value.get("content")
+                or value.get("description")
+                or value.get("snippet")
+                or "",
+            )
+        for child in value.values():
+            yield from _from_json(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from _from_json(child)
+
+
+def _from_fields(text: str) -> Iterable[Dict[str, str]]:
+    """'Title: ... / URL: ... / Content: ...' 형태로 나열된 검색 결과를 읽습니다."""
+    record: Dict[str, str] = {}
+    for line in text.splitlines():
+        match = FIELD_PATTERN.match(line)
+        if not match:
+            continue
+        key, value = match.group(1).lower(), match.group(2)
+        if key in ("url", "link"):
+            if record.get("url"):
+                yield _reference(**record)
+                record = {}
+            found = URL_PATTERN.search(value)
+            if found:
+                record["url"] = found.group(0)
+        elif key == "title":
+            if record.get("url") and record.get("title"):
+                yield _reference(**record)
+                record = {}
+            record["title"] = value
+        elif "snippet" not in record:
+            record["snippet"] = value
+    if record.get("url"):
+        yield _reference(**record)
+
+
+def _page_title(text: str) -> str:
+    match = HTML_TITLE_PATTERN.search(text) or HEADING_PATTERN.search(text)
+    return match.group(1) if match else ""
+
+
+def extract_references(
+    arguments: Dict[str, Any], content: Any
+) -> List[Dict[str, str]]:
+    """
+    도구 호출 인자와 원본 출력에서 참고 자료 후보를 뽑습니다.
+
+    - JSON 출력: url/link 키가 있는 객체
+    - 텍스트 출력: Title/URL/Content 필드로 나열된 검색 결과
+    - 스크랩 도구: 인자로 받은 url 자체 (제목은 <title> 또는 첫 제목 줄)
+    """
+    items = content if isinstance(content, list) else [content]
+    texts = [item for item in items if isinstance(item, str)]
+    references: List[Dict[str, str]] = []
+    for text in texts:
+        try:
+            references.extend(_from_json(json.loads(text)))
+            continue
+        except ValueError:
+            pass
+        references.extend(_from_fields(text))
+
+    url = arguments.get("url")
+    if isinstance(url, str) and url.startswith("http"):
+        body = "\n".join(texts)
+        references.insert(
+            0, _reference(url, _page_title(body), HTML_SKIP_PATTERN.sub(" ", body))
+        )
+    return references
+
+
+def merge_references(
+    left: Optional[Dict[str, Dict]], right: Optional[Dict[str, Dict]]
+) -> Dict[str, Dict]:
+    """references 리듀서. {ref_id: 참고 자료}를 id별로 병합하고 단계 인덱스는 합칩니다."""
+    merged = dict(left or {})
+    for ref_id, reference in (right or {}).items():
+        existing = merged.get(ref_id)
+        if existing is None:
+            merged[ref_id] = reference
+            continue
+        merged[ref_id] = {
+            **existing,
+            **{k: v for k, v in reference.items() if v},
+            "steps": sorted(
+                set(existing.get("steps", [])) | set(reference.get("steps", []))
+            ),
+        }
+    return merged
+
+
+def index_references(
+    existing: Optional[Dict[str, Dict]],
+    candidates: Iterable[Dict[str, str]],
+    step_index: int,
+) -> Dict[str, Dict]:
+    """
+    후보들을 기존 참고 자료와 URL로 대조해 id를 붙입니다.
+
+    Returns:
+        이번 단계에서 추가/갱신할 {ref_id: 참고 자료}. merge_references로 상태에 반영합니다.
+    """
+    existing = existing or {}
+    by_url = {normalize_url(ref["url"]): ref_id for ref_id, ref in existing.items()}
+    next_number = len(existing) + 1
+    updates: Dict[str, Dict] = {}
+    for candidate in candidates:
+        key = normalize_url(candidate["url"])
+        ref_id = by_url.get(key)
+        if ref_id is None:
+            ref_id = f"R{next_number}"
+            next_number += 1
+            by_url[key] = ref_id
+            updates[ref_id] = {"id": ref_id, **candidate, "steps": [step_index]}
+        elif ref_id not in updates:
+            current = existing[ref_id]
+            # 먼저 본 제목/요약을 유지하되, 비어 있던 값은 채웁니다.
+            has_title = current["title"] != current["url"]
+            updates[ref_id] = {
+                "id": ref_id,
+                "title": current["title"] if has_title else candidate["title"],
+                "snippet": current.get("snippet") or candidate["snippet"],
+                "steps": [step_index],
+            }
+    return updates
+
+
+def format_reference_list(references: Dict[str, Dict], ref_ids: Iterable[str]) -> str:
+    lines = []
+    for ref_id in ref_ids:
+        ref = references.get(ref_id)
+        if ref:
+            lines.append(
+                f"[{ref_id}] {ref['title']} ({ref['type']}) {ref['url']}\n"
+                f"    {ref.get('snippet', '')}"
+            )
+    return "\n".join(lines)
+
+
+def split_reference_notes(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    요약 응답을 본문과 참고 자료 노트({ref_id: 관련성 설명})로 나눕니다.
+    노트 구분선이 없으면 본문은 그대로, 노트는 빈 dict입니다.
+    """
+    body, marker, notes_text = (text or "").partition(REFERENCE_NOTES_MARKER)
+    if not marker:
+        return text or "", {}
+    notes: Dict[str, str] = {}
+    for ref_id, note in REFERENCE_NOTE_PATTERN.findall(notes_text):
+        notes.setdefault(ref_id, note)
+    return body.rstrip(), notes
+
+
+def cited_reference_ids(text: str) -> List[str]:
+    """본문에 [R1] 형태로 인용된 id를 처음 등장한 순서대로 반환합니다."""
+    seen: List[str] = []
+    for ref_id in CITATION_PATTERN.findall(text or ""):
+        if ref_id not in seen:
+            seen.append(ref_id)
+    return seen
+
+
+def assemble_references(
+    references: Dict[str, Dict],
+    ref_ids: Iterable[str],
+    notes: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, str]]:
+    """
+    응답용 references 목록 (id, title, description, url, type).
+
+    description은 요약 LLM이 쓴 관련성 설명(notes)이고, 설명이 없는 id는 도구 출력에서 뽑은
+    snippet을 씁니다.
+    """
+    notes = notes or {}
+    assembled = []
+    for ref_id in ref_ids:
+        ref = references.get(ref_id)
+        if ref is None:
+            continue
+        assembled.append(
+            {
+                "id": ref_id,
+                "title": ref["title"],
+                "description": notes.get(ref_id) or ref.get("snippet", ""),
+                "url": ref["url"],
+                "type": ref["type"],
+            }
+        )
+    return assembled
@@ -0,0 +1,164 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_SCOPES = ("global", "user", "project")
+
+EMBEDDING_DIM = 1024
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _features(text: str) -> List[str]:
+    normalized = _normalize(text)
+    words = normalized.split()
+    padded = f" {normalized} "
+    # 단어 유니그램 + 문자 3-gram. 문자 n-gram은 한국어 조사/어미 변화에도 잘 맞습니다.
+    return words + [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    외부 모델 없이 로컬에서 계산하는 해싱 기반 텍스트 임베딩 (L2 정규화).
+    의미 유사도보다는 표현이 거의 같은 요청을 찾는 용도입니다.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in _features(text):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        sign = 1.0 if value & 1 else -1.0
+        vector[(value >> 1) % dim] += sign
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def cache_scope_key(scope: str, user_id: str, project_id: str) -> str:
+    if scope == "user":
+        return f"user:{user_id}"
+    if scope == "project":
+        return f"project:{user_id}:{project_id}"
+    return "global"
+
+
+@dataclass
+class CacheEntry:
+    prompt: str
+    scope_key: str
+    vector: np.ndarray
+    result: Dict[str, Any]
+    created_at: float
+    # 결과를 저장한 ai_results 행과 그 소유자. 캐시 적중 시 새 행 대신 이 행을 가리킵니다.
+    ai_result_id: Optional[str] = None
+    user_id: Optional[str] = None
+
+
+class SemanticResultCache:
+    """
+    SearchAgent 최종 결과(final_summary) 캐시.
+
+    요청 프롬프트를 로컬 임베딩으로 바꿔 최근 결과들과 코사인 유사도로 비교하고,
+    threshold 이상이며 TTL 안에 있는 가장 가까운 결과를 돌려줍니다.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.threshold = (
+            threshold if threshold is not None else settings.search_cache_threshold
+        )
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else settings.search_cache_ttl_seconds
+        )
+        self.max_entries = max_entries or settings.search_cache_max_entries
+        self._entries: List[CacheEntry] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _evict_expired(self, now: float) -> None:
+        alive = [e for e in self._entries if now - e.created_at <= self.ttl_seconds]
+        if len(alive) != len(self._entries):
+            self._entries = alive
+            self._matrix = None
+
+    def lookup(
+        self, prompt: str, scope_key: str, threshold: Optional[float] = None
+    ) -> Optional[Tuple[CacheEntry, float]]:
+        threshold = self.threshold if threshold is None else threshold
+        query = embed_text(prompt)
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            if not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._matrix = np.vstack([e.vector for e in self._entries])
+            similarities = self._matrix @ query
+            best_index, best_similarity = None, threshold
+            for index in np.argsort(-similarities):
+                similarity = float(similarities[index])
+                if similarity < threshold:
+                    break
+                if self._entries[index].scope_key == scope_key:
+                    best_index, best_similarity = int(index), similarity
+                    break
+            if best_index is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._entries[best_index], best_similarity
+
+    def store(
+        self,
+        prompt: str,
+        scope_key: str,
+        result: Dict[str, Any],
+        ai_result_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> None:
+        entry = CacheEntry(
+            prompt=prompt,
+            scope_key=scope_key,
+            vector=embed_text(prompt),
+            result=result,
+            created_at=time.time(),
+            ai_result_id=ai_result_id,
+            user_id=user_id,
+        )
+        with self._lock:
+            self._evict_expired(entry.created_at)
+            self._entries.append(entry)
+            if len(self._entries) > self.max_entries:
+                self._entries = self._entries[-self.max_entries :]
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -1,25 +1,96 @@
 import asyncio
 import json
 import os
-from typing import List, Dict, Optional, TypedDict, Annotated, Sequence, Union
+import time
+from contextlib import asynccontextmanager
+from typing import (
+    List,
+    Dict,
+    Optional,
+    TypedDict,
+    Annotated,
+    Sequence,
+    Tuple,
+    Union,
+)
 import re
+from collections import OrderedDict
 from uuid import uuid4
-import aiosqlite
-from copy import deepcopy
 
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    AIMessage,
+    SystemMessage,
+    ToolMessage,
+    messages_from_dict,
+    messages_to_dict,
+)
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages  # 메시지 기록 관리
 from langgraph.prebuilt import create_react_agent
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
-from prompts.idea_search import PLAN_GENERATION_PROMPT, EXECUTION_PROMPT, SUMMARY_PROMPT
+from langgraph.checkpoint.memory import MemorySaver
+from prompts.idea_search import (
+    PLAN_GENERATION_PROMPT,
+    EXECUTION_PROMPT,
+    SUMMARY_PROMPT,
+    CONDENSE_PROMPT,
+)
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableConfig
 from core.logger import get_logger  # 로거 임포트
+from core.config import settings
+from core.tracing import traced_node
+from agents.blob_store import BlobStore
+from agents.budget import (
+    BudgetTracker,
+    budgets_from_config,
+    merge_budget_usage,
+    run_deadline_from_config,
+)
+from agents.checkpoint_store import CheckpointStore
+from agents.mcp_pool import McpPool
+from agents.plan_library import PlanLibrary, create_plan_library
+from agents.plan_stream import IncrementalPlanParser
+from agents.references import (
+    assemble_references,
+    cited_reference_ids,
+    format_reference_list,
+    index_references,
+    merge_references,
+    split_reference_notes,
+)
+from agents.snapshot import (
+    export_snapshot_in_background,
+    snapshot_path,
+    wait_for_pending_exports,
+)
+from agents.tool_distill import distill_tools, estimate_tokens, truncate_to_tokens
+from agents.tool_registry import select_tools
 
 logger = get_logger(__name__)  # 모듈 레벨 로거 초기화
 
+# 실행별 체크포인트 모드
+# - none: 체크포인트를 남기지 않음
+# - memory: 프로세스 메모리에만 보관하고, 요청 시 최종 스냅샷 하나만 SQLite에 기록
+# - sqlite: 노드 전이마다 SQLite에 기록 (기존 동작)
+CHECKPOINT_MODES = ("none", "memory", "sqlite")
+
+# 재시도 시 다시 실행할 단계 상태
+# - partial: 예산이 소진되어 중간까지 모은 결과만 있는 단계 (재시도하지 않음)
+# - skipped: 실행 전체 예산이 소진되어 시작하지 못한 단계
+RETRYABLE_STEP_STATUSES = ("blocked", "not_started", "skipped")
+
+# 예산 소진으로 잘린 단계에서 결과로 남길 도구 출력 길이 상한
+PARTIAL_TOOL_OUTPUT_CHARS = 2000
+
+# 요약 프롬프트에 넣을 참고 자료 수 상한
+MAX_SUMMARY_REFERENCES = 40
+
+# 실패한 실행을 재개할 수 있도록 memory 모드에서 남겨두는 스레드 수 상한
+MAX_RETAINED_MEMORY_THREADS = 100
+
 
 class PlanStepState(TypedDict):
     """계획의 각 단계를 나타내는 상태"""
@@ -28,40 +99,62 @@ class PlanStepState(TypedDict):
     task: str
     status: str
     action: str
-    steps: Annotated[Sequence[BaseMessage], add_messages]
+    # 단계의 ReAct 대화 기록은 상태에 직접 넣지 않고 BlobStore id만 보관합니다.
+    transcript_ref: Optional[str]
     result: str
+    # 단계 실행 사용량과 예산 소진 사유 (BudgetTracker.report)
+    budget: Optional[Dict]
+    # 이 단계의 도구 호출에서 수집한 참고 자료 id (PlanningGraphState.references의 키)
+    reference_ids: List[str]
+    # 큰 실행의 최종 요약에 쓰는 단계 결과 요약본
+    condensed_result: Optional[str]
+
+
+def merge_plan_steps(
+    left: Optional[List[PlanStepState]],
+    right: Union[List[PlanStepState], Dict[int, Dict], None],
+) -> Optional[List[PlanStepState]]:
+    """
+    plan_steps 리듀서.
+
+    노드가 리스트를 반환하면 전체 계획을 교체하고, {단계 인덱스: 변경 필드} 형태의
+    dict를 반환하면 해당 단계만 얕은 복사 후 패치합니다. 매 전이마다 전체 계획을
+    deepcopy 하지 않기 위한 것입니다.
+    """
+    if right is None:
+        return left
+    if isinstance(right, list):
+        return right
+    merged = list(left or [])
+    for index, patch in right.items():
+        index = int(index)
+        merged[index] = {**merged[index], **patch}
+    return merged
 
 
 class PlanningGraphState(TypedDict):
     initial_request: str
     # plan_title: Optional[str]
-    plan_steps: Optional[List[PlanStepState]]
+    plan_steps: Annotated[Optional[List[PlanStepState]], merge_plan_steps]
+    # 계획 라이브러리의 템플릿을 재사용한 경우 그 템플릿 id
+    plan_template_id: Optional[str]
     current_step_index: Optional[int]
-    step_result: Optional[List[str]]
     final_summary: Optional[str]
+    # 실행 전체의 도구 호출/LLM 반복/토큰 사용량 누계
+    budget_usage: Annotated[Optional[Dict[str, int]], merge_budget_usage]
+    # 도구 호출에서 수집한 참고 자료 {ref_id: {id, url, title, snippet, type, steps}}
+    references: Annotated[Optional[Dict[str, Dict]], merge_references]
     messages: Annotated[Sequence[BaseMessage], add_messages]
 
 
 class SearchAgent:
-    @staticmethod
-    def _to_json_serializable(obj):
-        """
-        Fallback serializer for json.dump so that LangChain message objects
-        (HumanMessage, AIMessage, etc.) become JSON‑friendly.
-        """
-        from langchain_core.messages import BaseMessage
-
-        if isinstance(obj, BaseMessage):
-            return {
-                "type": obj.__class__.__name__,
-                "content": getattr(obj, "content", ""),
-                "additional_kwargs": getattr(obj, "additional_kwargs", {}),
-            }
-        raise TypeError(
-            f"Object of type {obj.__class__.__name__} is not JSON serializable"
-        )
-
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        blob_store: Optional[BlobStore] = None,
+        plan_library: Optional[PlanLibrary] = None,
+        mcp_pool: Optional[McpPool] = None,
+    ):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             # __init__에서는 logger 대신 ValueError를 직접 발생시키는 것이 일반적입니다.
@@ -73,19 +166,71 @@ class SearchAgent:
             model="gemini-2.5-flash-preview-04-17",
             api_key=self.api_key,
         )
+        self.blob_store = blob_store or BlobStore(settings.search_blob_dir)
+        self.plan_library = (
+            plan_library if plan_library is not None else create_plan_library()
+        )
+        # 단계들이 공유하는 MCP 서버 연결 (처음 필요할 때 시작)
+        self.mcp_pool = mcp_pool or McpPool()
+        self.checkpoint_store: Optional[CheckpointStore] = None
+        self.memory_saver = MemorySaver()
+        self._retained_memory_threads: OrderedDict = OrderedDict()
+        # 단계 결과 요약(condense) 태스크 {thread_id: {단계 인덱스: asyncio.Task}}
+        self._condense_tasks: Dict[str, Dict[int, asyncio.Task]] = {}
+        # 계획 생성 중 먼저 시작한 첫 단계 실행 {thread_id: ((task, action), asyncio.Task)}
+        self._speculative_steps: Dict[str, Tuple[Tuple[str, str], asyncio.Task]] = {}
+        # 실행 중단 요청 이벤트 {thread_id: asyncio.Event} (run_async의 stop_event)
+        self._stop_events: Dict[str, asyncio.Event] = {}
+        # 같은 thread_id 실행을 직렬화하는 락과 그 락을 기다리거나 잡고 있는 실행 수
+        self._thread_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
         self.app = None
-
-    def create_plan_node(self, state: PlanningGraphState) -> Dict:
+        self.apps: Dict[str, object] = {}
+
+    def load_step_transcript(self, step: PlanStepState) -> List[BaseMessage]:
+        """단계의 transcript_ref로 BlobStore에 보관된 ReAct 대화 기록을 복원합니다."""
+        transcript_ref = step.get("transcript_ref")
+        if not transcript_ref:
+            return []
+        data = self.blob_store.get_json(transcript_ref)
+        return messages_from_dict(data) if data else []
+
+    async def create_plan_node(
+        self, state: PlanningGraphState, config: RunnableConfig
+    ) -> Dict:
         logger.info("--- 노드: 계획 생성 ---")
         request = state["initial_request"]
 
+        if self.plan_library is not None:
+            matched = self.plan_library.match(
+                request, scope=config["configurable"].get("user_id")
+            )
+            if matched is not None:
+                template, plan_steps = matched
+                logger.info(
+                    f"계획 라이브러리 템플릿 재사용: {template.signature} ({template.template_id}), "
+                    f"단계 {len(plan_steps)}개. LLM 계획 생성을 건너뜁니다."
+                )
+                return {
+                    "plan_steps": plan_steps,
+                    "plan_template_id": template.template_id,
+                    "messages": [
+                        AIMessage(
+                            content=f"Reusing plan template {template.template_id} ({template.signature})"
+                        )
+                    ],
+                }
+
         logger.info("LLM 호출: 계획 생성 요청...")
-        plan_agent = create_react_agent(
-            prompt=PLAN_GENERATION_PROMPT, model=self.llm, tools=[]
-        )
-        plan_response = plan_agent.invoke({"messages": request})
-        plan_json_str = plan_response["messages"][-1].content
-        logger.debug(f"LLM으로부터 받은 계획 (raw): {plan_json_str}")
+        if settings.search_speculative_first_step:
+            plan_messages = await self._stream_plan(request, config)
+        else:
+            plan_agent = create_react_agent(
+                prompt=PLAN_GENERATION_PROMPT, model=self.llm, tools=[]
+            )
+            plan_response = await plan_agent.ainvoke({"messages": request})
+            plan_messages = plan_response["messages"]
+        plan_json_str = plan_messages[-1].content
+        logger.debug("LLM으로부터 받은 계획 (raw): %s", plan_json_str)
 
         processed_result = None
 
@@ -145,7 +290,7 @@ class SearchAgent:
 
         try:
             plan_data = processed_result
-            logger.debug(f"파싱된 plan_data: {plan_data}")
+            logger.debug("파싱된 plan_data: %s", plan_data)
 
             plan_steps: List[PlanStepState] = []
             # plan_data가 리스트가 아닐 경우 (예: {"text": "...", "is_raw_text": True} 형태)
@@ -163,7 +308,7 @@ class SearchAgent:
                             ),
                             "action": "수동 검토 필요",
                             "status": "not_started",
-                            "steps": [],
+                            "transcript_ref": None,
                             "result": "",
                         }
                     )
@@ -174,24 +319,7 @@ class SearchAgent:
 
             else:
                 for item in plan_data:
-                    sequence = item.get("plan_sequence")
-                    task_desc = item.get("task", "")
-                    actions = item.get("action", [])
-                    action_str = (
-                        "\\n".join(actions)
-                        if isinstance(actions, list)
-                        else str(actions)
-                    )
-                    plan_steps.append(
-                        {
-                            "plan_sequence": sequence,
-                            "task": task_desc,
-                            "action": action_str,
-                            "status": "not_started",
-                            "steps": [],
-                            "result": "",
-                        }
-                    )
+                    plan_steps.append(self._plan_step_from_item(item))
 
             if not plan_steps:  # 여전히 plan_steps가 비어있다면 (파싱 실패 등)
                 logger.warning(
@@ -203,7 +331,7 @@ class SearchAgent:
                         "task": request,  # 사용자의 초기 요청을 작업으로 사용
                         "action": "자동 생성된 계획이 없으므로, 초기 요청을 직접 수행합니다.",
                         "status": "not_started",
-                        "steps": [],
+                        "transcript_ref": None,
                         "result": "",
                     }
                 )
@@ -211,10 +339,14 @@ class SearchAgent:
             logger.info(f"생성된 계획 단계 수: {len(plan_steps)}")
             plan_steps.sort(key=lambda s: s["plan_sequence"])
             for step in plan_steps:
-                logger.debug(f"- 계획 {step['plan_sequence']}: {step['task']}")
+                logger.debug("- 계획 %s: %s", step["plan_sequence"], step["task"])
+            self._reconcile_speculative_step(
+                config["configurable"].get("thread_id"), plan_steps
+            )
             return {
                 "plan_steps": plan_steps,
-                "messages": plan_response["messages"],  # LLM의 원본 메시지 포함
+                "plan_template_id": None,
+                "messages": plan_messages,  # LLM의 원본 메시지 포함
             }
         except Exception as e:
             logger.error(
@@ -228,7 +360,93 @@ class SearchAgent:
                 ]
             }
 
-    def identify_step_node(self, state: PlanningGraphState) -> Dict:
+    @staticmethod
+    def _plan_step_from_item(item: Dict) -> PlanStepState:
+        actions = item.get("action", [])
+        action_str = (
+            "\\n".join(actions) if isinstance(actions, list) else str(actions)
+        )
+        return {
+            "plan_sequence": item.get("plan_sequence"),
+            "task": item.get("task", ""),
+            "action": action_str,
+            "status": "not_started",
+            "transcript_ref": None,
+            "result": "",
+        }
+
+    async def _stream_plan(
+        self, request: str, config: RunnableConfig
+    ) -> List[BaseMessage]:
+        """
+        계획을 스트리밍으로 생성하면서, 첫 단계 항목이 완성되는 즉시 그 단계를 먼저 실행합니다.
+
+        계획 생성 시간과 (보통 가장 오래 걸리는) 첫 조사 단계를 겹치기 위한 것이며,
+        최종 계획의 첫 단계와 다르면 _reconcile_speculative_step에서 취소합니다.
+        """
+        thread_id = config["configurable"].get("thread_id")
+        parser = IncrementalPlanParser()
+        chunks: List[str] = []
+        async for chunk in self.llm.astream(
+            [
+                SystemMessage(content=PLAN_GENERATION_PROMPT),
+                HumanMessage(content=request),
+            ]
+        ):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            chunks.append(text)
+            for entry in parser.feed(text):
+                # 한 청크에서 여러 단계가 함께 완성될 수 있으므로 목록 길이가 아니라
+                # 이번에 나온 항목이 첫 단계인지로 판단합니다.
+                if entry is parser.entries[0] and thread_id:
+                    self._start_speculative_step(
+                        thread_id, self._plan_step_from_item(entry), config
+                    )
+        return [AIMessage(content="".join(chunks))]
+
+    @staticmethod
+    def _step_key(step: PlanStepState) -> Tuple[str, str]:
+        return step.get("task", ""), step.get("action", "")
+
+    def _start_speculative_step(
+        self, thread_id: str, step: PlanStepState, config: RunnableConfig
+    ) -> None:
+        self._cancel_speculative_step(thread_id)
+        logger.info(f"계획 생성 중 첫 단계를 먼저 실행합니다: {step['task']}")
+        task = asyncio.create_task(self._execute_step(0, step, None, None, config))
+        self._speculative_steps[thread_id] = (self._step_key(step), task)
+
+    def _reconcile_speculative_step(
+        self, thread_id: Optional[str], plan_steps: List[PlanStepState]
+    ) -> None:
+        """최종 계획의 첫 단계가 먼저 시작한 단계와 다르면 그 실행을 취소합니다."""
+        entry = self._speculative_steps.get(thread_id)
+        if entry is None:
+            return
+        if not plan_steps or entry[0] != self._step_key(plan_steps[0]):
+            logger.info("최종 계획의 첫 단계가 달라 먼저 시작한 실행을 취소합니다.")
+            self._cancel_speculative_step(thread_id)
+
+    def _take_speculative_step(
+        self, thread_id: Optional[str], step_index: int, step: PlanStepState
+    ) -> Optional[asyncio.Task]:
+        entry = self._speculative_steps.pop(thread_id, None)
+        if entry is None:
+            return None
+        key, task = entry
+        if step_index == 0 and key == self._step_key(step):
+            return task
+        task.cancel()
+        return None
+
+    def _cancel_speculative_step(self, thread_id: Optional[str]) -> None:
+        entry = self._speculative_steps.pop(thread_id, None)
+        if entry is not None:
+            entry[1].cancel()
+
+    def identify_step_node(
+        self, state: PlanningGraphState, config: RunnableConfig
+    ) -> Dict:
         logger.info("--- 노드: 다음 단계 식별 ---")
         steps = state.get("plan_steps")
         if not steps:
@@ -238,6 +456,27 @@ class SearchAgent:
                 "messages": [AIMessage(content="Error: No plan steps found in state.")],
             }
 
+        exhausted = self._run_budget_exhausted(state, config)
+        if exhausted:
+            skip_patch = {
+                i: {"status": "skipped"}
+                for i, step in enumerate(steps)
+                if step.get("status", "not_started") in ["not_started", "in_progress"]
+            }
+            if skip_patch:
+                logger.warning(
+                    f"실행 예산 소진({exhausted}). 남은 단계 {sorted(skip_patch)}를 건너뛰고 요약합니다."
+                )
+                return {
+                    "current_step_index": None,
+                    "plan_steps": skip_patch,
+                    "messages": [
+                        AIMessage(
+                            content=f"Run budget exhausted ({exhausted}). Skipping remaining steps."
+                        )
+                    ],
+                }
+
         next_step_index = None
         for i, step in enumerate(steps):
             if step.get("status", "not_started") in ["not_started", "in_progress"]:
@@ -248,16 +487,13 @@ class SearchAgent:
             logger.info(
                 f"다음 단계 식별: 인덱스 {next_step_index} - 작업: {steps[next_step_index]['task']}"
             )
-            updated_steps = deepcopy(
-                steps
-            )  # 이전에는 steps.copy() 였으나, 중첩된 딕셔너리 수정을 위해 deepcopy 고려
-            updated_steps[next_step_index]["status"] = "in_progress"
+            # 전체 계획을 복사하지 않고 해당 단계의 status만 패치합니다.
             return {
                 "current_step_index": next_step_index,
-                "plan_steps": updated_steps,
+                "plan_steps": {next_step_index: {"status": "in_progress"}},
                 "messages": [
                     AIMessage(
-                        content=f"Executing step {next_step_index}: {updated_steps[next_step_index]['task']}"
+                        content=f"Executing step {next_step_index}: {steps[next_step_index]['task']}"
                     )
                 ],
             }
@@ -268,6 +504,19 @@ class SearchAgent:
                 "messages": [AIMessage(content="All plan steps are completed.")],
             }
 
+    def _run_budget_exhausted(
+        self, state: PlanningGraphState, config: RunnableConfig
+    ) -> Optional[str]:
+        stop_event = self._stop_events.get(config["configurable"].get("thread_id"))
+        if stop_event is not None and stop_event.is_set():
+            return "run:cancelled"
+        _, run_budget = budgets_from_config(config)
+        run_deadline = run_deadline_from_config(config)
+        if run_deadline is not None and time.time() >= run_deadline:
+            return "run:deadline"
+        reason = run_budget.exceeded(state.get("budget_usage") or {})
+        return f"run:{reason}" if reason else None
+
     def format_plan_status(self, state: PlanningGraphState) -> str:
         """Helper function to format plan status from state"""
         # 이 함수는 직접 로깅보다는 문자열을 반환하므로, 내부 로깅은 최소화하거나 호출부에서 로깅합니다.
@@ -277,6 +526,8 @@ class SearchAgent:
             "completed": "[✓]",
             "in_progress": "[→]",
             "blocked": "[!]",
+            "partial": "[~]",
+            "skipped": "[-]",
             "not_started": "[ ]",
         }
         for i, step in enumerate(steps):
@@ -286,7 +537,9 @@ class SearchAgent:
                 status_text += f"   Notes: {step['action']}\\n"
         return status_text
 
-    async def execute_step_node(self, state: PlanningGraphState) -> Dict:
+    async def execute_step_node(
+        self, state: PlanningGraphState, config: RunnableConfig
+    ) -> Dict:
         logger.info("--- 노드: 단계 실행 ---")
         steps = state.get("plan_steps")
         current_step_index = state.get("current_step_index")
@@ -298,14 +551,102 @@ class SearchAgent:
         ):
             logger.error("오류: 실행할 현재 단계 정보를 찾을 수 없습니다.")
             return {
-                "step_result": "Error: Could not find current step info.",  # 이 부분도 상태 업데이트에 포함
                 "messages": [
                     AIMessage(content="Internal Error: Missing current step info.")
                 ],
             }
 
         current_step_info = steps[current_step_index]
-        logger.info(f"단계 {current_step_index} 실행 시작: {current_step_info['task']}")
+        speculative = self._take_speculative_step(
+            config["configurable"].get("thread_id"),
+            current_step_index,
+            current_step_info,
+        )
+        if speculative is not None:
+            logger.info(
+                f"단계 {current_step_index}: 계획 생성 중 먼저 시작한 실행 결과를 사용합니다."
+            )
+            update = await speculative
+        else:
+            update = await self._execute_step(
+                current_step_index,
+                current_step_info,
+                state.get("budget_usage"),
+                state.get("references"),
+                config,
+            )
+        self._start_condense(state, config, current_step_index, update)
+        return update
+
+    def _start_condense(
+        self,
+        state: PlanningGraphState,
+        config: RunnableConfig,
+        step_index: int,
+        update: Dict,
+    ) -> None:
+        """
+        결과가 큰 단계는 끝나자마자 백그라운드에서 요약(condense)을 시작해,
+        이후 단계 실행과 겹치게 합니다. 결과는 finalize에서 모읍니다.
+        """
+        thread_id = config["configurable"].get("thread_id")
+        step_patch = update.get("plan_steps", {}).get(step_index, {})
+        result = step_patch.get("result", "")
+        if (
+            not thread_id
+            or step_patch.get("status") not in ("completed", "partial")
+            or estimate_tokens(result) < settings.summary_condense_min_tokens
+        ):
+            return
+        step = {**state["plan_steps"][step_index], **step_patch}
+        references = merge_references(state.get("references"), update.get("references"))
+        task = asyncio.create_task(
+            self._condense(
+                state["initial_request"],
+                f"Step {step_index} ({step['task']})",
+                result,
+                format_reference_list(references, step.get("reference_ids") or []),
+            )
+        )
+        self._condense_tasks.setdefault(thread_id, {})[step_index] = task
+        logger.info("단계 %s 결과 요약을 백그라운드에서 시작합니다.", step_index)
+
+    async def _condense(
+        self, initial_request: str, step_title: str, step_result: str, references: str
+    ) -> str:
+        prompt = PromptTemplate.from_template(CONDENSE_PROMPT).format(
+            initial_request=initial_request,
+            step_title=step_title,
+            step_result=step_result,
+            references=references or "(none)",
+            max_words=settings.summary_condensed_max_words,
+        )
+        try:
+            agent = create_react_agent(model=self.llm, tools=[])
+            response = await agent.ainvoke({"messages": prompt})
+            return f"{step_title}: {response['messages'][-1].content}"
+        except Exception as e:
+            logger.warning(f"{step_title} 결과 요약 실패, 원문을 잘라서 사용합니다: {e}")
+            return f"{step_title}: " + truncate_to_tokens(
+                step_result, settings.summary_condense_min_tokens
+            )
+
+    def _cancel_condense_tasks(self, thread_id: Optional[str]) -> None:
+        for task in self._condense_tasks.pop(thread_id, {}).values():
+            task.cancel()
+
+    async def _execute_step(
+        self,
+        current_step_index: int,
+        current_step_info: PlanStepState,
+        run_usage: Optional[Dict[str, int]],
+        references: Optional[Dict[str, Dict]],
+        config: RunnableConfig,
+    ) -> Dict:
+        """단계 하나를 ReAct 에이전트로 실행하고 그래프 상태 업데이트를 반환합니다."""
+        logger.info(
+            "단계 %s 실행 시작: %s", current_step_index, current_step_info["task"]
+        )
 
         prompt = PromptTemplate.from_template(EXECUTION_PROMPT)
         formatted_prompt = prompt.format(
@@ -314,97 +655,194 @@ class SearchAgent:
             current_step_info_action=current_step_info["action"],
         )
 
+        thread_id = config["configurable"].get("thread_id")
+        step_budget, run_budget = budgets_from_config(config)
+        tracker = BudgetTracker(
+            step_budget=step_budget,
+            run_budget=run_budget,
+            run_usage=dict(run_usage or {}),
+            run_deadline=run_deadline_from_config(config),
+            stop_event=self._stop_events.get(thread_id),
+        )
+
         final_answer = ""
-        ai_message = None
-        updated_steps = deepcopy(steps)
+        step_patch: Dict = {}
+        reference_updates: Dict[str, Dict] = {}
+        exhausted: Optional[str] = None
 
         try:
-            logger.info("MCP 클라이언트 및 React 에이전트 호출 중...")
-            async with MultiServerMCPClient(
-                {
-                    "firecrawl-mcp": {
-                        "command": "npx",
-                        "args": ["-y", "firecrawl-mcp"],
-                        "env": {"FIRECRAWL_API_KEY": os.getenv("FIRECRAWL_API_KEY")},
-                    },
-                    "tavily-mcp": {
-                        "command": "npx",
-                        "args": ["-y", "tavily-mcp@0.1.2"],
-                        "env": {"TAVILY_API_KEY": os.getenv("TAVILY_API_KEY")},
-                    },
-                }
-            ) as client:
-                agent = create_react_agent(model=self.llm, tools=client.get_tools())
-                response = await agent.ainvoke({"messages": formatted_prompt})
-                final_answer = response["messages"][-1].content
-                ai_message = AIMessage(
-                    content=final_answer
-                )  # AIMessage(content=response["messages"][-1].content) 와 동일
-
-                # updated_steps = deepcopy(steps) # 성공 시에만 복사하는 것보다 위에서 미리 복사
-                updated_steps[current_step_index]["steps"] = (
-                    updated_steps[current_step_index].get("steps", [])
-                    + response["messages"]
-                )
-                updated_steps[current_step_index]["result"] = (
-                    updated_steps[current_step_index].get("result", "") + final_answer
+            logger.info("MCP 도구 선택 및 React 에이전트 호출 중...")
+            step_text = f"{current_step_info['task']} {current_step_info['action']}"
+            # 단계에 필요한 도구만 골라 매 LLM 호출의 도구 스키마를 줄입니다.
+            tools = await select_tools(self.mcp_pool, step_text)
+            # 스크랩한 페이지가 매 반복마다 그대로 재전송되지 않도록 도구 출력을 distill 합니다.
+            tools = distill_tools(
+                tools, query=step_text, blob_store=self.blob_store, thread_id=thread_id
+            )
+            agent = create_react_agent(model=self.llm, tools=tools)
+            messages, exhausted = await self._run_step_agent(
+                agent, formatted_prompt, tracker
+            )
+
+            if exhausted:
+                final_answer = self._partial_answer(messages, exhausted)
+                status = "partial"
+                logger.warning(
+                    "단계 %s 예산 소진(%s). 모은 결과까지만 남깁니다.",
+                    current_step_index,
+                    exhausted,
                 )
-                updated_steps[current_step_index]["status"] = "completed"
-                logger.info(f"단계 {current_step_index} 실행 완료.")
+            else:
+                final_answer = messages[-1].content
+                status = "completed"
+                logger.info("단계 %s 실행 완료.", current_step_index)
+
+            reference_updates = index_references(
+                references,
+                (
+                    reference
+                    for message in messages
+                    if isinstance(message, ToolMessage)
+                    and isinstance(message.artifact, dict)
+                    for reference in message.artifact.get("references", [])
+                ),
+                current_step_index,
+            )
+
+            # 도구 호출과 스크랩 결과를 포함한 전체 대화 기록은 BlobStore로 보내고 id만 남깁니다.
+            step_patch = {
+                "transcript_ref": await asyncio.to_thread(
+                    self.blob_store.put, messages_to_dict(messages), thread_id
+                ),
+                "result": current_step_info.get("result", "") + final_answer,
+                "status": status,
+                "reference_ids": list(reference_updates),
+            }
 
         except Exception as e:
             logger.error(
-                f"단계 {current_step_index} 실행 중 LLM 또는 도구 호출 실패: {e}",
+                "단계 %s 실행 중 LLM 또는 도구 호출 실패: %s",
+                current_step_index,
+                e,
                 exc_info=True,
             )
             final_answer = f"Error: Could not get execution description from LLM - {e}"
-            ai_message = AIMessage(content=final_answer)
-
-            updated_steps[current_step_index]["steps"] = updated_steps[
-                current_step_index
-            ].get("steps", []) + [ai_message]
-            updated_steps[current_step_index]["result"] = (
-                updated_steps[current_step_index].get("result", "") + final_answer
-            )
-            updated_steps[current_step_index]["status"] = "blocked"
+            step_patch = {
+                "result": current_step_info.get("result", "") + final_answer,
+                "status": "blocked",
+            }
 
-        logger.debug(
-            f"단계 {current_step_index} 실행 결과 (final_answer): {final_answer}"
+        step_patch["budget"] = tracker.report(exhausted)
+        logger.info(
+            "단계 %s 사용량: %s", current_step_index, step_patch["budget"]["usage"]
         )
-
-        existing_step_results = state.get("step_result", [])
-        if isinstance(
-            existing_step_results, str
-        ):  # 이전 결과가 문자열일 경우 리스트로 변환 (방어 코드)
-            logger.warning(
-                f"step_result가 문자열이었습니다. 리스트로 변환합니다: {existing_step_results}"
-            )
-            existing_step_results = [existing_step_results]
-
-        step_result_with_index = (
-            f"Step {current_step_index} ({current_step_info['task']}): {final_answer}"
+        logger.debug(
+            "단계 %s 실행 결과 (final_answer): %s", current_step_index, final_answer
         )
-        updated_step_results = existing_step_results + [step_result_with_index]
 
+        # 단계 결과 본문은 plan_steps[i]["result"]에만 두고, messages에는 짧은 상태 메시지만 남깁니다.
         return {
-            "plan_steps": updated_steps,
-            "step_result": updated_step_results,
-            "messages": ([ai_message] if ai_message else []),
+            "plan_steps": {current_step_index: step_patch},
+            "budget_usage": dict(tracker.usage),
+            "references": reference_updates,
+            "messages": [
+                AIMessage(
+                    content=f"Step {current_step_index} {step_patch['status']}: {current_step_info['task']}"
+                )
+            ],
         }
 
-    def finalize_node(self, state: PlanningGraphState) -> Dict:
-        logger.info("--- 노드: 계획 종료 및 요약 ---")
+    async def _run_step_agent(
+        self, agent, formatted_prompt: str, tracker: BudgetTracker
+    ):
+        """
+        ReAct 에이전트를 values 스트림으로 실행하면서 매 전이마다 예산을 확인합니다.
+
+        Returns:
+            (지금까지의 메시지 목록, 예산 소진 사유 또는 None)
+        """
+        messages: List[BaseMessage] = []
+        stop_waiter: Optional[asyncio.Task] = None
+        running = True
 
-        step_results_list = state.get("step_result", [])
-        logger.debug(f"요약할 step_result: {step_results_list}")
+        def expire_on_stop(waiter: asyncio.Task) -> None:
+            if running and not waiter.cancelled():
+                timeout.reschedule(0)
 
-        if isinstance(step_results_list, list):
-            step_result_str = "\\n\\n".join(step_results_list)
+        try:
+            async with asyncio.timeout(tracker.remaining_seconds()) as timeout:
+                if tracker.stop_event is not None:
+                    # 중단 요청이 오면 진행 중인 LLM/도구 호출도 기다리지 않고 끊습니다.
+                    stop_waiter = asyncio.create_task(tracker.stop_event.wait())
+                    stop_waiter.add_done_callback(expire_on_stop)
+                async for chunk in agent.astream(
+                    {"messages": formatted_prompt}, stream_mode="values"
+                ):
+                    messages = chunk["messages"]
+                    tracker.observe(messages)
+                    last = messages[-1]
+                    if isinstance(last, AIMessage) and not last.tool_calls:
+                        # 에이전트가 최종 답변을 냈으면 한도와 관계없이 완료입니다.
+                        continue
+                    exhausted = tracker.exhausted()
+                    if exhausted:
+                        return messages, exhausted
+        except TimeoutError:
+            return messages, tracker.exhausted() or "deadline"
+        finally:
+            running = False
+            if stop_waiter is not None:
+                stop_waiter.cancel()
+        return messages, None
+
+    @staticmethod
+    def _partial_answer(messages: List[BaseMessage], exhausted: str) -> str:
+        """예산이 소진된 단계에서 그때까지 모은 중간 답변과 도구 출력을 결과로 만듭니다."""
+        parts = [f"[Partial result: budget exhausted ({exhausted})]"]
+        for message in messages:
+            if isinstance(message, AIMessage) and message.content:
+                parts.append(str(message.content))
+            elif isinstance(message, ToolMessage) and message.content:
+                parts.append(
+                    f"Tool {message.name} output:\n"
+                    f"{str(message.content)[:PARTIAL_TOOL_OUTPUT_CHARS]}"
+                )
+        return "\n\n".join(parts)
+
+    async def finalize_node(
+        self, state: PlanningGraphState, config: RunnableConfig
+    ) -> Dict:
+        logger.info("--- 노드: 계획 종료 및 요약 ---")
+
+        plan_steps = state.get("plan_steps") or []
+        references = state.get("references") or {}
+        step_results_list = [
+            f"Step {i} ({step['task']}): {step['result']}"
+            for i, step in enumerate(plan_steps)
+            if step.get("result")
+        ]
+        condensed_patch: Dict[int, Dict] = {}
+        thread_id = config["configurable"].get("thread_id")
+        if (
+            estimate_tokens("".join(step_results_list))
+            <= settings.summary_single_call_max_tokens
+        ):
+            # 작은 실행은 단계 결과 원문으로 한 번에 요약합니다.
+            self._cancel_condense_tasks(thread_id)
         else:
-            logger.warning(
-                f"step_result가 리스트가 아닙니다: {type(step_results_list)}. 문자열로 변환합니다."
+            step_results_list, condensed_patch = await self._condensed_step_results(
+                state, thread_id
+            )
+        logger.debug("요약할 step_result: %s", step_results_list)
+        step_result_str = "\\n\\n".join(step_results_list)
+
+        step_reference_ids = list(
+            dict.fromkeys(
+                ref_id
+                for step in plan_steps
+                for ref_id in step.get("reference_ids") or []
             )
-            step_result_str = str(step_results_list)
+        )[:MAX_SUMMARY_REFERENCES]
 
         prompt_template = PromptTemplate.from_template(SUMMARY_PROMPT)
 
@@ -413,6 +851,8 @@ class SearchAgent:
             formatted_prompt_str = prompt_template.format(
                 initial_request=state["initial_request"],
                 step_result=step_result_str,
+                references=format_reference_list(references, step_reference_ids)
+                or "(none)",
             )
         except KeyError as e:
             logger.error(
@@ -427,12 +867,12 @@ class SearchAgent:
             }
 
         logger.info("LLM 호출: 최종 요약 요청...")
-        logger.debug(f"요약 프롬프트: {formatted_prompt_str[:500]}...")
+        logger.debug("요약 프롬프트: %s...", formatted_prompt_str[:500])
 
         llm_response_content = ""
         try:
             agent = create_react_agent(model=self.llm, tools=[])
-            response = agent.invoke({"messages": formatted_prompt_str})
+            response = await agent.ainvoke({"messages": formatted_prompt_str})
             llm_response_content = response["messages"][-1].content
             logger.info("최종 요약 생성 LLM 호출 완료.")
         except Exception as e:
@@ -443,115 +883,161 @@ class SearchAgent:
                 "messages": [AIMessage(content=error_summary)],
             }
 
-        logger.debug(f"LLM으로부터 받은 전체 응답: {llm_response_content}")
-
-        # LLM 응답에서 텍스트 요약과 참조 목록(JSON) 분리 시도
-        text_summary_part = llm_response_content
-        references_part_json = []
-
-        # "References" 또는 번역된 유사 키워드를 찾아 분리 (SUMMARY_PROMPT의 지침에 따라)
-        # 여기서는 "References"를 기준으로 하지만, 실제 LLM 출력에 따라 조정 필요
-        references_keywords = [
-            "References",
-            "참고 자료",
-            "Sources",
-            "출처",
-        ]  # 다양한 언어/표현 고려
-        references_section_content = ""
-
-        for keyword in references_keywords:
-            references_idx = llm_response_content.rfind(
-                f"\\n{keyword}\\n"
-            )  # 줄바꿈으로 구분된 섹션 제목 가정
-            if references_idx == -1:  # 단순 키워드로도 찾아보기
-                references_idx = llm_response_content.rfind(keyword)
-
-            if references_idx != -1:
-                # 키워드 이후의 내용을 참조 섹션으로 간주
-                potential_references_block = llm_response_content[
-                    references_idx + len(keyword) :
-                ].strip()
-                # ```json ... ``` 블록 찾기
-                json_block_start = potential_references_block.find("```json")
-                if json_block_start != -1:
-                    json_block_end = potential_references_block.find(
-                        "```", json_block_start + len("```json")
-                    )
-                    if json_block_end != -1:
-                        references_section_content = potential_references_block[
-                            json_block_start + len("```json") : json_block_end
-                        ].strip()
-                        text_summary_part = llm_response_content[
-                            :references_idx
-                        ].strip()  # 참조 섹션 이전까지를 요약으로 간주
-                        logger.info(
-                            f"'{keyword}' 키워드로 참조 목록 섹션 후보를 찾았습니다."
-                        )
-                        break
-                elif potential_references_block.startswith(
-                    "["
-                ) and potential_references_block.endswith(
-                    "]"
-                ):  # ```json 없이 바로 배열 시작/종료
-                    references_section_content = potential_references_block
-                    text_summary_part = llm_response_content[:references_idx].strip()
-                    logger.info(
-                        f"'{keyword}' 키워드로 JSON 배열 형식의 참조 목록 섹션 후보를 찾았습니다."
-                    )
-                    break
+        logger.debug("LLM으로부터 받은 전체 응답: %s", llm_response_content)
+        # 본문 뒤의 참고 자료 노트(id별 관련성 설명)는 떼어 references의 description으로 씁니다.
+        llm_response_content, reference_notes = split_reference_notes(
+            llm_response_content
+        )
 
-        if references_section_content:
-            try:
-                references_part_json = json.loads(references_section_content)
-                if isinstance(references_part_json, list):
-                    logger.info(
-                        f"참조 목록 JSON 파싱 성공: {len(references_part_json)}개 항목."
-                    )
-                else:
-                    logger.warning(
-                        f"참조 목록이 JSON 배열이 아닙니다: {type(references_part_json)}. 빈 리스트로 처리합니다."
-                    )
-                    references_part_json = []
-            except json.JSONDecodeError as e:
-                logger.warning(
-                    f"참조 목록 JSON 파싱 실패: {e}. 원본 참조 섹션 내용을 텍스트 요약에 포함합니다."
-                )
-                # 파싱 실패 시, 해당 블록을 요약의 일부로 되돌리거나, 별도 텍스트 필드에 저장할 수 있음
-                # 여기서는 text_summary_part가 이미 references_idx 이전으로 설정되었으므로, 파싱 실패한 내용은 버려지거나,
-                # text_summary_part = llm_response_content # 전체를 다시 요약으로 할당하는 등의 처리가 필요.
-                # 현재는 파싱 실패시 references_part_json는 빈 리스트로 유지.
-        else:
-            logger.info(
-                "LLM 응답에서 참조 목록 섹션을 찾지 못했거나 내용이 없습니다. 전체 응답을 텍스트 요약으로 간주합니다."
+        # 참고 자료 목록은 LLM이 다시 쓰게 하지 않고, 본문에서 인용한 id로 서버가 만듭니다.
+        cited_ids = [
+            ref_id
+            for ref_id in cited_reference_ids(llm_response_content)
+            if ref_id in references
+        ]
+        if not cited_ids and step_reference_ids:
+            logger.warning(
+                "요약에 인용된 참고 자료 id가 없습니다. 단계에서 수집한 참고 자료를 모두 첨부합니다."
             )
-            text_summary_part = llm_response_content  # 참조 섹션 못 찾으면 전체가 요약
+            cited_ids = step_reference_ids
+        references_list = assemble_references(references, cited_ids, reference_notes)
+        logger.info(f"참고 자료 {len(references_list)}개를 최종 요약에 첨부합니다.")
 
         final_structured_summary = {
-            "text_summary": text_summary_part,
-            "references": references_part_json,
+            "text_summary": llm_response_content,
+            "references": references_list,
         }
 
-        logger.debug(f"구조화된 최종 요약: {final_structured_summary}")
-        # AIMessage의 content는 문자열이어야 하므로, 최종 사용자에게 보여줄 형태나 주요 정보를 문자열로 만듭니다.
-        # 여기서는 text_summary_part를 대표로 사용하거나, 혹은 전체 구조를 JSON 문자열로 변환하여 전달할 수 있습니다.
-        # ProjectService에서 구조화된 데이터를 직접 사용하므로, AIMessage는 간략화 하거나 text_summary만 담도록 합니다.
+        logger.debug("구조화된 최종 요약: %s", final_structured_summary)
+        await self._record_plan_outcome(state, references_list, config)
+        # ProjectService에서 구조화된 데이터를 직접 사용하므로, AIMessage에는 text_summary만 담습니다.
         return {
             "final_summary": final_structured_summary,
-            "messages": [AIMessage(content=text_summary_part)],
+            "plan_steps": condensed_patch or None,
+            "messages": [AIMessage(content=llm_response_content)],
         }
 
-    async def setup_graph(self, db_path: str = "./memory/contents_research.db"):
+    async def _condensed_step_results(
+        self, state: PlanningGraphState, thread_id: Optional[str]
+    ) -> Tuple[List[str], Dict[int, Dict]]:
+        """
+        큰 실행의 map-reduce 요약 입력을 만듭니다.
+
+        단계 실행 중 시작한 요약 태스크를 기다리고, 요약이 없는 큰 단계(재개된 실행 등)는
+        여기서 동시에 요약합니다. 합친 결과가 여전히 크면 SUMMARY_REDUCE_FAN_IN개씩 묶어
+        다시 요약합니다.
+
+        Returns:
+            (단계별 결과 목록, 체크포인트에 남길 condensed_result 패치)
+        """
+        plan_steps = state.get("plan_steps") or []
+        references = state.get("references") or {}
+        pending = self._condense_tasks.pop(thread_id, {})
+        jobs: Dict[int, asyncio.Future] = {}
+        parts: Dict[int, str] = {}
+        for i, step in enumerate(plan_steps):
+            result = step.get("result")
+            if not result:
+                continue
+            title = f"Step {i} ({step['task']})"
+            if step.get("condensed_result"):
+                parts[i] = step["condensed_result"]
+            elif i in pending:
+                jobs[i] = pending.pop(i)
+            elif estimate_tokens(result) >= settings.summary_condense_min_tokens:
+                jobs[i] = asyncio.ensure_future(
+                    self._condense(
+                        state["initial_request"],
+                        title,
+                        result,
+                        format_reference_list(references, step.get("reference_ids") or []),
+                    )
+                )
+            else:
+                parts[i] = f"{title}: {result}"
+        for task in pending.values():
+            task.cancel()
+
+        logger.info(f"최종 요약 전 단계 결과 {len(jobs)}개 요약을 기다립니다.")
+        condensed = await asyncio.gather(*jobs.values())
+        condensed_patch = {}
+        for i, text in zip(jobs, condensed):
+            parts[i] = text
+            condensed_patch[i] = {"condensed_result": text}
+
+        results = [parts[i] for i in sorted(parts)]
+        level = 0
+        while (
+            len(results) > 1
+            and estimate_tokens("".join(results))
+            > settings.summary_single_call_max_tokens
+        ):
+            level += 1
+            fan_in = max(settings.summary_reduce_fan_in, 2)
+            groups = [results[i : i + fan_in] for i in range(0, len(results), fan_in)]
+            logger.info(f"요약 {level}단계 축소: {len(results)}개 -> {len(groups)}개")
+            results = list(
+                await asyncio.gather(
+                    *(
+                        self._condense(
+                            state["initial_request"],
+                            f"Condensed group {level}-{n}",
+                            "\n\n".join(group),
+                            "",
+                        )
+                        for n, group in enumerate(groups)
+                    )
+                )
+            )
+        return results, condensed_patch
+
+    async def _record_plan_outcome(
+        self, state: PlanningGraphState, references: List, config: RunnableConfig
+    ) -> None:
+        """모든 단계가 완료되고 참고 자료를 얻은 계획을 계획 라이브러리에 반영합니다."""
+        if self.plan_library is None:
+            return
+        steps = state.get("plan_steps") or []
+        succeeded = bool(steps) and bool(references) and all(
+            step.get("status") == "completed" for step in steps
+        )
+        template_id = state.get("plan_template_id")
+        try:
+            # 라이브러리 파일 쓰기는 이벤트 루프 밖에서 합니다.
+            if template_id:
+                await asyncio.to_thread(
+                    self.plan_library.record_outcome, template_id, succeeded
+                )
+            elif succeeded:
+                await asyncio.to_thread(
+                    self.plan_library.record_success,
+                    state["initial_request"],
+                    steps,
+                    config["configurable"].get("user_id"),
+                )
+        except Exception as e:
+            logger.warning(f"계획 라이브러리 갱신 실패: {e}", exc_info=True)
+
+    async def setup_graph(
+        self, db_path: Optional[str] = None, checkpoint_maintenance: bool = True
+    ):
+        db_path = db_path or settings.checkpoint_db_path
         logger.info(f"데이터베이스 경로 {db_path}로 그래프 설정 시작...")
-        conn = await aiosqlite.connect(db_path)
-        checkpointer = AsyncSqliteSaver(conn)
-        logger.info("AsyncSqliteSaver 초기화 완료.")
+        self.checkpoint_store = CheckpointStore(
+            db_path,
+            blob_store=self.blob_store,
+            extra_live_threads=self._live_threads,
+        )
+        checkpointer = await self.checkpoint_store.open()
+        self.checkpoint_store.start_maintenance(retention=checkpoint_maintenance)
+        logger.info("체크포인트 저장소 초기화 완료.")
 
         workflow = StateGraph(PlanningGraphState)
 
-        workflow.add_node("create_plan", self.create_plan_node)
-        workflow.add_node("identify_step", self.identify_step_node)
-        workflow.add_node("execute_step", self.execute_step_node)
-        workflow.add_node("finalize", self.finalize_node)
+        workflow.add_node("create_plan", traced_node("create_plan", self.create_plan_node))
+        workflow.add_node("identify_step", traced_node("identify_step", self.identify_step_node))
+        workflow.add_node("execute_step", traced_node("execute_step", self.execute_step_node))
+        workflow.add_node("finalize", traced_node("finalize", self.finalize_node))
         logger.info("워크플로우에 노드 추가 완료.")
 
         workflow.set_entry_point("create_plan")
@@ -578,69 +1064,279 @@ class SearchAgent:
         workflow.add_edge("finalize", END)
         logger.info("워크플로우 엣지 설정 완료.")
 
-        self.app = workflow.compile(checkpointer=checkpointer)
+        self.apps = {
+            "none": workflow.compile(),
+            "memory": workflow.compile(checkpointer=self.memory_saver),
+            "sqlite": workflow.compile(checkpointer=checkpointer),
+        }
+        self.app = self.apps["sqlite"]
         logger.info("워크플로우 컴파일 완료.")
 
+    async def close(self) -> None:
+        """MCP 서버 연결과 체크포인트 DB 연결을 닫습니다."""
+        await self.mcp_pool.close()
+        if self.checkpoint_store is not None:
+            await self.checkpoint_store.close()
+
+    async def _flush_memory_snapshot(self, config: Dict) -> None:
+        """메모리 체크포인트의 마지막 스냅샷 하나만 SQLite 체크포인터에 기록합니다."""
+        checkpoint_tuple = await self.memory_saver.aget_tuple(config)
+        if checkpoint_tuple is None:
+            logger.warning("플러시할 메모리 체크포인트가 없습니다.")
+            return
+        configurable = checkpoint_tuple.config["configurable"]
+        await self.checkpoint_store.saver.aput(
+            {
+                "configurable": {
+                    "thread_id": configurable["thread_id"],
+                    "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                }
+            },
+            checkpoint_tuple.checkpoint,
+            checkpoint_tuple.metadata,
+            checkpoint_tuple.checkpoint["channel_versions"],
+        )
+        logger.info(
+            f"메모리 체크포인트 최종 스냅샷을 SQLite에 기록했습니다: {configurable['thread_id']}"
+        )
+
+    async def find_checkpoint_mode(self, config: Dict) -> Optional[str]:
+        """스레드의 체크포인트가 남아 있는 모드(memory 우선, 다음 sqlite)를 찾습니다."""
+        for mode in ("memory", "sqlite"):
+            snapshot = await self.apps[mode].aget_state(config)
+            if snapshot.values:
+                return mode
+        return None
+
+    async def _prepare_resume(self, app, config: Dict) -> Optional[Dict]:
+        """
+        기존 체크포인트에서 이어서 실행할 수 있는지 확인합니다.
+
+        Returns:
+            재개 방법을 담은 dict. 체크포인트가 없으면 None.
+            - {"resumable": True}: astream(None)으로 마지막 정상 체크포인트부터 이어서 실행
+            - {"resumable": False, "values": ...}: 모든 단계가 완료된 실행
+        """
+        snapshot = await app.aget_state(config)
+        if not snapshot.values:
+            return None
+
+        if snapshot.next:
+            logger.info(
+                f"중단된 실행을 재개합니다. 다음 노드: {snapshot.next}"
+            )
+            return {"resumable": True}
+
+        steps = snapshot.values.get("plan_steps") or []
+        retry_patch = {
+            i: {
+                "status": "not_started",
+                "result": "",
+                "transcript_ref": None,
+                "budget": None,
+                "reference_ids": [],
+                "condensed_result": None,
+            }
+            for i, step in enumerate(steps)
+            if step.get("status") in RETRYABLE_STEP_STATUSES
+        }
+        if not retry_patch:
+            return {"resumable": False, "values": snapshot.values}
+
+        logger.info(
+            f"완료되지 않은 단계 {sorted(retry_patch)}만 다시 실행하도록 체크포인트를 갱신합니다."
+        )
+        # create_plan 직후 상태로 기록해 identify_step부터 다시 진행되도록 합니다.
+        await app.aupdate_state(
+            config,
+            # 재개한 실행은 예산 사용량을 새로 셉니다.
+            {"plan_steps": retry_patch, "final_summary": None, "budget_usage": None},
+            as_node="create_plan",
+        )
+        return {"resumable": True}
+
+    async def _delete_thread(self, checkpoint_mode: str, thread_id: str) -> None:
+        if checkpoint_mode == "memory":
+            self.memory_saver.delete_thread(thread_id)
+            self._retained_memory_threads.pop(thread_id, None)
+        elif checkpoint_mode == "sqlite":
+            await self.checkpoint_store.delete_thread(thread_id)
+
+    @asynccontextmanager
+    async def _thread_lock(self, thread_id: str):
+        """
+        같은 thread_id의 실행을 한 번에 하나씩만 진행합니다.
+
+        동일한 요청이 동시에 들어오면 같은 결정적 thread_id를 받으므로, 서로의 체크포인트를
+        이어 실행하거나 stop 이벤트/선행 실행/요약 태스크와 스레드를 지우지 않도록 나중
+        요청은 먼저 온 실행이 끝날 때까지 기다립니다. 프로세스 안에서만 유효합니다.
+        """
+        lock, users = self._thread_locks.get(thread_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._thread_locks[thread_id] = (lock, users + 1)
+        if lock.locked():
+            logger.info(
+                "스레드 %s의 실행이 이미 진행 중입니다. 끝날 때까지 기다립니다.", thread_id
+            )
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._thread_locks[thread_id]
+            if users <= 1:
+                del self._thread_locks[thread_id]
+            else:
+                self._thread_locks[thread_id] = (lock, users - 1)
+
+    def _live_threads(self) -> List[str]:
+        """SQLite 체크포인트 밖에서 아직 블롭을 참조할 수 있는 스레드."""
+        return [*self._retained_memory_threads, *self._thread_locks]
+
+    def _retain_memory_thread(self, thread_id: str) -> None:
+        self._retained_memory_threads[thread_id] = True
+        self._retained_memory_threads.move_to_end(thread_id)
+        while len(self._retained_memory_threads) > MAX_RETAINED_MEMORY_THREADS:
+            evicted, _ = self._retained_memory_threads.popitem(last=False)
+            self.memory_saver.delete_thread(evicted)
+
     async def run_async(
-        self, initial_state: Dict, config: Dict, output_json_path: str = "test.json"
+        self,
+        initial_state: Dict,
+        config: Dict,
+        output_json_path: Optional[str] = None,
+        checkpoint_mode: Optional[str] = None,
+        persist_snapshot: bool = False,
+        resume_only: bool = False,
+        export_snapshot: Optional[bool] = None,
+        budget: Optional[Dict] = None,
+        stop_event: Optional[asyncio.Event] = None,
     ):
-        if not self.app:
+        """
+        그래프를 실행하고 최종 상태 값을 반환합니다.
+
+        같은 thread_id의 체크포인트가 남아 있으면 마지막 정상 체크포인트부터 재개하며,
+        blocked/not_started 단계만 다시 실행합니다. 모든 단계가 완료된 스레드는
+        resume_only이면 저장된 결과를 그대로 반환하고, 아니면 새로 실행합니다.
+
+        export_snapshot이 켜져 있으면(기본값: SEARCH_SNAPSHOT_EXPORT) 최종 상태를
+        백그라운드 스레드에서 gzip JSON으로 저장합니다. 경로를 지정하지 않으면
+        SEARCH_SNAPSHOT_DIR/<thread_id>.json.gz 에 저장합니다.
+
+        budget({"step": {...}, "run": {...}})으로 단계/실행 예산 기본값을 덮어쓸 수 있습니다.
+        예산이 소진된 단계는 partial, 실행 예산 소진으로 시작하지 못한 단계는 skipped가 되고,
+        사용량은 최종 상태의 budget_usage와 각 단계의 budget에 남습니다.
+
+        stop_event가 set 되면 진행 중인 단계를 partial로 끊고 남은 단계는 skipped로 둔 채
+        그때까지의 결과로 요약합니다 (클라이언트 연결 종료 시 부분 결과 저장용).
+        태스크 자체를 취소하면 요약 없이 즉시 중단됩니다.
+        """
+        if not self.apps:
             logger.error(
                 "그래프가 설정되지 않았습니다. setup_graph()를 먼저 호출해야 합니다."
             )
             raise RuntimeError("Graph not set up. Call setup_graph() first.")
 
-        logger.info(f"--- 그래프 비동기 스트림 실행 시작 ---")
-        logger.debug(f"초기 상태: {initial_state}")
-        logger.debug(f"설정: {config}")
-        logger.debug(f"출력 JSON 경로: {output_json_path}")
-
-        async for output in self.app.astream(initial_state, config):
-            node_name = list(output.keys())[0]
-            node_output = output[node_name]
-            logger.info(f"노드 '{node_name}'로부터 출력:")
-
-            if "messages" in node_output and node_output["messages"]:
-                last_msg = node_output["messages"][-1]
-                log_content = str(getattr(last_msg, "content", ""))[:300]
-                logger.debug(
-                    f"  >> 마지막 메시지 ({type(last_msg).__name__}): {log_content}"
-                )
-            if (
-                "step_result" in node_output and node_output["step_result"]
-            ):  # step_result가 비어있지 않은 경우만 로깅
-                log_step_result = str(node_output["step_result"])[:300]
-                logger.debug(f"  >> 단계 결과: {log_step_result}")
-            if "plan_steps" in node_output and node_output["plan_steps"]:
-                logger.debug(
-                    f"  >> 계획 단계 업데이트됨: {len(node_output['plan_steps'])} 단계"
-                )
-            if "final_summary" in node_output and node_output["final_summary"]:
-                logger.debug(
-                    f"  >> 최종 요약: {str(node_output['final_summary'])[:300]}"
-                )
+        checkpoint_mode = checkpoint_mode or settings.search_checkpoint_mode
+        if checkpoint_mode not in CHECKPOINT_MODES:
+            raise ValueError(
+                f"checkpoint_mode must be one of {CHECKPOINT_MODES}, got {checkpoint_mode!r}"
+            )
+        app = self.apps[checkpoint_mode]
+
+        logger.info(f"--- 그래프 비동기 스트림 실행 시작 (체크포인트: {checkpoint_mode}) ---")
+        logger.debug("초기 상태: %s", initial_state)
+        logger.debug("설정: %s", config)
+
+        thread_id = config["configurable"]["thread_id"]
+        configurable = {**config["configurable"]}
+        if budget:
+            configurable["budget"] = budget
+        _, run_budget = budgets_from_config({"configurable": configurable})
+        config = {**config, "configurable": configurable}
+
+        async with self._thread_lock(thread_id):
+            # 실행 마감 시각은 같은 스레드의 앞선 실행을 기다린 시간을 빼고 계산합니다.
+            if run_budget.deadline_seconds > 0:
+                configurable["run_deadline"] = time.time() + run_budget.deadline_seconds
+            graph_input: Optional[Dict] = initial_state
+            if checkpoint_mode != "none":
+                resume = await self._prepare_resume(app, config)
+                if resume is None:
+                    if resume_only:
+                        raise LookupError(f"No checkpoint found for thread {thread_id}")
+                elif resume["resumable"]:
+                    graph_input = None
+                elif resume_only:
+                    logger.info("이미 완료된 실행입니다. 저장된 최종 상태를 반환합니다.")
+                    return resume["values"]
+                else:
+                    logger.info("이전 실행이 완료된 스레드입니다. 체크포인트를 지우고 새로 실행합니다.")
+                    await self._delete_thread(checkpoint_mode, thread_id)
 
-        logger.info("그래프 실행 완료. 최종 상태 스냅샷 저장 중...")
-        snapshot = await self.app.aget_state(config)
-        data = snapshot.values if hasattr(snapshot, "values") else snapshot
+            if stop_event is not None:
+                self._stop_events[thread_id] = stop_event
 
-        try:
-            with open(output_json_path, "w", encoding="utf-8") as fp:
-                json.dump(
-                    data,
-                    fp,
-                    ensure_ascii=False,
-                    indent=2,
-                    default=self._to_json_serializable,
+            # 체크포인터가 없는 모드에서도 최종 상태를 얻을 수 있도록 values 스트림을 함께 받습니다.
+            data: Dict = {}
+            succeeded = False
+            try:
+                async for stream_mode, output in app.astream(
+                    graph_input, config, stream_mode=["updates", "values"]
+                ):
+                    if stream_mode == "values":
+                        data = output
+                        continue
+                    node_name = list(output.keys())[0]
+                    node_output = output[node_name]
+                    logger.info("노드 '%s'로부터 출력:", node_name)
+
+                    if "messages" in node_output and node_output["messages"]:
+                        last_msg = node_output["messages"][-1]
+                        log_content = str(getattr(last_msg, "content", ""))[:300]
+                        logger.debug(
+                            "  >> 마지막 메시지 (%s): %s",
+                            type(last_msg).__name__,
+                            log_content,
+                        )
+                    if "plan_steps" in node_output and node_output["plan_steps"]:
+                        logger.debug(
+                            "  >> 계획 단계 업데이트됨: %s 단계",
+                            len(node_output["plan_steps"]),
+                        )
+                    if "final_summary" in node_output and node_output["final_summary"]:
+                        logger.debug(
+                            "  >> 최종 요약: %s", str(node_output["final_summary"])[:300]
+                        )
+
+                logger.info("그래프 실행 완료. 최종 상태 스냅샷 저장 중...")
+                if checkpoint_mode == "memory" and persist_snapshot:
+                    await self._flush_memory_snapshot(config)
+                succeeded = not any(
+                    step.get("status") in RETRYABLE_STEP_STATUSES
+                    for step in data.get("plan_steps") or []
                 )
-            logger.info(f"최종 상태 스냅샷을 '{output_json_path}'에 저장했습니다.")
-        except IOError as e:
-            logger.error(
-                f"'{output_json_path}'에 최종 상태 스냅샷 저장 실패: {e}", exc_info=True
-            )
-        except TypeError as e:
-            logger.error(
-                f"JSON 직렬화 중 오류 발생 (최종 상태 저장 실패): {e}", exc_info=True
+            finally:
+                # 그래프가 중간에 끝나 쓰이지 않은 선행 실행/요약 태스크가 남아 있으면 정리합니다.
+                self._cancel_speculative_step(thread_id)
+                self._cancel_condense_tasks(thread_id)
+                self._stop_events.pop(thread_id, None)
+                if checkpoint_mode == "memory":
+                    # 실패했거나 blocked 단계가 남은 실행은 같은 프로세스에서의 재시도가
+                    # 이어서 실행할 수 있도록 남겨둡니다.
+                    if succeeded:
+                        self.memory_saver.delete_thread(thread_id)
+                        self._retained_memory_threads.pop(thread_id, None)
+                    else:
+                        self._retain_memory_thread(thread_id)
+
+        if export_snapshot is None:
+            export_snapshot = settings.search_snapshot_export
+        if export_snapshot:
+            export_snapshot_in_background(
+                data,
+                output_json_path
+                or snapshot_path(settings.search_snapshot_dir, thread_id),
             )
 
         return data
@@ -660,8 +1356,10 @@ async def main():
 
     # run_async 내부에서 로깅이 수행됩니다.
     await search_agent_instance.run_async(
-        initial_state, config, "search_output.json"
+        initial_state, config, "search_output.json.gz", export_snapshot=True
     )  # 출력 파일명 변경
+    await wait_for_pending_exports()
+    await search_agent_instance.close()
 
 
 if __name__ == "__main__":
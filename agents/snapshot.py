@@ -0,0 +1,99 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+from typing import Any, Optional, Set
+
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_SUFFIX = ".json.gz"
+
+# 진행 중인 백그라운드 저장 작업. 태스크가 GC 되지 않도록 참조를 유지합니다.
+_pending_exports: Set[asyncio.Task] = set()
+
+
+def to_json_serializable(obj):
+    """
+    Fallback serializer for json.dumps so that LangChain message objects
+    (HumanMessage, AIMessage, etc.) become JSON‑friendly.
+    """
+    from langchain_core.messages import BaseMessage
+
+    if isinstance(obj, BaseMessage):
+        return {
+            "type": obj.__class__.__name__,
+            "content": getattr(obj, "content", ""),
+            "additional_kwargs": getattr(obj, "additional_kwargs", {}),
+        }
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def snapshot_path(directory: str, thread_id: str) -> str:
+    return os.path.join(directory, f"{thread_id}{SNAPSHOT_SUFFIX}")
+
+
+def write_snapshot(data: Any, path: str) -> str:
+    """최종 상태를 공백 없는 JSON + gzip으로 저장합니다. 임시 파일에 쓴 뒤 교체합니다."""
+    payload = json.dumps(
+        data,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=to_json_serializable,
+    ).encode("utf-8")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wb", compresslevel=6) as fp:
+        fp.write(payload)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(path: str) -> Any:
+    with gzip.open(path, "rb") as fp:
+        return json.loads(fp.read().decode("utf-8"))
+
+
+async def _export(data: Any, path: str) -> None:
+    try:
+        await asyncio.to_thread(write_snapshot, data, path)
+        logger.info(f"최종 상태 스냅샷을 '{path}'에 저장했습니다.")
+    except (IOError, TypeError) as e:
+        logger.error(f"'{path}'에 최종 상태 스냅샷 저장 실패: {e}", exc_info=True)
+
+
+def export_snapshot_in_background(data: Any, path: str) -> asyncio.Task:
+    """
+    이벤트 루프를 막지 않도록 스냅샷 직렬화/압축/쓰기를 스레드에서 수행하는 태스크를 예약합니다.
+    호출자는 결과를 기다리지 않아도 됩니다.
+    """
+    task = asyncio.create_task(_export(data, path))
+    _pending_exports.add(task)
+    task.add_done_callback(_pending_exports.discard)
+    return task
+
+
+async def wait_for_pending_exports() -> None:
+    """종료 시점 등에서 아직 끝나지 않은 스냅샷 저장을 기다립니다."""
+    if _pending_exports:
+        await asyncio.gather(*list(_pending_exports), return_exceptions=True)
+
+
+def main(argv: Optional[list] = None) -> None:
+    """사용법: python -m agents.snapshot <snapshot.json.gz> [--key plan_steps]"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(main.__doc__)
+        sys.exit(1)
+    data = read_snapshot(argv[0])
+    if len(argv) == 3 and argv[1] == "--key":
+        data = data.get(argv[2])
+    print(json.dumps(data, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
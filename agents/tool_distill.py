@@ -0,0 +1,272 @@
+"""
+ReAct 컨텍스트에 들어가기 전 도구 출력(스크랩한 페이지, 검색 결과)을 줄이는 단계.
+
+HTML은 텍스트로 바꾸고, 메뉴/쿠키 안내 같은 보일러플레이트 줄을 지운 뒤,
+단계의 task/action과 가까운 청크만 토큰 상한 안에서 골라 원래 순서대로 이어 붙입니다.
+원본 출력은 BlobStore에 그대로 보관하고, 원본에서 뽑은 참고 자료와 함께
+ToolMessage.artifact({"raw_ref": ..., "references": [...]})에 남깁니다.
+"""
+
+import asyncio
+import re
+from typing import Any, Dict, List, Optional
+
+import html2text
+import numpy as np
+from bs4 import BeautifulSoup
+from langchain_core.tools import BaseTool, StructuredTool
+
+from agents.blob_store import BlobStore
+from agents.references import extract_references
+from agents.result_cache import embed_text
+from core.config import settings
+from core.logger import get_logger
+from core.tracing import tracer
+
+logger = get_logger(__name__)
+
+HTML_PATTERN = re.compile(r"<(html|body|div|p|article|section|span|a)\b", re.I)
+BOILERPLATE_TAGS = (
+    "script",
+    "style",
+    "noscript",
+    "nav",
+    "header",
+    "footer",
+    "aside",
+    "form",
+    "iframe",
+    "svg",
+)
+BOILERPLATE_LINE_PATTERNS = [
+    re.compile(p, re.I)
+    for p in (
+        r"\bcookies?\b",
+        r"\b(sign|log) ?(in|up)\b",
+        r"\bsubscribe\b",
+        r"\bnewsletter\b",
+        r"\bprivacy policy\b",
+        r"\bterms of (use|service)\b",
+        r"all rights reserved",
+        r"^\s*(©|copyright)",
+        r"\bshare (on|this)\b",
+        r"skip to (main )?content",
+        r"로그인|회원가입|구독하기|개인정보처리방침|이용약관|무단 전재",
+    )
+]
+# 링크만 있는 줄(메뉴, 태그 목록 등)
+LINK_ONLY_LINE = re.compile(r"^\s*([*\-|]\s*)*(\[[^\]]*\]\([^)]*\)\s*[|·•,/\-]?\s*)+$")
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수. ASCII는 4자당 1토큰, 한글 등은 2자당 1토큰으로 셉니다."""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) // 2 + 1
+
+
+def html_to_text(content: str) -> str:
+    if not HTML_PATTERN.search(content):
+        return content
+    soup = BeautifulSoup(content, "html.parser")
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    converter = html2text.HTML2Text()
+    converter.ignore_images = True
+    converter.ignore_emphasis = True
+    converter.body_width = 0
+    return converter.handle(str(soup))
+
+
+def strip_boilerplate(text: str) -> str:
+    lines = []
+    seen = set()
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            lines.append("")
+            continue
+        if LINK_ONLY_LINE.match(stripped):
+            continue
+        # 짧은 줄에서만 패턴을 봅니다. 본문 문장에 'cookie'가 들어간 경우까지 지우지 않도록.
+        if len(stripped) < 120 and any(
+            p.search(stripped) for p in BOILERPLATE_LINE_PATTERNS
+        ):
+            continue
+        if stripped in seen:
+            continue
+        seen.add(stripped)
+        lines.append(stripped)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def chunk_text(text: str, chunk_chars: int) -> List[str]:
+    """빈 줄 단위 문단을 chunk_chars 안에서 합칩니다. 제목(#)은 새 청크를 시작합니다."""
+    chunks: List[str] = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > chunk_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:chunk_chars])
+            paragraph = paragraph[chunk_chars:]
+        if current and (
+            paragraph.startswith("#") or len(current) + len(paragraph) + 2 > chunk_chars
+        ):
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def select_chunks(chunks: List[str], query: str, max_tokens: int) -> List[str]:
+    """query와 유사도가 높은 청크부터 토큰 상한까지 고른 뒤, 원래 순서로 돌려줍니다."""
+    if not chunks:
+        return []
+    query_vector = embed_text(query)
+    scores = np.array([float(embed_text(chunk) @ query_vector) for chunk in chunks])
+    selected, used = [], 0
+    for index in np.argsort(-scores):
+        tokens = estimate_tokens(chunks[index])
+        if used + tokens > max_tokens:
+            if not selected:
+                # 가장 관련 있는 청크 하나는 잘라서라도 남깁니다.
+                selected.append(int(index))
+            continue
+        selected.append(int(index))
+        used += tokens
+    return [chunks[i] for i in sorted(selected)]
+
+
+def distill_text(
+    content: str,
+    query: str,
+    max_tokens: Optional[int] = None,
+    chunk_chars: Optional[int] = None,
+) -> str:
+    max_tokens = max_tokens or settings.tool_output_max_tokens
+    chunk_chars = chunk_chars or settings.tool_output_chunk_chars
+    text = strip_boilerplate(html_to_text(content))
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    selected = select_chunks(chunk_text(text, chunk_chars), query, max_tokens)
+    return truncate_to_tokens("\n\n[...]\n\n".join(selected), max_tokens)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """선택한 청크 하나가 상한보다 큰 경우를 위한 최종 상한."""
+    # estimate_tokens("")도 1이므로 상한이 0 이하이면 아래 루프가 끝나지 않습니다.
+    if max_tokens <= 0:
+        return ""
+    while estimate_tokens(text) > max_tokens:
+        text = text[: int(len(text) * max_tokens / estimate_tokens(text) * 0.95)]
+    return text
+
+
+def distill_tool_content(content: Any, query: str) -> Any:
+    """MCP 도구 출력(str 또는 str 리스트)을 같은 형태로 distill 합니다."""
+    if isinstance(content, str):
+        return distill_text(content, query)
+    if isinstance(content, list):
+        max_tokens = max(
+            settings.tool_output_max_tokens // max(len(content), 1), 200
+        )
+        return [
+            distill_text(item, query, max_tokens) if isinstance(item, str) else item
+            for item in content
+        ]
+    return content
+
+
+def _content_length(content: Any) -> int:
+    if isinstance(content, list):
+        return sum(len(item) for item in content if isinstance(item, str))
+    return len(content) if isinstance(content, str) else 0
+
+
+def distill_tools(
+    tools: List[BaseTool],
+    query: str,
+    blob_store: BlobStore,
+    concurrency: Optional[int] = None,
+    thread_id: Optional[str] = None,
+) -> List[BaseTool]:
+    """
+    도구 출력이 ReAct 메시지에 들어가기 전에 distill 되도록 도구들을 감쌉니다.
+
+    원본 출력은 blob_store에 thread_id 소유로 보관하고, 결과 ToolMessage.artifact에 raw_ref와
+    원본에서 뽑은 참고 자료를 남깁니다. TOOL_DISTILL_ENABLED가 꺼져 있으면
+    출력은 그대로 두고 원본 보관과 참고 자료 수집만 합니다.
+
+    LLM이 한 턴에 여러 도구 호출을 내면 ToolNode가 동시에 실행하므로, 감싼 도구들은
+    하나의 세마포어를 공유해 단계당 동시 호출 수를 concurrency로 제한합니다.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.step_tool_concurrency)
+    return [
+        _distill_tool(tool, query, blob_store, semaphore, thread_id) for tool in tools
+    ]
+
+
+def _distill_tool(
+    tool: BaseTool,
+    query: str,
+    blob_store: BlobStore,
+    semaphore: asyncio.Semaphore,
+    thread_id: Optional[str] = None,
+) -> BaseTool:
+    async def call_tool(**arguments: Dict[str, Any]):
+        with tracer.span("tool.call", tool=tool.name) as tool_span:
+            return await _call_tool(tool_span, arguments)
+
+    async def _call_tool(tool_span, arguments: Dict[str, Any]):
+        async with semaphore:
+            tool_span.set_attribute("semaphore_wait_ms", round(tool_span.elapsed_ms(), 3))
+            if getattr(tool, "coroutine", None) is not None:
+                result = await tool.coroutine(**arguments)
+                content = (
+                    result[0]
+                    if tool.response_format == "content_and_artifact"
+                    else result
+                )
+            else:
+                content = await tool.ainvoke(arguments)
+
+        raw_ref = await asyncio.to_thread(
+            blob_store.put,
+            {"tool": tool.name, "arguments": arguments, "content": content},
+            thread_id,
+        )
+        references = await asyncio.to_thread(extract_references, arguments, content)
+        artifact = {"raw_ref": raw_ref, "references": references}
+        tool_span.set_attributes(
+            content_chars=_content_length(content), references=len(references)
+        )
+        if not settings.tool_distill_enabled:
+            return content, artifact
+
+        # 검색어 등 도구 인자도 관련도 판단에 함께 씁니다.
+        tool_query = f"{query} {' '.join(str(v) for v in arguments.values())}"
+        distilled = await asyncio.to_thread(distill_tool_content, content, tool_query)
+        tool_span.set_attribute("distilled_chars", _content_length(distilled))
+        logger.debug(
+            "도구 %s 출력 distill: %s자 -> %s자 (raw_ref=%s, 참고 자료 %s개)",
+            tool.name,
+            _content_length(content),
+            _content_length(distilled),
+            raw_ref[:12],
+            len(references),
+        )
+        return distilled, artifact
+
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        coroutine=call_tool,
+        response_format="content_and_artifact",
+    )
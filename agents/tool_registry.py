@@ -0,0 +1,146 @@
+"""
+단계별 도구 선택(tool routing).
+
+MCP 서버의 도구들을 기능(capability) 단위로 등록해 두고, 계획 단계의 task/action 문장에서
+필요한 기능만 골라 그 기능을 제공하는 도구만 ReAct 에이전트에 넘깁니다. 기능이 겹치는 도구는
+우선순위가 가장 높은 하나만 보내므로 매 LLM 호출의 도구 스키마가 줄어듭니다.
+
+새 MCP 서버(이미지/영상/음악 검색 등)를 추가할 때는 mcp_pool.default_mcp_servers에 연결을,
+여기 CAPABILITIES에 기능과 키워드를 등록하면 해당 기능이 필요한 단계에만 도구가 전달됩니다.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.tools import BaseTool
+
+from agents.mcp_pool import McpPool
+from core.config import settings
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class Capability:
+    name: str
+    # action/task 문장에 이 키워드가 있으면 기능이 필요하다고 봅니다. (소문자 비교)
+    # "find", "찾", "추천", "수집"처럼 거의 모든 단계에 들어가는 말은 넣지 않습니다.
+    keywords: Tuple[str, ...]
+    # (서버 이름, 도구 이름) 우선순위 순. 사용 가능한 첫 도구만 쓰고,
+    # use_all이면 사용 가능한 도구를 모두 씁니다 (예: 크롤 시작 + 상태 조회).
+    tools: Tuple[Tuple[str, str], ...]
+    use_all: bool = False
+
+
+CAPABILITIES: Tuple[Capability, ...] = (
+    Capability(
+        name="web_search",
+        keywords=(
+            "search",
+            "look up",
+            "google",
+            "keyword",
+            "검색",
+            "키워드",
+        ),
+        tools=(("tavily-mcp", "tavily-search"), ("firecrawl-mcp", "firecrawl_search")),
+    ),
+    Capability(
+        name="scrape",
+        keywords=(
+            "url",
+            "scrape",
+            "web page",
+            "webpage",
+            "page",
+            "visit",
+            "lyrics",
+            "article",
+            "페이지",
+            "방문",
+            "스크랩",
+            "본문",
+            "가사",
+            "기사",
+        ),
+        tools=(("firecrawl-mcp", "firecrawl_scrape"),),
+    ),
+    Capability(
+        name="extract",
+        keywords=("extract", "structured data", "추출"),
+        tools=(("tavily-mcp", "tavily-extract"), ("firecrawl-mcp", "firecrawl_extract")),
+    ),
+    Capability(
+        name="crawl",
+        keywords=("crawl", "sitemap", "entire site", "크롤", "사이트 전체"),
+        tools=(
+            ("firecrawl-mcp", "firecrawl_map"),
+            ("firecrawl-mcp", "firecrawl_crawl"),
+            ("firecrawl-mcp", "firecrawl_check_crawl_status"),
+        ),
+        use_all=True,
+    ),
+)
+
+# 어떤 기능에도 해당하지 않는 단계("비슷한 곡 찾기" 등 일반 조사)에 줄 기본 기능
+DEFAULT_CAPABILITIES = ("web_search", "scrape")
+
+
+def route_capabilities(text: str) -> List[Capability]:
+    lowered = text.lower()
+    selected = [
+        capability
+        for capability in CAPABILITIES
+        if any(keyword in lowered for keyword in capability.keywords)
+    ]
+    if not selected:
+        selected = [c for c in CAPABILITIES if c.name in DEFAULT_CAPABILITIES]
+    return selected
+
+
+async def _server_tools(
+    pool: McpPool, server_name: str, cache: Dict[str, Optional[Dict[str, BaseTool]]]
+) -> Optional[Dict[str, BaseTool]]:
+    if server_name not in cache:
+        try:
+            cache[server_name] = {
+                tool.name: tool for tool in await pool.tools(server_name)
+            }
+        except Exception as e:
+            logger.warning(f"MCP 서버 {server_name}를 사용할 수 없습니다: {e}")
+            cache[server_name] = None
+    return cache[server_name]
+
+
+async def select_tools(pool: McpPool, text: str) -> List[BaseTool]:
+    """
+    단계 설명(text)에 필요한 최소 도구 목록을 반환합니다.
+
+    TOOL_ROUTING_ENABLED가 꺼져 있으면 모든 서버의 도구를 반환합니다.
+    """
+    if not settings.tool_routing_enabled:
+        return await pool.all_tools()
+
+    capabilities = route_capabilities(text)
+    cache: Dict[str, Optional[Dict[str, BaseTool]]] = {}
+    selected: Dict[str, BaseTool] = {}
+    for capability in capabilities:
+        for server_name, tool_name in capability.tools:
+            tools = await _server_tools(pool, server_name, cache)
+            tool = tools.get(tool_name) if tools else None
+            if tool is None:
+                continue
+            selected.setdefault(tool_name, tool)
+            if not capability.use_all:
+                break
+
+    if not selected:
+        # 등록된 도구를 하나도 쓸 수 없으면(서버 도구 이름 변경 등) 전체 도구로 대체합니다.
+        logger.warning("라우팅으로 선택된 도구가 없어 사용 가능한 전체 도구를 사용합니다.")
+        return await pool.all_tools()
+
+    logger.info(
+        f"도구 라우팅: 기능 {[c.name for c in capabilities]} -> 도구 {list(selected)}"
+    )
+    return list(selected.values())
@@ -1,11 +1,76 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import uvicorn
 import os
 
-from routers import idea_router, project_router
+from core.admission import AdmissionMiddleware
+from core.config import settings
+from core.idempotency import idempotency_store
+from core.logger import get_logger
+from core.loop_monitor import LoopBlockGuardMiddleware, loop_monitor
+from core.metrics import span_metrics_exporter
+from core.tracing import TracingMiddleware, tracer
+from routers import (
+    admin_router,
+    idea_router,
+    job_router,
+    metrics_router,
+    project_router,
+)
+
+logger = get_logger(__name__)
+
+
+async def warm_up(app: FastAPI) -> None:
+    """검색 에이전트를 미리 준비하고, 끝나면 readiness를 올립니다."""
+    warmup = app.state.warmup
+    start = time.perf_counter()
+    try:
+        if settings.warmup_search_agent:
+            warmup.update(await project_router.warm_up_project_service())
+    except Exception as e:
+        # 실패해도 첫 요청에서 다시 초기화하므로 서비스는 계속 받습니다.
+        warmup["error"] = str(e)
+        logger.error(f"Warm-up 실패: {e}", exc_info=True)
+    warmup["total_seconds"] = round(time.perf_counter() - start, 3)
+    app.state.ready = True
+    logger.info(f"Warm-up 완료: {warmup}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.warmup = {}
+    if settings.loop_monitor_enabled or settings.loop_block_fail_ms > 0:
+        loop_monitor.start()
+    # 서버는 바로 요청을 받고(아이디어 라우트는 warm-up과 무관), warm-up은 백그라운드에서 진행합니다.
+    warmup_task = asyncio.create_task(warm_up(app))
+    yield
+    warmup_task.cancel()
+    await asyncio.gather(warmup_task, return_exceptions=True)
+    await loop_monitor.stop()
+    await job_router.shutdown_job_service()
+    await project_router.shutdown_project_service()
+    await idempotency_store.close()
+    tracer.shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+
+# 테스트용 strict 모드: 핸들러가 루프를 LOOP_BLOCK_FAIL_MS보다 오래 막으면 요청을 실패시킵니다.
+# 핸들러 구간만 재도록 가장 안쪽(먼저 추가)에 둡니다.
+if settings.loop_block_fail_ms > 0:
+    app.add_middleware(LoopBlockGuardMiddleware)
+
+# LLM 라우트 동시 실행 제한. 나중에 추가한 미들웨어가 바깥에서 실행되므로 CORS보다 먼저
+# 추가해, 429 응답에도 CORS 헤더가 붙게 합니다.
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -14,12 +79,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
 
+# 요청별 루트 span. 가장 바깥에서 실행되도록 마지막에 추가해 admission 대기 시간도 포함합니다.
+app.add_middleware(TracingMiddleware)
+
 
 # 라우터 포함
 app.include_router(idea_router.router, prefix="/ideas", tags=["Ideas"])
 app.include_router(project_router.router, prefix="/projects", tags=["Projects"])
+app.include_router(job_router.router, prefix="/jobs", tags=["Jobs"])
+app.include_router(admin_router.router, prefix="/admin", tags=["Admin"])
+
+if settings.metrics_enabled:
+    tracer.add_exporter(span_metrics_exporter)
+    app.include_router(metrics_router.router, tags=["Metrics"])
 
 
 @app.get("/")
@@ -27,5 +102,12 @@ async def root():
     return {"message": "Welcome to FastAPI application"}
 
 
+@app.get("/ready")
+async def ready():
+    """warm-up이 끝나면 200, 그 전에는 503 (로드밸런서 readiness probe용)."""
+    body = {"ready": app.state.ready, "warmup": app.state.warmup}
+    return JSONResponse(body, status_code=200 if app.state.ready else 503)
+
+
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
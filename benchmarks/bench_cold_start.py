@@ -0,0 +1,120 @@
+"""
+API 서버 콜드 스타트 벤치마크.
+
+매 측정마다 새 파이썬 프로세스를 띄워 다음을 잽니다.
+  - import app            : 서버 모듈 임포트 시간과, 그때 로드된 무거운 모듈
+  - import search_agent   : warm-up(또는 첫 /projects_* 요청)이 추가로 치르는 임포트 시간
+  - lifespan -> ready     : lifespan 시작부터 warm-up이 끝나 /ready가 200이 되기까지 (--warmup)
+
+사용법:
+    python -m benchmarks.bench_cold_start --runs 5
+    WARMUP_MCP_SERVERS=false python -m benchmarks.bench_cold_start --runs 3 --warmup
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = (
+    "agents.search_agent",
+    "langgraph",
+    "langchain_core",
+    "langchain_google_genai",
+    "langchain_mcp_adapters",
+    "numpy",
+)
+
+IMPORT_APP = f"""
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+IMPORT_SEARCH_AGENT = """
+import json, time
+import app
+start = time.perf_counter()
+import agents.search_agent
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+LIFESPAN_READY = """
+import asyncio, json, time
+start = time.perf_counter()
+import app as app_module
+
+async def main():
+    app = app_module.app
+    lifespan_start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        while not app.state.ready:
+            await asyncio.sleep(0.01)
+        ready = time.perf_counter()
+        warmup = dict(app.state.warmup)
+    print(json.dumps({
+        "seconds": ready - lifespan_start,
+        "process_seconds": ready - start,
+        "warmup": warmup,
+    }))
+
+asyncio.run(main())
+"""
+
+
+def run(code: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    # 로거 출력이 섞여 있으므로 마지막 JSON 줄만 읽습니다.
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(name: str, results) -> None:
+    seconds = [r["seconds"] for r in results]
+    print(f"[{name}]")
+    print(f"  runs   : {len(seconds)}")
+    print(f"  median : {statistics.median(seconds) * 1e3:.1f} ms")
+    print(f"  min    : {min(seconds) * 1e3:.1f} ms")
+    print(f"  max    : {max(seconds) * 1e3:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="lifespan warm-up(SearchAgent 준비, MCP 서버 기동)까지 잽니다.",
+    )
+    args = parser.parse_args()
+
+    results = [run(IMPORT_APP) for _ in range(args.runs)]
+    report("import app", results)
+    print(f"  heavy modules loaded at import: {results[-1]['heavy'] or 'none'}")
+
+    report("import agents.search_agent", [run(IMPORT_SEARCH_AGENT) for _ in range(args.runs)])
+
+    if args.warmup:
+        results = [run(LIFESPAN_READY) for _ in range(args.runs)]
+        report("lifespan -> ready", results)
+        print(
+            f"  process start -> ready (median): "
+            f"{statistics.median(r['process_seconds'] for r in results) * 1e3:.1f} ms"
+        )
+        print(f"  last warm-up: {results[-1]['warmup']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+SearchAgent 그래프 상태 전이 비용 벤치마크.
+
+이전 구조(매 전이마다 plan_steps 전체 deepcopy + 단계별 ReAct 메시지/step_result 누적)와
+현재 구조(BlobStore 참조 + 단계 패치)의 전이당 복사 시간과 체크포인트 바이트를 비교합니다.
+
+사용법:
+    python -m benchmarks.bench_state_transitions --steps 5 --page-kb 40
+"""
+
+import argparse
+import time
+from copy import deepcopy
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages import messages_to_dict
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from agents.blob_store import BlobStore
+from agents.search_agent import merge_plan_steps
+
+serde = JsonPlusSerializer()
+
+
+def make_transcript(step: int, tool_calls: int, page_kb: int):
+    page = ("lorem ipsum dolor sit amet " * (page_kb * 40))[: page_kb * 1024]
+    messages = [HumanMessage(content=f"step {step} prompt")]
+    for call in range(tool_calls):
+        messages.append(
+            AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "id": f"call-{step}-{call}",
+                        "name": "firecrawl_scrape",
+                        "args": {"url": f"https://example.com/{step}/{call}"},
+                    }
+                ],
+            )
+        )
+        messages.append(
+            ToolMessage(content=page, tool_call_id=f"call-{step}-{call}")
+        )
+    messages.append(AIMessage(content=f"step {step} answer " * 50))
+    return messages
+
+
+def checkpoint_bytes(state) -> int:
+    return len(serde.dumps_typed(state)[1])
+
+
+def bench_legacy(steps: int, tool_calls: int, page_kb: int):
+    plan_steps = [
+        {
+            "plan_sequence": i + 1,
+            "task": f"task {i}",
+            "action": "action",
+            "status": "not_started",
+            "steps": [],
+            "result": "",
+        }
+        for i in range(steps)
+    ]
+    state = {"plan_steps": plan_steps, "step_result": [], "messages": []}
+    copy_seconds, ckpt_bytes = [], []
+    for i in range(steps):
+        transcript = make_transcript(i, tool_calls, page_kb)
+        answer = transcript[-1].content
+
+        # identify_step
+        start = time.perf_counter()
+        updated = deepcopy(state["plan_steps"])
+        updated[i]["status"] = "in_progress"
+        copy_seconds.append(time.perf_counter() - start)
+        state["plan_steps"] = updated
+        ckpt_bytes.append(checkpoint_bytes(state))
+
+        # execute_step
+        start = time.perf_counter()
+        updated = deepcopy(state["plan_steps"])
+        updated[i]["steps"] = updated[i]["steps"] + transcript
+        updated[i]["result"] = answer
+        updated[i]["status"] = "completed"
+        step_results = state["step_result"] + [f"Step {i}: {answer}"]
+        copy_seconds.append(time.perf_counter() - start)
+        state["plan_steps"] = updated
+        state["step_result"] = step_results
+        state["messages"] = state["messages"] + [AIMessage(content=answer)]
+        ckpt_bytes.append(checkpoint_bytes(state))
+    return copy_seconds, ckpt_bytes
+
+
+def bench_compact(steps: int, tool_calls: int, page_kb: int):
+    blob_store = BlobStore()
+    plan_steps = [
+        {
+            "plan_sequence": i + 1,
+            "task": f"task {i}",
+            "action": "action",
+            "status": "not_started",
+            "transcript_ref": None,
+            "result": "",
+        }
+        for i in range(steps)
+    ]
+    state = {"plan_steps": plan_steps, "messages": []}
+    copy_seconds, ckpt_bytes, offload_seconds = [], [], []
+    for i in range(steps):
+        transcript = make_transcript(i, tool_calls, page_kb)
+        answer = transcript[-1].content
+
+        start = time.perf_counter()
+        state["plan_steps"] = merge_plan_steps(
+            state["plan_steps"], {i: {"status": "in_progress"}}
+        )
+        copy_seconds.append(time.perf_counter() - start)
+        ckpt_bytes.append(checkpoint_bytes(state))
+
+        # 블롭 저장(직렬화 + 해시)은 전이 복사가 아니라 단계당 한 번 드는 비용이므로 따로 잽니다.
+        start = time.perf_counter()
+        transcript_ref = blob_store.put(messages_to_dict(transcript))
+        offload_seconds.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        patch = {
+            "transcript_ref": transcript_ref,
+            "result": answer,
+            "status": "completed",
+        }
+        state["plan_steps"] = merge_plan_steps(state["plan_steps"], {i: patch})
+        copy_seconds.append(time.perf_counter() - start)
+        state["messages"] = state["messages"] + [
+            AIMessage(content=f"Step {i} completed: task {i}")
+        ]
+        ckpt_bytes.append(checkpoint_bytes(state))
+    print(
+        f"(compact) blob offload per step: "
+        f"{sum(offload_seconds) / len(offload_seconds) * 1e3:.3f} ms"
+    )
+    return copy_seconds, ckpt_bytes
+
+
+def report(name: str, copy_seconds, ckpt_bytes):
+    print(f"[{name}]")
+    print(f"  transitions            : {len(copy_seconds)}")
+    print(f"  copy time / transition : {sum(copy_seconds) / len(copy_seconds) * 1e3:.3f} ms")
+    print(f"  max copy time          : {max(copy_seconds) * 1e3:.3f} ms")
+    print(f"  checkpoint bytes (avg) : {sum(ckpt_bytes) / len(ckpt_bytes):,.0f}")
+    print(f"  checkpoint bytes (last): {ckpt_bytes[-1]:,}")
+    print(f"  checkpoint bytes (sum) : {sum(ckpt_bytes):,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--tool-calls", type=int, default=4)
+    parser.add_argument("--page-kb", type=int, default=40)
+    args = parser.parse_args()
+
+    report("legacy (deepcopy)", *bench_legacy(args.steps, args.tool_calls, args.page_kb))
+    report("compact (blob + patch)", *bench_compact(args.steps, args.tool_calls, args.page_kb))
+
+
+if __name__ == "__main__":
+    main()
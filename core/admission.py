@@ -0,0 +1,363 @@
+"""
+LLM/SearchAgent를 쓰는 라우트의 admission control.
+
+라우트를 클래스(stream, report, plan, search, jobs)로 나누고, 클래스마다 전체 동시 실행 수와
+사용자별 동시 실행 수를 제한합니다. 자리가 없으면 요청은 대기열에서 기다리며, 자리가 나면
+사용자별 가중치를 반영한 공정 순서(start-time fair queuing)로 다음 요청을 들여보냅니다.
+대기열이 가득 찼거나 최대 대기 시간이 지나면 429와 Retry-After로 바로 거절합니다.
+
+사용자 식별(X-User-Id 헤더, 쿼리 user_id, 본문 user_id)은 모두 클라이언트가 보내는 값이라
+위조할 수 있습니다. 사용자별 제한은 정상 클라이언트 사이의 공정성을 위한 것이며, 악의적인
+클라이언트를 막으려면 앞단에서 인증된 사용자 id로 X-User-Id를 덮어써야 합니다.
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+
+from core.config import settings
+from core.logger import get_logger
+from core.metrics import registry
+
+logger = get_logger(__name__)
+
+ANONYMOUS_USER = "anonymous"
+WAIT_SAMPLES = 1000
+
+ADMISSION_WAIT = registry.histogram(
+    "admission_wait_seconds",
+    "라우트 클래스별 통과한 요청의 대기 시간 (바로 통과하면 0)",
+    ("class",),
+)
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    # 이 접두사로 시작하는 경로가 이 클래스에 속합니다.
+    path_prefixes: Tuple[str, ...]
+    max_concurrency: int
+    max_per_user: int
+    max_queue: int
+    max_wait_seconds: float
+
+
+def default_route_classes() -> Tuple[RouteClass, ...]:
+    return (
+        RouteClass(
+            "stream",
+            ("/ideas_helper",),
+            settings.admission_stream_concurrency,
+            settings.admission_stream_per_user,
+            settings.admission_queue_max_size,
+            settings.admission_stream_max_wait_seconds,
+        ),
+        RouteClass(
+            "report",
+            ("/ideas_report",),
+            settings.admission_report_concurrency,
+            settings.admission_report_per_user,
+            settings.admission_queue_max_size,
+            settings.admission_max_wait_seconds,
+        ),
+        RouteClass(
+            "plan",
+            ("/projects_plan", "/projects_final"),
+            settings.admission_plan_concurrency,
+            settings.admission_plan_per_user,
+            settings.admission_queue_max_size,
+            settings.admission_max_wait_seconds,
+        ),
+        RouteClass(
+            "search",
+            ("/projects_search_idea",),
+            settings.admission_search_concurrency,
+            settings.admission_search_per_user,
+            settings.admission_queue_max_size,
+            settings.admission_search_max_wait_seconds,
+        ),
+        # 작업 제출은 바로 끝나고 실행은 워커 풀에서 하므로, 사용자별 실행 수는
+        # JobService(JOB_MAX_ACTIVE_PER_USER)가 제한합니다.
+        RouteClass(
+            "jobs",
+            ("/jobs/search",),
+            settings.admission_jobs_concurrency,
+            settings.admission_jobs_per_user,
+            settings.admission_queue_max_size,
+            settings.admission_max_wait_seconds,
+        ),
+    )
+
+
+def parse_user_weights(spec: str) -> Dict[str, float]:
+    """'user_a=2,user_b=0.5' 형태의 사용자별 가중치. 지정하지 않은 사용자는 1입니다."""
+    weights: Dict[str, float] = {}
+    for item in spec.split(","):
+        user_id, _, weight = item.strip().partition("=")
+        if user_id and weight:
+            try:
+                weights[user_id] = max(float(weight), 0.01)
+            except ValueError:
+                logger.warning(f"잘못된 ADMISSION_USER_WEIGHTS 항목을 무시합니다: {item}")
+    return weights
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Waiter:
+    user_id: str
+    sequence: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+    future: asyncio.Future = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+
+class RouteClassLimiter:
+    """라우트 클래스 하나의 동시 실행 제한과 사용자별 공정 대기열."""
+
+    def __init__(self, route_class: RouteClass, weights: Dict[str, float]):
+        self.route_class = route_class
+        self.weights = weights
+        self.in_flight = 0
+        self.queued = 0
+        self._per_user: Dict[str, int] = {}
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._finish_tags: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self._service_seconds = 1.0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+
+    def _has_capacity(self, user_id: str) -> bool:
+        return (
+            self.in_flight < self.route_class.max_concurrency
+            and self._per_user.get(user_id, 0) < self.route_class.max_per_user
+        )
+
+    def _start_tag(self, user_id: str) -> float:
+        return max(self._virtual_time, self._finish_tags.get(user_id, 0.0))
+
+    def _grant(self, user_id: str, waited: float) -> None:
+        start = self._start_tag(user_id)
+        self._finish_tags[user_id] = start + 1.0 / self.weights.get(user_id, 1.0)
+        self._virtual_time = start
+        self.in_flight += 1
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        self.admitted += 1
+        self._waits.append(waited)
+        ADMISSION_WAIT.observe(waited, self.route_class.name)
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.route_class.max_concurrency:
+            candidates = [
+                (self._start_tag(user_id), queue[0].sequence, user_id)
+                for user_id, queue in self._queues.items()
+                if queue and self._per_user.get(user_id, 0) < self.route_class.max_per_user
+            ]
+            if not candidates:
+                return
+            _, _, user_id = min(candidates)
+            waiter = self._queues[user_id].popleft()
+            if not self._queues[user_id]:
+                del self._queues[user_id]
+            self.queued -= 1
+            self._grant(user_id, time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.user_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self.queued -= 1
+            if not queue:
+                del self._queues[waiter.user_id]
+
+    def retry_after(self) -> int:
+        estimate = self._service_seconds * (self.queued + 1) / max(
+            self.route_class.max_concurrency, 1
+        )
+        return max(1, math.ceil(estimate))
+
+    async def acquire(self, user_id: str) -> float:
+        """자리를 얻을 때까지 기다리고 대기 시간을 반환합니다. 거절되면 AdmissionRejected."""
+        if self._has_capacity(user_id):
+            self._grant(user_id, 0.0)
+            return 0.0
+        if self.queued >= self.route_class.max_queue:
+            self.rejected["queue_full"] += 1
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        waiter = _Waiter(user_id, next(self._sequence))
+        self._queues.setdefault(user_id, deque()).append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter.future), self.route_class.max_wait_seconds
+            )
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._remove(waiter)
+                self.rejected["timeout"] += 1
+                raise AdmissionRejected("timeout", self.retry_after())
+        except asyncio.CancelledError:
+            # 기다리던 클라이언트가 떠났습니다. 이미 자리를 받았다면 돌려줍니다.
+            if waiter.future.done():
+                self.release(user_id, 0.0)
+            else:
+                self._remove(waiter)
+            raise
+        return time.monotonic() - waiter.enqueued_at
+
+    def release(self, user_id: str, service_seconds: float) -> None:
+        self.in_flight -= 1
+        remaining = self._per_user.get(user_id, 1) - 1
+        if remaining > 0:
+            self._per_user[user_id] = remaining
+        else:
+            self._per_user.pop(user_id, None)
+        if service_seconds > 0:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * service_seconds
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = list(self._waits)
+        return {
+            "max_concurrency": self.route_class.max_concurrency,
+            "max_per_user": self.route_class.max_per_user,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queued_users": len(self._queues),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "wait_seconds_p50": _percentile(waits, 0.5),
+            "wait_seconds_p95": _percentile(waits, 0.95),
+            "wait_seconds_max": max(waits) if waits else None,
+            "avg_service_seconds": round(self._service_seconds, 3),
+        }
+
+
+class AdmissionController:
+    def __init__(self, route_classes: Optional[Tuple[RouteClass, ...]] = None):
+        weights = parse_user_weights(settings.admission_user_weights)
+        self.limiters: Dict[str, RouteClassLimiter] = {
+            route_class.name: RouteClassLimiter(route_class, weights)
+            for route_class in (route_classes or default_route_classes())
+        }
+
+    def classify(self, path: str) -> Optional[RouteClassLimiter]:
+        for limiter in self.limiters.values():
+            if path.startswith(limiter.route_class.path_prefixes):
+                return limiter
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """
+    분류된 라우트 요청을 AdmissionController로 통과시키는 ASGI 미들웨어.
+
+    사용자는 X-User-Id 헤더, 쿼리의 user_id, JSON 본문의 user_id 순으로 식별합니다.
+    세 값 모두 클라이언트가 정하므로 인증 계층 없이는 위조할 수 있습니다.
+    본문을 읽은 경우 앱에 그대로 다시 전달하고, 이후 receive는 원래 채널로 넘겨
+    클라이언트 연결 종료 감지가 그대로 동작하게 합니다. 자리는 응답이 끝날 때
+    (스트리밍이면 스트림이 끝날 때) 반환합니다.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        limiter = (
+            self.controller.classify(scope["path"]) if scope["type"] == "http" else None
+        )
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        user_id, receive = await self._identify(scope, receive)
+        try:
+            waited = await limiter.acquire(user_id)
+        except AdmissionRejected as e:
+            logger.warning(
+                f"Admission 거절 ({limiter.route_class.name}, {e.reason}): "
+                f"user_id={user_id}, Retry-After={e.retry_after}s"
+            )
+            response = JSONResponse(
+                {"detail": "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요."},
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        if waited > 0:
+            logger.info(
+                f"Admission 대기 {waited:.2f}s ({limiter.route_class.name}, user_id={user_id})"
+            )
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(user_id, time.monotonic() - started)
+
+    @staticmethod
+    async def _identify(scope, receive):
+        for name, value in scope.get("headers", []):
+            if name == b"x-user-id" and value:
+                return value.decode("latin-1"), receive
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("user_id"):
+            return query["user_id"][0], receive
+        if scope.get("method") != "POST":
+            return ANONYMOUS_USER, receive
+
+        messages = []
+        body = b""
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        try:
+            user_id = json.loads(body).get("user_id") if body else None
+        except (ValueError, AttributeError):
+            user_id = None
+        return (str(user_id) if user_id else ANONYMOUS_USER), replay
@@ -1 +1,373 @@
- 
\ No newline at end of file
+import os
+from dataclasses import dataclass, field
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class Settings:
+    """환경 변수 기반 서버 설정. 값은 프로세스 시작 시 한 번 읽습니다."""
+
+    # SearchAgent 단계별 대화 기록(transcript)을 보관할 블롭 저장소 디렉터리
+    search_blob_dir: str = field(
+        default_factory=lambda: os.getenv("SEARCH_BLOB_DIR", "./memory/blobs")
+    )
+    # 메모리에 캐시할 블롭 수 (LRU). 디렉터리가 없으면 이 수를 넘는 오래된 블롭은 사라집니다.
+    search_blob_cache_max_items: int = field(
+        default_factory=lambda: _env_int("SEARCH_BLOB_CACHE_MAX_ITEMS", 256)
+    )
+    # 살아 있는 스레드가 참조하지 않는 블롭 파일도 이 시간 동안은 지우지 않습니다
+    # (다른 프로세스에서 실행 중인 검색의 블롭 보호).
+    search_blob_gc_grace_seconds: float = field(
+        default_factory=lambda: _env_float("SEARCH_BLOB_GC_GRACE_SECONDS", 3600.0)
+    )
+
+    # 체크포인트 DB 보존 정책 및 유지보수 주기
+    checkpoint_db_path: str = field(
+        default_factory=lambda: os.getenv(
+            "CHECKPOINT_DB_PATH", "./memory/contents_research.db"
+        )
+    )
+    checkpoint_max_age_hours: float = field(
+        default_factory=lambda: _env_float("CHECKPOINT_MAX_AGE_HOURS", 72.0)
+    )
+    checkpoint_max_threads: int = field(
+        default_factory=lambda: _env_int("CHECKPOINT_MAX_THREADS", 1000)
+    )
+    checkpoint_maintenance_interval_seconds: float = field(
+        default_factory=lambda: _env_float(
+            "CHECKPOINT_MAINTENANCE_INTERVAL_SECONDS", 600.0
+        )
+    )
+
+    # SearchAgent 기본 체크포인트 모드 (none | memory | sqlite)
+    search_checkpoint_mode: str = field(
+        default_factory=lambda: os.getenv("SEARCH_CHECKPOINT_MODE", "memory")
+    )
+
+    # 최종 상태 스냅샷 내보내기 (디버그용, 기본 비활성화)
+    search_snapshot_export: bool = field(
+        default_factory=lambda: _env_bool("SEARCH_SNAPSHOT_EXPORT", False)
+    )
+    search_snapshot_dir: str = field(
+        default_factory=lambda: os.getenv("SEARCH_SNAPSHOT_DIR", "./memory/snapshots")
+    )
+
+    # 검색 작업 큐 (워커 프로세스 수, 동시 실행 수, 대기열 크기, 결과 보관 시간)
+    search_worker_processes: int = field(
+        default_factory=lambda: _env_int("SEARCH_WORKER_PROCESSES", 2)
+    )
+    search_worker_concurrency: int = field(
+        default_factory=lambda: _env_int("SEARCH_WORKER_CONCURRENCY", 2)
+    )
+    job_queue_max_size: int = field(
+        default_factory=lambda: _env_int("JOB_QUEUE_MAX_SIZE", 100)
+    )
+    job_result_ttl_seconds: float = field(
+        default_factory=lambda: _env_float("JOB_RESULT_TTL_SECONDS", 3600.0)
+    )
+    # 사용자별 대기/실행 중인 작업 수 상한 (0이면 무제한)
+    job_max_active_per_user: int = field(
+        default_factory=lambda: _env_int("JOB_MAX_ACTIVE_PER_USER", 2)
+    )
+
+    # SearchAgent 결과 시맨틱 캐시
+    search_cache_enabled: bool = field(
+        default_factory=lambda: _env_bool("SEARCH_CACHE_ENABLED", True)
+    )
+    search_cache_threshold: float = field(
+        default_factory=lambda: _env_float("SEARCH_CACHE_THRESHOLD", 0.9)
+    )
+    search_cache_ttl_seconds: float = field(
+        default_factory=lambda: _env_float("SEARCH_CACHE_TTL_SECONDS", 6 * 3600.0)
+    )
+    search_cache_max_entries: int = field(
+        default_factory=lambda: _env_int("SEARCH_CACHE_MAX_ENTRIES", 1000)
+    )
+    # global | user | project. global은 한 사용자의 검색 결과를 다른 사용자에게도 돌려주므로
+    # 결과가 사용자와 무관한 배포에서만 켭니다.
+    search_cache_scope: str = field(
+        default_factory=lambda: os.getenv("SEARCH_CACHE_SCOPE", "project")
+    )
+
+    # 성공한 검색 계획 템플릿 라이브러리 (사용자별, 기본 비활성화)
+    plan_library_enabled: bool = field(
+        default_factory=lambda: _env_bool("PLAN_LIBRARY_ENABLED", False)
+    )
+    plan_library_path: str = field(
+        default_factory=lambda: os.getenv(
+            "PLAN_LIBRARY_PATH", "./memory/plan_library.json"
+        )
+    )
+
+    # SearchAgent 단계별 예산 (0이면 무제한)
+    step_max_tool_calls: int = field(
+        default_factory=lambda: _env_int("STEP_MAX_TOOL_CALLS", 12)
+    )
+    step_max_llm_iterations: int = field(
+        default_factory=lambda: _env_int("STEP_MAX_LLM_ITERATIONS", 10)
+    )
+    step_max_input_tokens: int = field(
+        default_factory=lambda: _env_int("STEP_MAX_INPUT_TOKENS", 200_000)
+    )
+    step_max_output_tokens: int = field(
+        default_factory=lambda: _env_int("STEP_MAX_OUTPUT_TOKENS", 20_000)
+    )
+    step_deadline_seconds: float = field(
+        default_factory=lambda: _env_float("STEP_DEADLINE_SECONDS", 180.0)
+    )
+
+    # SearchAgent 실행 전체 예산 (0이면 무제한)
+    run_max_tool_calls: int = field(
+        default_factory=lambda: _env_int("RUN_MAX_TOOL_CALLS", 40)
+    )
+    run_max_llm_iterations: int = field(
+        default_factory=lambda: _env_int("RUN_MAX_LLM_ITERATIONS", 40)
+    )
+    run_max_input_tokens: int = field(
+        default_factory=lambda: _env_int("RUN_MAX_INPUT_TOKENS", 800_000)
+    )
+    run_max_output_tokens: int = field(
+        default_factory=lambda: _env_int("RUN_MAX_OUTPUT_TOKENS", 80_000)
+    )
+    run_deadline_seconds: float = field(
+        default_factory=lambda: _env_float("RUN_DEADLINE_SECONDS", 600.0)
+    )
+
+    # 도구 출력 distill (ReAct 컨텍스트에 넣을 결과당 토큰 상한, 관련도 비교용 청크 크기)
+    tool_distill_enabled: bool = field(
+        default_factory=lambda: _env_bool("TOOL_DISTILL_ENABLED", True)
+    )
+    tool_output_max_tokens: int = field(
+        default_factory=lambda: _env_int("TOOL_OUTPUT_MAX_TOKENS", 1500)
+    )
+    tool_output_chunk_chars: int = field(
+        default_factory=lambda: _env_int("TOOL_OUTPUT_CHUNK_CHARS", 1200)
+    )
+
+    # 계획을 스트리밍으로 생성하면서 첫 단계가 완성되는 즉시 먼저 실행
+    search_speculative_first_step: bool = field(
+        default_factory=lambda: _env_bool("SEARCH_SPECULATIVE_FIRST_STEP", True)
+    )
+
+    # 단계별 도구 선택과 MCP 서버 연결 풀
+    tool_routing_enabled: bool = field(
+        default_factory=lambda: _env_bool("TOOL_ROUTING_ENABLED", True)
+    )
+    mcp_start_timeout_seconds: float = field(
+        default_factory=lambda: _env_float("MCP_START_TIMEOUT_SECONDS", 60.0)
+    )
+    # 마지막 응답 확인 후 이 시간이 지난 서버는 도구를 내주기 전에 ping으로 살아 있는지 봅니다.
+    mcp_health_check_interval_seconds: float = field(
+        default_factory=lambda: _env_float("MCP_HEALTH_CHECK_INTERVAL_SECONDS", 30.0)
+    )
+    mcp_ping_timeout_seconds: float = field(
+        default_factory=lambda: _env_float("MCP_PING_TIMEOUT_SECONDS", 5.0)
+    )
+    # 한 단계에서 동시에 실행할 도구 호출 수 (LLM이 한 턴에 여러 호출을 낸 경우)
+    step_tool_concurrency: int = field(
+        default_factory=lambda: _env_int("STEP_TOOL_CONCURRENCY", 4)
+    )
+
+    # 최종 요약 map-reduce (단계 결과 합계가 상한을 넘으면 단계별 요약 후 합쳐서 요약)
+    summary_single_call_max_tokens: int = field(
+        default_factory=lambda: _env_int("SUMMARY_SINGLE_CALL_MAX_TOKENS", 12_000)
+    )
+    summary_condense_min_tokens: int = field(
+        default_factory=lambda: _env_int("SUMMARY_CONDENSE_MIN_TOKENS", 1500)
+    )
+    summary_condensed_max_words: int = field(
+        default_factory=lambda: _env_int("SUMMARY_CONDENSED_MAX_WORDS", 400)
+    )
+    summary_reduce_fan_in: int = field(
+        default_factory=lambda: _env_int("SUMMARY_REDUCE_FAN_IN", 4)
+    )
+
+    # /ideas_helper SSE 모드 (청크 coalesce 창, heartbeat 주기, 재연결용 replay buffer 보관)
+    sse_coalesce_window_ms: float = field(
+        default_factory=lambda: _env_float("SSE_COALESCE_WINDOW_MS", 50.0)
+    )
+    sse_coalesce_max_chars: int = field(
+        default_factory=lambda: _env_int("SSE_COALESCE_MAX_CHARS", 512)
+    )
+    sse_heartbeat_seconds: float = field(
+        default_factory=lambda: _env_float("SSE_HEARTBEAT_SECONDS", 15.0)
+    )
+    sse_retry_ms: int = field(default_factory=lambda: _env_int("SSE_RETRY_MS", 3000))
+    sse_replay_ttl_seconds: float = field(
+        default_factory=lambda: _env_float("SSE_REPLAY_TTL_SECONDS", 300.0)
+    )
+    sse_replay_max_generations: int = field(
+        default_factory=lambda: _env_int("SSE_REPLAY_MAX_GENERATIONS", 500)
+    )
+    # 구독자가 모두 끊긴 SSE 생성을 취소하기까지 기다리는 시간 (재연결 유예)
+    sse_abandon_grace_seconds: float = field(
+        default_factory=lambda: _env_float("SSE_ABANDON_GRACE_SECONDS", 30.0)
+    )
+
+    # 클라이언트 연결 종료 감지 주기와 엔드포인트별 기본 처리 방식 (persist | discard)
+    disconnect_poll_interval_seconds: float = field(
+        default_factory=lambda: _env_float("DISCONNECT_POLL_INTERVAL_SECONDS", 1.0)
+    )
+    idea_helper_on_disconnect: str = field(
+        default_factory=lambda: os.getenv("IDEA_HELPER_ON_DISCONNECT", "persist")
+    )
+    search_on_disconnect: str = field(
+        default_factory=lambda: os.getenv("SEARCH_ON_DISCONNECT", "discard")
+    )
+
+    # /projects_plan, /projects_final, /ideas_report 동시 중복 요청 합치기 (결과 재사용 창)
+    single_flight_result_window_seconds: float = field(
+        default_factory=lambda: _env_float("SINGLE_FLIGHT_RESULT_WINDOW_SECONDS", 5.0)
+    )
+    single_flight_max_results: int = field(
+        default_factory=lambda: _env_int("SINGLE_FLIGHT_MAX_RESULTS", 1000)
+    )
+
+    # Idempotency-Key 응답 저장소 (보관 기간, 실행 중 키의 만료 판단 시간, 다른 워커 대기 주기)
+    idempotency_db_path: str = field(
+        default_factory=lambda: os.getenv(
+            "IDEMPOTENCY_DB_PATH", "./memory/idempotency.db"
+        )
+    )
+    idempotency_ttl_seconds: float = field(
+        default_factory=lambda: _env_float("IDEMPOTENCY_TTL_SECONDS", 24 * 3600.0)
+    )
+    idempotency_lock_timeout_seconds: float = field(
+        default_factory=lambda: _env_float("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", 900.0)
+    )
+    idempotency_poll_interval_seconds: float = field(
+        default_factory=lambda: _env_float("IDEMPOTENCY_POLL_INTERVAL_SECONDS", 0.5)
+    )
+
+    # LLM 라우트 admission control (라우트 클래스별 전체/사용자별 동시 실행 수, 대기열)
+    admission_enabled: bool = field(
+        default_factory=lambda: _env_bool("ADMISSION_ENABLED", True)
+    )
+    admission_stream_concurrency: int = field(
+        default_factory=lambda: _env_int("ADMISSION_STREAM_CONCURRENCY", 32)
+    )
+    admission_stream_per_user: int = field(
+        default_factory=lambda: _env_int("ADMISSION_STREAM_PER_USER", 2)
+    )
+    admission_report_concurrency: int = field(
+        default_factory=lambda: _env_int("ADMISSION_REPORT_CONCURRENCY", 8)
+    )
+    admission_report_per_user: int = field(
+        default_factory=lambda: _env_int("ADMISSION_REPORT_PER_USER", 2)
+    )
+    admission_plan_concurrency: int = field(
+        default_factory=lambda: _env_int("ADMISSION_PLAN_CONCURRENCY", 8)
+    )
+    admission_plan_per_user: int = field(
+        default_factory=lambda: _env_int("ADMISSION_PLAN_PER_USER", 2)
+    )
+    admission_search_concurrency: int = field(
+        default_factory=lambda: _env_int("ADMISSION_SEARCH_CONCURRENCY", 4)
+    )
+    admission_search_per_user: int = field(
+        default_factory=lambda: _env_int("ADMISSION_SEARCH_PER_USER", 1)
+    )
+    # 라우트 클래스별 대기열 크기와 최대 대기 시간 (stream은 대화형이라 짧게)
+    admission_queue_max_size: int = field(
+        default_factory=lambda: _env_int("ADMISSION_QUEUE_MAX_SIZE", 50)
+    )
+    admission_max_wait_seconds: float = field(
+        default_factory=lambda: _env_float("ADMISSION_MAX_WAIT_SECONDS", 30.0)
+    )
+    admission_stream_max_wait_seconds: float = field(
+        default_factory=lambda: _env_float("ADMISSION_STREAM_MAX_WAIT_SECONDS", 10.0)
+    )
+    # 검색은 한 번에 수 분이 걸리므로 대기 시간도 그에 맞춰 길게 둡니다.
+    admission_search_max_wait_seconds: float = field(
+        default_factory=lambda: _env_float("ADMISSION_SEARCH_MAX_WAIT_SECONDS", 300.0)
+    )
+    # 검색 작업 제출(/jobs/search). 제출은 바로 끝나므로 실행 수 제한은 JOB_MAX_ACTIVE_PER_USER가 합니다.
+    admission_jobs_concurrency: int = field(
+        default_factory=lambda: _env_int("ADMISSION_JOBS_CONCURRENCY", 16)
+    )
+    admission_jobs_per_user: int = field(
+        default_factory=lambda: _env_int("ADMISSION_JOBS_PER_USER", 1)
+    )
+    # 사용자별 공정 스케줄링 가중치 ("user_a=2,user_b=0.5", 기본 1)
+    admission_user_weights: str = field(
+        default_factory=lambda: os.getenv("ADMISSION_USER_WEIGHTS", "")
+    )
+
+    # 시작 시 warm-up (SearchAgent/그래프/체크포인트 DB 준비, MCP 서버 미리 띄우기).
+    # 아이디어 라우트만 받는 워커는 WARMUP_SEARCH_AGENT=false로 검색 에이전트 임포트를 건너뜁니다.
+    warmup_search_agent: bool = field(
+        default_factory=lambda: _env_bool("WARMUP_SEARCH_AGENT", True)
+    )
+    warmup_mcp_servers: bool = field(
+        default_factory=lambda: _env_bool("WARMUP_MCP_SERVERS", True)
+    )
+
+    # 트레이싱 (HTTP/Gemini/Supabase/그래프 노드/도구 호출 span).
+    # exporter는 쉼표로 구분: memory(최근 span 보관, /admin/traces), file(JSON Lines)
+    tracing_enabled: bool = field(
+        default_factory=lambda: _env_bool("TRACING_ENABLED", True)
+    )
+    tracing_exporters: str = field(
+        default_factory=lambda: os.getenv("TRACING_EXPORTERS", "memory")
+    )
+    tracing_file_path: str = field(
+        default_factory=lambda: os.getenv("TRACING_FILE_PATH", "./memory/traces.jsonl")
+    )
+    tracing_memory_max_spans: int = field(
+        default_factory=lambda: _env_int("TRACING_MEMORY_MAX_SPANS", 5000)
+    )
+
+    # Prometheus /metrics. 요청/Gemini/Supabase/노드 메트릭은 span에서 집계하므로
+    # TRACING_ENABLED=false여도 span은 만들어집니다 (exporter만 꺼집니다).
+    metrics_enabled: bool = field(
+        default_factory=lambda: _env_bool("METRICS_ENABLED", True)
+    )
+
+    # 로깅 (LOG_OUTPUT: text | json). 쓰기는 백그라운드 스레드가 하고, 큐가 가득 차면 버립니다.
+    # 필드(로그 인자, extra 값)는 LOG_MAX_FIELD_CHARS에서 자르고, DEBUG 로그는
+    # 메시지 템플릿별로 LOG_DEBUG_SAMPLE_RATE 비율만 남깁니다.
+    log_level: str = field(default_factory=lambda: os.getenv("LOG_LEVEL", "INFO"))
+    log_output: str = field(default_factory=lambda: os.getenv("LOG_OUTPUT", "text"))
+    log_max_field_chars: int = field(
+        default_factory=lambda: _env_int("LOG_MAX_FIELD_CHARS", 2000)
+    )
+    log_debug_sample_rate: float = field(
+        default_factory=lambda: _env_float("LOG_DEBUG_SAMPLE_RATE", 1.0)
+    )
+    log_queue_max_size: int = field(
+        default_factory=lambda: _env_int("LOG_QUEUE_MAX_SIZE", 10_000)
+    )
+
+    # 이벤트 루프 지연 모니터. THRESHOLD_MS 이상 막히면 루프 스레드 스택을 로그로 남깁니다.
+    # LOOP_BLOCK_FAIL_MS > 0이면 테스트용 strict 모드: 요청 처리 중 그보다 오래 막히면 요청이 실패합니다.
+    loop_monitor_enabled: bool = field(
+        default_factory=lambda: _env_bool("LOOP_MONITOR_ENABLED", True)
+    )
+    loop_monitor_interval_ms: float = field(
+        default_factory=lambda: _env_float("LOOP_MONITOR_INTERVAL_MS", 100.0)
+    )
+    loop_block_threshold_ms: float = field(
+        default_factory=lambda: _env_float("LOOP_BLOCK_THRESHOLD_MS", 200.0)
+    )
+    loop_block_fail_ms: float = field(
+        default_factory=lambda: _env_float("LOOP_BLOCK_FAIL_MS", 0.0)
+    )
+
+
+settings = Settings()
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+
+from core.config import settings
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# 클라이언트 연결 종료 시 처리 방식: 부분 결과 저장(persist) 또는 폐기(discard)
+DISCONNECT_POLICIES = ("persist", "discard")
+
+
+def disconnect_checker(
+    request: Request, interval: Optional[float] = None
+) -> Callable[[], Awaitable[bool]]:
+    """
+    request.is_disconnected()를 interval초에 한 번만 실제로 확인하는 함수를 만듭니다.
+
+    스트리밍 루프에서 청크마다 호출해도 receive 호출이 청크 수만큼 늘지 않게 합니다.
+    """
+    interval = settings.disconnect_poll_interval_seconds if interval is None else interval
+    last_checked = 0.0
+    disconnected = False
+
+    async def check() -> bool:
+        nonlocal last_checked, disconnected
+        now = time.monotonic()
+        if not disconnected and now - last_checked >= interval:
+            last_checked = now
+            disconnected = await request.is_disconnected()
+        return disconnected
+
+    return check
+
+
+async def run_until_disconnect(
+    request: Request,
+    work: Awaitable[T],
+    on_disconnect: Optional[Callable[[], None]] = None,
+    interval: Optional[float] = None,
+) -> T:
+    """
+    work를 실행하면서 클라이언트 연결 종료를 감시합니다.
+
+    연결이 끊기면 on_disconnect가 있으면 호출한 뒤 work가 끝나기를 기다리고(부분 결과 저장),
+    없으면 work를 취소하고 499 HTTPException을 던집니다.
+    """
+    interval = settings.disconnect_poll_interval_seconds if interval is None else interval
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                return task.result()
+            if not await request.is_disconnected():
+                continue
+            if on_disconnect is None:
+                logger.info(f"클라이언트 연결 종료: {request.url.path} 요청 작업을 취소합니다.")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(
+                    status_code=499, detail="클라이언트 연결이 끊겨 요청을 취소했습니다."
+                )
+            logger.info(
+                f"클라이언트 연결 종료: {request.url.path} 작업을 멈추고 부분 결과를 저장합니다."
+            )
+            on_disconnect()
+            return await task
+    finally:
+        if not task.done():
+            task.cancel()
@@ -5,6 +5,95 @@ from google import genai
 from google.genai import types
 from typing_extensions import Iterator, Union
 
+from core.tracing import Span, tracer
+
+
+def _record_usage(span: Span, response, accumulate: bool = False) -> None:
+    """
+    응답의 usage_metadata에서 토큰 수를 span에 기록합니다. 스트림 청크의 값은 누적값이라
+    덮어쓰고, 함수 호출 후 두 번째 호출처럼 별개의 호출은 accumulate로 더합니다.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for attribute, count in (
+        ("input_tokens", usage.prompt_token_count),
+        ("output_tokens", usage.candidates_token_count),
+        ("thoughts_tokens", usage.thoughts_token_count),
+    ):
+        if accumulate:
+            count = (count or 0) + (span.attributes.get(attribute) or 0)
+        span.set_attribute(attribute, count)
+
+
+async def _traced_stream(stream_coroutine, span_attributes: dict):
+    """
+    스트림 호출을 기다린 뒤 span을 함께 들고 있는 스트림을 돌려줍니다. span은 await하는
+    시점에 열므로, 반환된 코루틴을 기다리지 않고 버리면 span도 생기지 않습니다.
+    """
+    span = tracer.start_span("gemini.process_data", **span_attributes)
+    try:
+        stream = await stream_coroutine
+        return _TracedStream(stream, span)
+    except BaseException as e:
+        tracer.end_span(span, e)
+        raise
+
+
+class _TracedStream:
+    """
+    청크를 읽으며 span에 기록하는 스트림.
+
+    async 제너레이터는 한 번도 순회하지 않으면 finally가 실행되지 않으므로, 읽지 않고
+    닫거나 버린 경우에도 aclose()와 __del__에서 span을 닫습니다.
+    """
+
+    def __init__(self, stream, span: Span):
+        self._stream = stream
+        self._span = span
+        self._iterator = _iterate_stream(stream, span)
+        self._started = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._started = True
+        return await self._iterator.__anext__()
+
+    async def aclose(self) -> None:
+        try:
+            await self._iterator.aclose()
+            if not self._started:
+                aclose = getattr(self._stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        finally:
+            tracer.end_span(self._span, GeneratorExit())
+
+    def __del__(self):
+        # 이미 닫힌 span이면 end_span은 아무 일도 하지 않습니다.
+        tracer.end_span(self._span, GeneratorExit())
+
+
+async def _iterate_stream(stream, span: Span):
+    error = None
+    try:
+        async for chunk in stream:
+            if "first_chunk_ms" not in span.attributes:
+                span.set_attribute("first_chunk_ms", round(span.elapsed_ms(), 3))
+            _record_usage(span, chunk)
+            yield chunk
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if error is not None:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        tracer.end_span(span, error)
+
 
 def process_data(
     data: Union[str, bytes],
@@ -88,39 +177,55 @@ def process_data(
         # thinking_budget=0으로 설정하면 생각 비활성화 :contentReference[oaicite:3]{index=3}
         config.thinking_config = types.ThinkingConfig(thinking_budget=0)
 
+    span_attributes = {
+        "model": model,
+        "stream": stream,
+        "history_messages": len(history) if history else 0,
+        "function_calling": enable_function_calling,
+        "structured_output": enable_structured_output,
+    }
+
     if stream:
         client = genai.Client(api_key=os.getenv("GEMINI_API_KEY")).aio
+        # 스트림은 호출한 쪽이 다 읽거나 닫을 때 끝나므로 span도 그때 닫습니다.
         # generate_content_stream을 호출하면 Iterator[Chunk]를 반환 :contentReference[oaicite:1]{index=1}
-        return client.models.generate_content_stream(
-            model=model, contents=contents, config=config
+        return _traced_stream(
+            client.models.generate_content_stream(
+                model=model, contents=contents, config=config
+            ),
+            span_attributes,
         )
 
-    # 5) 모델 호출 (1차)
-    response = client.models.generate_content(
-        model=model, contents=contents, config=config
-    )
-
-    # 6) Function Calling 후처리 (필요 시)
-    if enable_function_calling and getattr(response, "function_calls", None):
-        call = response.function_calls[0]
-        result = function_map[call.name](**call.arguments)
+    with tracer.span("gemini.process_data", **span_attributes) as span:
+        # 5) 모델 호출 (1차)
         response = client.models.generate_content(
-            model=model,
-            contents=[
-                types.Content(role="model", parts=[types.Part(function_call=call)]),
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_function_response(
-                            name=call.name, response=result
-                        )
-                    ],
-                ),
-            ],
-            config=config,
+            model=model, contents=contents, config=config
         )
+        _record_usage(span, response)
+
+        # 6) Function Calling 후처리 (필요 시)
+        if enable_function_calling and getattr(response, "function_calls", None):
+            call = response.function_calls[0]
+            span.set_attribute("function_call", call.name)
+            result = function_map[call.name](**call.arguments)
+            response = client.models.generate_content(
+                model=model,
+                contents=[
+                    types.Content(role="model", parts=[types.Part(function_call=call)]),
+                    types.Content(
+                        role="user",
+                        parts=[
+                            types.Part.from_function_response(
+                                name=call.name, response=result
+                            )
+                        ],
+                    ),
+                ],
+                config=config,
+            )
+            _record_usage(span, response, accumulate=True)
 
-    return response.text
+        return response.text
 
 
 if __name__ == "__main__":
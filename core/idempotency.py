@@ -0,0 +1,267 @@
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import aiosqlite
+from fastapi import HTTPException
+
+from core.config import settings
+from core.logger import get_logger
+from core.single_flight import request_key
+
+logger = get_logger(__name__)
+
+# 만료 행 정리 주기 (초)
+PURGE_INTERVAL_SECONDS = 60.0
+
+
+@dataclass
+class _Execution:
+    """이 프로세스에서 실행 중인 키 하나의 작업과 그 결과를 기다리는 요청 수."""
+
+    fingerprint: str
+    task: asyncio.Task
+    # 기다리는 요청이 모두 떠났을 때 호출합니다. 없으면 작업을 취소합니다.
+    on_abandon: Optional[Callable[[], None]] = None
+    waiters: int = 0
+
+
+class IdempotencyStore:
+    """
+    Idempotency-Key 별 응답 저장소 (로컬 SQLite).
+
+    - 처음 본 키는 in_progress 행을 만들고 작업을 실행한 뒤 응답을 저장합니다.
+    - 완료된 키로 다시 요청하면 저장된 응답을 그대로 돌려줍니다.
+    - 실행 중인 키로 요청하면 같은 프로세스에서는 진행 중인 작업을, 다른 워커 프로세스에서는
+      DB 행이 완료될 때까지 기다립니다. lock_timeout_seconds가 지나도록 끝나지 않은 행은
+      중단된 것으로 보고 새로 실행합니다.
+    - 실패한 작업은 행을 지워 다음 재시도가 다시 실행할 수 있게 합니다.
+    - 같은 키를 다른 요청 본문에 쓰면 422를 반환합니다.
+    - 작업은 처음 요청한 쪽과 분리된 태스크로 실행됩니다. 기다리던 요청이 취소되어도
+      (클라이언트 연결 종료) 다른 요청이 같은 키를 기다리고 있으면 작업은 계속되고,
+      마지막 요청까지 떠나면 on_abandon을 호출하거나(부분 결과 저장) 작업을 취소합니다.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        lock_timeout_seconds: Optional[float] = None,
+    ):
+        self.db_path = db_path or settings.idempotency_db_path
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None else settings.idempotency_ttl_seconds
+        )
+        self.lock_timeout_seconds = (
+            lock_timeout_seconds
+            if lock_timeout_seconds is not None
+            else settings.idempotency_lock_timeout_seconds
+        )
+        self.conn: Optional[aiosqlite.Connection] = None
+        self._open_lock = asyncio.Lock()
+        self._in_flight: Dict[str, _Execution] = {}
+        self._last_purge = 0.0
+
+    async def _connection(self) -> aiosqlite.Connection:
+        if self.conn is not None:
+            return self.conn
+        async with self._open_lock:
+            if self.conn is None:
+                directory = os.path.dirname(self.db_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = await aiosqlite.connect(self.db_path)
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute("PRAGMA synchronous=NORMAL")
+                await conn.execute("PRAGMA busy_timeout=5000")
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS idempotency_keys (
+                        key TEXT PRIMARY KEY,
+                        fingerprint TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        response TEXT,
+                        started_at REAL NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                    """
+                )
+                await conn.commit()
+                self.conn = conn
+                logger.info(f"Idempotency DB '{self.db_path}' 연결 완료.")
+        return self.conn
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+    async def _purge_expired(self, conn: aiosqlite.Connection, now: float) -> None:
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        await conn.execute(
+            "DELETE FROM idempotency_keys WHERE expires_at < ?", (now,)
+        )
+        await conn.commit()
+
+    async def _claim(self, key: str, fingerprint: str) -> Optional[Tuple]:
+        """키를 선점하면 None, 이미 다른 요청이 가진 키면 (fingerprint, status, response, started_at)."""
+        conn = await self._connection()
+        now = time.time()
+        await self._purge_expired(conn, now)
+        await conn.execute(
+            "DELETE FROM idempotency_keys WHERE key = ? AND expires_at < ?", (key, now)
+        )
+        cursor = await conn.execute(
+            """
+            INSERT INTO idempotency_keys (key, fingerprint, status, started_at, expires_at)
+            VALUES (?, ?, 'in_progress', ?, ?)
+            ON CONFLICT(key) DO NOTHING
+            """,
+            (key, fingerprint, now, now + self.ttl_seconds),
+        )
+        await conn.commit()
+        if cursor.rowcount == 1:
+            return None
+        async with conn.execute(
+            "SELECT fingerprint, status, response, started_at FROM idempotency_keys WHERE key = ?",
+            (key,),
+        ) as cursor:
+            row = await cursor.fetchone()
+        # 조회 사이에 행이 지워졌으면(실패한 작업) 다시 선점을 시도합니다.
+        return row if row is not None else await self._claim(key, fingerprint)
+
+    async def _take_over(self, key: str, started_at: float) -> bool:
+        conn = await self._connection()
+        now = time.time()
+        cursor = await conn.execute(
+            """
+            UPDATE idempotency_keys SET started_at = ?, expires_at = ?
+            WHERE key = ? AND status = 'in_progress' AND started_at = ?
+            """,
+            (now, now + self.ttl_seconds, key, started_at),
+        )
+        await conn.commit()
+        return cursor.rowcount == 1
+
+    async def _execute(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        conn = await self._connection()
+        try:
+            result = await work()
+        except BaseException:
+            await conn.execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+            await conn.commit()
+            raise
+        await conn.execute(
+            "UPDATE idempotency_keys SET status = 'completed', response = ? WHERE key = ?",
+            (json.dumps(result, ensure_ascii=False, default=str), key),
+        )
+        await conn.commit()
+        return result
+
+    @staticmethod
+    def _check_fingerprint(key: str, expected: str, fingerprint: str) -> None:
+        if expected != fingerprint:
+            logger.warning(f"Idempotency-Key {key}가 다른 요청 본문으로 재사용되었습니다.")
+            raise HTTPException(
+                status_code=422,
+                detail="같은 Idempotency-Key가 다른 요청 내용에 사용되었습니다.",
+            )
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        work: Callable[[], Awaitable[Any]],
+        on_abandon: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        local = self._in_flight.get(key)
+        if local is not None:
+            self._check_fingerprint(key, local.fingerprint, fingerprint)
+            logger.info(f"Idempotency-Key {key}: 진행 중인 요청의 결과를 기다립니다.")
+            return await self._wait(key, local)
+
+        while True:
+            row = await self._claim(key, fingerprint)
+            if row is None:
+                break
+            row_fingerprint, status, response, started_at = row
+            self._check_fingerprint(key, row_fingerprint, fingerprint)
+            if status == "completed":
+                logger.info(f"Idempotency-Key {key}: 저장된 응답을 반환합니다.")
+                return json.loads(response)
+            local = self._in_flight.get(key)
+            if local is not None:
+                return await self._wait(key, local)
+            if time.time() - started_at > self.lock_timeout_seconds and (
+                await self._take_over(key, started_at)
+            ):
+                logger.warning(f"Idempotency-Key {key}: 중단된 실행을 이어받아 다시 실행합니다.")
+                break
+            # 다른 워커 프로세스가 실행 중입니다.
+            await asyncio.sleep(settings.idempotency_poll_interval_seconds)
+
+        execution = _Execution(
+            fingerprint, asyncio.ensure_future(self._execute(key, work)), on_abandon
+        )
+        self._in_flight[key] = execution
+        execution.task.add_done_callback(lambda _: self._forget(key, execution))
+        return await self._wait(key, execution)
+
+    async def _wait(self, key: str, execution: _Execution) -> Any:
+        execution.waiters += 1
+        try:
+            return await asyncio.shield(execution.task)
+        finally:
+            execution.waiters -= 1
+            if execution.waiters == 0 and not execution.task.done():
+                # 결과를 기다리던 요청이 모두 취소되었습니다.
+                self._abandon(key, execution)
+
+    def _abandon(self, key: str, execution: _Execution) -> None:
+        if execution.on_abandon is not None:
+            logger.info(
+                "Idempotency-Key %s: 기다리는 요청이 없어 작업을 멈추고 부분 결과를 저장합니다.",
+                key,
+            )
+            execution.on_abandon()
+            return
+        logger.info("Idempotency-Key %s: 기다리는 요청이 없어 작업을 취소합니다.", key)
+        # 취소 중인 작업에 새 요청이 붙지 않도록 바로 떼어 냅니다. 새 요청은 행이 지워진
+        # 뒤 처음부터 다시 실행합니다.
+        self._forget(key, execution)
+        execution.task.cancel()
+
+    def _forget(self, key: str, execution: _Execution) -> None:
+        if self._in_flight.get(key) is execution:
+            del self._in_flight[key]
+
+
+idempotency_store = IdempotencyStore()
+
+
+async def run_idempotent(
+    idempotency_key: Optional[str],
+    endpoint: str,
+    user_id: str,
+    payload: Dict[str, Any],
+    work: Callable[[], Awaitable[Any]],
+    on_abandon: Optional[Callable[[], None]] = None,
+) -> Any:
+    """
+    Idempotency-Key 헤더가 있으면 (엔드포인트, 사용자, 키) 단위로 work를 한 번만 실행합니다.
+
+    on_abandon은 키가 있을 때만 쓰이며, 같은 키를 기다리는 요청이 모두 떠났을 때 호출됩니다.
+    """
+    if not idempotency_key:
+        return await work()
+    return await idempotency_store.run(
+        f"{endpoint}:{user_id}:{idempotency_key}",
+        request_key(endpoint, payload),
+        work,
+        on_abandon,
+    )
@@ -1,36 +1,214 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import settings
 
 DEFAULT_LOG_FORMAT = """%(asctime)s - %(name)s - %(levelname)s - %(message)s"""
 
+# 요청 id (HTTP 요청의 trace id). TracingMiddleware가 요청마다 설정합니다.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord 기본 속성. 이 외의 속성은 extra= 로 넘긴 구조화 필드로 보고 JSON에 담습니다.
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "request_id"}
+
+
+def _truncate(value: str, limit: int) -> str:
+    if limit <= 0 or len(value) <= limit:
+        return value
+    return f"{value[:limit]}...(+{len(value) - limit}자 생략)"
+
+
+def _bounded(value: Any, limit: int) -> Any:
+    """숫자/불리언/None은 그대로 두고(%d 등 서식 유지), 나머지는 잘린 문자열로 바꿉니다."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    try:
+        text = value if isinstance(value, str) else str(value)
+    except Exception as e:
+        text = f"<str() 실패: {e!r}>"
+    return _truncate(text, limit)
+
+
+class RequestContextFilter(logging.Filter):
+    """레코드에 현재 요청 id를 붙입니다. 호출한 스레드/컨텍스트에서 실행되어야 합니다."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """
+    많이 찍히는 DEBUG 레코드를 메시지 템플릿(로거 이름, msg)별로 N개 중 하나만 통과시킵니다.
+    rate가 1이면 모두, 0이면 하나도 통과시키지 않습니다. INFO 이상은 항상 통과합니다.
+    """
+
+    MAX_KEYS = 10_000
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = 0 if rate <= 0 else max(1, round(1 / min(rate, 1.0)))
+        self._counts: Dict[Tuple[str, Any], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if self.every == 0:
+            return False
+        key = (record.name, record.msg)
+        count = self._counts.get(key, 0)
+        if count == 0 and len(self._counts) >= self.MAX_KEYS:
+            self._counts.clear()
+        self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 하나의 JSON 객체. extra= 로 넘긴 필드도 함께 담습니다."""
+
+    def __init__(self, max_field_chars: int):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = _bounded(value, self.max_field_chars)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    레코드를 큐에 넣기만 하고, 포맷과 stdout 쓰기는 QueueListener 스레드가 합니다.
+
+    인자는 호출한 쪽에서 문자열로 바꿔(이후 객체가 바뀌어도 로그가 달라지지 않도록) 필드별
+    길이 제한을 적용합니다. 로그 레벨에서 걸러진 호출은 여기까지 오지 않으므로 DEBUG가 꺼져
+    있으면 인자는 문자열로 만들어지지도 않습니다. 큐가 가득 차면 기다리지 않고 버립니다.
+    """
+
+    def __init__(self, log_queue: queue.Queue, max_field_chars: int):
+        super().__init__(log_queue)
+        self.max_field_chars = max_field_chars
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        limit = self.max_field_chars
+        record = logging.makeLogRecord(record.__dict__)
+        if isinstance(record.args, dict):
+            record.args = {k: _bounded(v, limit) for k, v in record.args.items()}
+        elif record.args:
+            record.args = tuple(_bounded(arg, limit) for arg in record.args)
+        if not record.args:
+            record.msg = _bounded(record.msg, limit)
+        try:
+            record.msg = record.getMessage()
+        except Exception as e:
+            record.msg = f"{record.msg!r} (로그 인자 포맷 실패: {e!r})"
+        record.args = None
+        if record.exc_info:
+            # traceback은 프레임을 붙잡고 있으므로 여기서 문자열로 만들어 둡니다.
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_pipelines: Dict[Tuple[int, str], _BoundedQueueHandler] = {}
+_listeners: list = []
+_pipelines_lock = threading.Lock()
+
+
+def _build_formatter(log_format: str) -> logging.Formatter:
+    if settings.log_output == "json":
+        return JsonFormatter(settings.log_max_field_chars)
+    return logging.Formatter(log_format)
+
+
+def _queue_handler(stream, log_format: str) -> _BoundedQueueHandler:
+    """(stream, 형식)마다 큐 핸들러 하나와 쓰기 스레드 하나를 공유합니다."""
+    key = (id(stream), log_format)
+    with _pipelines_lock:
+        handler = _pipelines.get(key)
+        if handler is not None:
+            return handler
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(_build_formatter(log_format))
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_max_size)
+        handler = _BoundedQueueHandler(log_queue, settings.log_max_field_chars)
+        handler.addFilter(DebugSampler(settings.log_debug_sample_rate))
+        handler.addFilter(RequestContextFilter())
+        listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        listener.start()
+        _listeners.append(listener)
+        _pipelines[key] = handler
+        return handler
+
+
+def shutdown_logging() -> None:
+    """큐에 남은 로그를 모두 쓰고 쓰기 스레드를 멈춥니다."""
+    with _pipelines_lock:
+        while _listeners:
+            _listeners.pop().stop()
+        _pipelines.clear()
+
+
+atexit.register(shutdown_logging)
+
 
 def get_logger(
     name: str,
-    level: int = logging.INFO,
+    level: Optional[int] = None,
     log_format: str = DEFAULT_LOG_FORMAT,
     stream=sys.stdout,
 ) -> logging.Logger:
     """
     지정된 이름과 설정으로 로거를 가져옵니다.
 
+    로그는 큐에 넣고 백그라운드 스레드가 stream에 씁니다. LOG_OUTPUT=json이면 요청 id와
+    extra 필드를 담은 JSON 한 줄로 출력합니다. 인자는 지연 포맷팅되도록
+    logger.debug("... %s", value) 형태로 넘기세요.
+
     Args:
         name: 로거의 이름입니다. 일반적으로 __name__을 사용합니다.
-        level: 로깅 레벨 (예: logging.INFO, logging.DEBUG).
-        log_format: 로그 메시지 형식 문자열.
+        level: 로깅 레벨 (예: logging.INFO, logging.DEBUG). 기본값은 LOG_LEVEL입니다.
+        log_format: 텍스트 출력일 때의 로그 메시지 형식 문자열.
         stream: 로그를 출력할 스트림 (기본값: sys.stdout).
 
     Returns:
         설정된 logging.Logger 객체.
     """
     logger = logging.getLogger(name)
-    logger.setLevel(level)
+    logger.setLevel(level if level is not None else settings.log_level.upper())
 
     # 핸들러가 이미 추가되었는지 확인하여 중복 로깅 방지
     if not logger.handlers:
-        handler = logging.StreamHandler(stream)
-        formatter = logging.Formatter(log_format)
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        logger.addHandler(_queue_handler(stream, log_format))
 
     return logger
 
@@ -46,3 +224,4 @@ if __name__ == """__main__""":
 
     another_logger = get_logger("another_module", level=logging.INFO)
     another_logger.info("다른 로거에서 보낸 정보 메시지.")
+    another_logger.info("구조화 필드 예: %s", "값", extra={"user_id": "u1"})
@@ -0,0 +1,241 @@
+"""
+이벤트 루프 지연(lag) 모니터와 블로킹 호출 감지.
+
+루프 안의 틱 태스크가 interval마다 깨어나며 예정보다 늦게 깨어난 시간(lag)을 기록하고,
+별도 watchdog 스레드는 틱이 threshold 이상 멈추면 그 순간 루프 스레드의 스택을 잡아
+로그와 /admin/event_loop에 남깁니다. 동기 process_data, Supabase .execute(), 파일 쓰기처럼
+루프를 막는 호출이 어디서 일어났는지 스택으로 바로 보입니다.
+
+LOOP_BLOCK_FAIL_MS를 지정하면(테스트용 strict 모드) 요청 처리 중에 루프가 그보다 오래
+막혔을 때 LoopBlockGuardMiddleware가 EventLoopBlockedError를 일으켜, TestClient/httpx
+기반 테스트가 실패하도록 합니다.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from core.config import settings
+from core.logger import get_logger
+from core.metrics import LATENCY_BUCKETS, registry
+
+logger = get_logger(__name__)
+
+LAG_SAMPLES = 3000
+BLOCKING_EVENTS = 50
+
+EVENT_LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds",
+    "이벤트 루프 지연 (틱이 예정보다 늦게 깨어난 시간)",
+    buckets=(0.001, 0.0025) + LATENCY_BUCKETS[:10],
+)
+EVENT_LOOP_BLOCKED = registry.counter(
+    "event_loop_blocked_total", "이벤트 루프가 LOOP_BLOCK_THRESHOLD_MS 이상 막힌 횟수"
+)
+
+
+class EventLoopBlockedError(RuntimeError):
+    """strict 모드에서 요청 처리 중 루프가 LOOP_BLOCK_FAIL_MS보다 오래 막혔을 때."""
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+@dataclass
+class BlockingEvent:
+    started_at: float
+    # 스택을 잡은 시점까지 막혀 있던 시간. 루프가 풀리면 전체 지연으로 갱신됩니다.
+    blocked_ms: float
+    task: Optional[str]
+    stack: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "blocked_ms": round(self.blocked_ms, 1),
+            "task": self.task,
+            "stack": self.stack,
+        }
+
+
+class LoopLagMonitor:
+    def __init__(
+        self,
+        interval_ms: Optional[float] = None,
+        threshold_ms: Optional[float] = None,
+        fail_ms: Optional[float] = None,
+    ):
+        self.interval = (interval_ms or settings.loop_monitor_interval_ms) / 1000
+        self.fail_ms = fail_ms if fail_ms is not None else settings.loop_block_fail_ms
+        threshold = threshold_ms or settings.loop_block_threshold_ms
+        # strict 모드에서는 실패 기준보다 짧은 정지도 스택을 잡아 둡니다.
+        self.threshold = (
+            min(threshold, self.fail_ms) if self.fail_ms > 0 else threshold
+        ) / 1000
+        self.lags: Deque[float] = deque(maxlen=LAG_SAMPLES)
+        self.blocking_events: Deque[BlockingEvent] = deque(maxlen=BLOCKING_EVENTS)
+        # strict 모드 위반: (루프가 풀린 시각, 막힌 시간 ms, 스택)
+        self.violations: Deque[tuple] = deque(maxlen=BLOCKING_EVENTS)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._pending: Optional[BlockingEvent] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._tick(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+        logger.info(
+            "이벤트 루프 모니터 시작 (interval %.0fms, threshold %.0fms, strict %.0fms)",
+            self.interval * 1000,
+            self.threshold * 1000,
+            self.fail_ms,
+        )
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _tick(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._heartbeat = time.monotonic()
+            self._record(lag)
+
+    def _record(self, lag: float) -> None:
+        self.lags.append(lag)
+        EVENT_LOOP_LAG.observe(lag)
+        event, self._pending = self._pending, None
+        if lag < self.threshold:
+            return
+        EVENT_LOOP_BLOCKED.inc()
+        if event is not None:
+            event.blocked_ms = lag * 1000
+        if self.fail_ms > 0 and lag * 1000 > self.fail_ms:
+            self.violations.append(
+                (time.monotonic(), lag * 1000, event.stack if event else [])
+            )
+
+    def _watch(self) -> None:
+        check_every = min(self.interval, self.threshold) / 2
+        reported_heartbeat = None
+        while not self._stop.wait(check_every):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.threshold or heartbeat == reported_heartbeat:
+                continue
+            # 같은 정지는 한 번만 기록합니다.
+            reported_heartbeat = heartbeat
+            self._capture(stalled)
+
+    def _capture(self, stalled: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        event = BlockingEvent(
+            started_at=time.time() - stalled,
+            blocked_ms=stalled * 1000,
+            task=task.get_name() if task is not None else None,
+            stack=stack,
+        )
+        self.blocking_events.append(event)
+        self._pending = event
+        logger.warning(
+            "이벤트 루프가 %.0fms 이상 막혀 있습니다 (task: %s). 루프 스레드 스택:\n%s",
+            stalled * 1000,
+            event.task,
+            "".join(stack[-6:]),
+        )
+
+    def violations_since(self, since: float) -> List[tuple]:
+        return [violation for violation in self.violations if violation[0] >= since]
+
+    def stats(self) -> Dict[str, Any]:
+        lags = list(self.lags)
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "strict_fail_ms": self.fail_ms,
+            "lag_ms_p50": _ms(_percentile(lags, 0.5)),
+            "lag_ms_p95": _ms(_percentile(lags, 0.95)),
+            "lag_ms_p99": _ms(_percentile(lags, 0.99)),
+            "lag_ms_max": _ms(max(lags)) if lags else None,
+            "blocking_events": [event.to_dict() for event in self.blocking_events],
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+loop_monitor = LoopLagMonitor()
+
+
+class LoopBlockGuardMiddleware:
+    """
+    strict 모드(LOOP_BLOCK_FAIL_MS > 0)용 ASGI 미들웨어.
+
+    요청 처리 중 루프가 기준보다 오래 막혔으면 응답이 끝난 뒤 EventLoopBlockedError를
+    일으킵니다. 같은 시간에 처리 중이던 다른 요청도 함께 실패할 수 있으며, 원인은 에러
+    메시지의 스택으로 확인합니다. 운영 환경에서는 켜지 마세요.
+    """
+
+    def __init__(self, app, monitor: Optional[LoopLagMonitor] = None):
+        self.app = app
+        self.monitor = monitor or loop_monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.monotonic()
+        await self.app(scope, receive, send)
+        if not self.monitor.running:
+            return
+        # 요청 끝에 막혔던 정지는 다음 틱에서야 기록되므로 한 틱 기다립니다.
+        await asyncio.sleep(self.monitor.interval * 1.5)
+        violations = self.monitor.violations_since(started)
+        if violations:
+            _, blocked_ms, stack = max(violations, key=lambda v: v[1])
+            raise EventLoopBlockedError(
+                f"{scope['method']} {scope['path']} 처리 중 이벤트 루프가 "
+                f"{blocked_ms:.0f}ms 막혔습니다 (기준 {self.monitor.fail_ms:.0f}ms).\n"
+                + "".join(stack[-15:])
+            )
@@ -0,0 +1,320 @@
+"""
+프로세스 내 메트릭(카운터, 게이지, 히스토그램)과 Prometheus 텍스트 포맷 출력.
+
+기록 경로는 레이블 튜플로 dict를 한 번 찾고 숫자를 더하는 것이 전부라 요청 경로에서
+마이크로초 단위로 끝납니다. HTTP 요청, Gemini 호출, Supabase 쿼리, 그래프 노드, 도구 호출은
+트레이싱 span이 끝날 때 SpanMetricsExporter가 집계하므로 호출 지점에 따로 계측 코드를
+두지 않습니다. 캐시/MCP 풀/admission처럼 이미 stats()를 가진 구성 요소는 스크레이프할 때
+collector가 읽어 게이지로 내보냅니다.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from core.tracing import Span, SpanExporter
+
+LabelValues = Tuple[str, ...]
+# collector가 돌려주는 (이름, 타입, 설명, [(레이블 dict, 값)])
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        # 레이블이 없는 메트릭은 기록 전에도 0으로 노출합니다.
+        self._values: Dict[LabelValues, float] = {} if self.labelnames else {(): 0.0}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in list(self._values.items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 레이블 값별 [버킷별 개수(+Inf 포함, 누적 아님), 합계, 개수]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        bucket_names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in list(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(
+                    bucket_names, labels + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(
+        self, collector: Callable[[], Iterable[MetricFamily]]
+    ) -> None:
+        """스크레이프할 때마다 호출되어 현재 값을 돌려주는 collector를 등록합니다."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP 요청 수", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP 요청 처리 시간 (스트리밍은 스트림 종료까지)",
+    ("method", "route"),
+)
+IDEAS_HELPER_TTFT = registry.histogram(
+    "ideas_helper_time_to_first_token_seconds",
+    "/ideas_helper 요청부터 첫 토큰을 내보내기까지의 시간",
+    buckets=TTFT_BUCKETS,
+)
+GEMINI_REQUESTS = registry.counter(
+    "gemini_requests_total",
+    "process_data Gemini 호출 수",
+    ("model", "stream", "status"),
+)
+GEMINI_REQUEST_DURATION = registry.histogram(
+    "gemini_request_duration_seconds",
+    "process_data Gemini 호출 시간",
+    ("model", "stream"),
+)
+GEMINI_FIRST_CHUNK = registry.histogram(
+    "gemini_time_to_first_chunk_seconds",
+    "Gemini 스트림의 첫 청크까지 시간",
+    ("model",),
+    buckets=TTFT_BUCKETS,
+)
+GEMINI_TOKENS = registry.counter(
+    "gemini_tokens_total", "process_data Gemini 토큰 수", ("model", "kind")
+)
+SUPABASE_QUERIES = registry.counter(
+    "supabase_queries_total", "Supabase 쿼리 수", ("table", "method", "status")
+)
+SUPABASE_QUERY_DURATION = registry.histogram(
+    "supabase_query_duration_seconds", "Supabase 쿼리 시간", ("table", "method")
+)
+GRAPH_NODE_DURATION = registry.histogram(
+    "search_graph_node_duration_seconds",
+    "SearchAgent 그래프 노드 실행 시간",
+    ("node", "status"),
+)
+TOOL_CALL_DURATION = registry.histogram(
+    "search_tool_call_duration_seconds",
+    "SearchAgent 도구 호출 시간",
+    ("tool", "status"),
+)
+MCP_STARTS = registry.counter(
+    "mcp_server_starts_total", "MCP 서버 기동 시도 수", ("server", "status")
+)
+SEARCHES_IN_FLIGHT = registry.gauge(
+    "searches_in_flight", "실행 중인 SearchAgent 검색 수"
+)
+
+_TOKEN_KINDS = (
+    ("input_tokens", "input"),
+    ("output_tokens", "output"),
+    ("thoughts_tokens", "thoughts"),
+)
+
+
+class SpanMetricsExporter(SpanExporter):
+    """끝난 span을 메트릭으로 집계합니다."""
+
+    def export(self, span: Span) -> None:
+        handler = self._handlers.get(span.name)
+        if handler is not None:
+            handler(span, span.attributes, span.duration_ms / 1000)
+
+    @staticmethod
+    def _http(span: Span, attributes: Dict, seconds: float) -> None:
+        method = attributes.get("method") or ""
+        route = attributes.get("route") or "unmatched"
+        status = str(attributes.get("status_code") or 500)
+        HTTP_REQUESTS.inc(method, route, status)
+        HTTP_REQUEST_DURATION.observe(seconds, method, route)
+
+    @staticmethod
+    def _gemini(span: Span, attributes: Dict, seconds: float) -> None:
+        model = attributes.get("model") or ""
+        stream = "true" if attributes.get("stream") else "false"
+        GEMINI_REQUESTS.inc(model, stream, span.status)
+        GEMINI_REQUEST_DURATION.observe(seconds, model, stream)
+        if "first_chunk_ms" in attributes:
+            GEMINI_FIRST_CHUNK.observe(attributes["first_chunk_ms"] / 1000, model)
+        for attribute, kind in _TOKEN_KINDS:
+            tokens = attributes.get(attribute)
+            if tokens:
+                GEMINI_TOKENS.inc(model, kind, amount=tokens)
+
+    @staticmethod
+    def _supabase(span: Span, attributes: Dict, seconds: float) -> None:
+        table = (attributes.get("path") or "").lstrip("/")
+        method = attributes.get("method") or ""
+        SUPABASE_QUERIES.inc(table, method, span.status)
+        SUPABASE_QUERY_DURATION.observe(seconds, table, method)
+
+    @staticmethod
+    def _graph_node(span: Span, attributes: Dict, seconds: float) -> None:
+        GRAPH_NODE_DURATION.observe(seconds, attributes.get("node") or "", span.status)
+
+    @staticmethod
+    def _tool_call(span: Span, attributes: Dict, seconds: float) -> None:
+        TOOL_CALL_DURATION.observe(seconds, attributes.get("tool") or "", span.status)
+
+    @staticmethod
+    def _mcp_start(span: Span, attributes: Dict, seconds: float) -> None:
+        MCP_STARTS.inc(attributes.get("server") or "", span.status)
+
+    _handlers = {
+        "http.request": _http,
+        "gemini.process_data": _gemini,
+        "supabase.query": _supabase,
+        "graph.node": _graph_node,
+        "tool.call": _tool_call,
+        "mcp.start": _mcp_start,
+    }
+
+
+span_metrics_exporter = SpanMetricsExporter()
@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from core.config import settings
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def request_key(endpoint: str, payload: Dict[str, Any]) -> str:
+    """엔드포인트와 정규화한 요청 본문(키 정렬, 문자열 공백 제거, None 제외)의 해시."""
+    body = json.dumps(_normalize(payload), sort_keys=True, ensure_ascii=False)
+    return f"{endpoint}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+
+class SingleFlight:
+    """
+    같은 키의 동시 요청을 하나의 계산으로 합칩니다.
+
+    - 먼저 온 요청이 계산을 시작하고, 진행 중에 들어온 같은 키의 요청은 그 결과를 함께 받습니다.
+    - 계산은 별도 태스크에서 실행되므로 요청 하나가 취소되어도 다른 대기자는 영향을 받지 않습니다.
+    - 성공한 결과는 result_window_seconds 동안 보관해, 직후의 재시도에도 다시 계산하지 않습니다.
+      예외는 보관하지 않습니다.
+    """
+
+    def __init__(
+        self,
+        result_window_seconds: Optional[float] = None,
+        max_results: Optional[int] = None,
+    ):
+        self.result_window_seconds = (
+            result_window_seconds
+            if result_window_seconds is not None
+            else settings.single_flight_result_window_seconds
+        )
+        self.max_results = max_results or settings.single_flight_max_results
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._results: Dict[str, Tuple[float, Any]] = {}
+        self.stats = {"computed": 0, "joined": 0, "window_hits": 0}
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = [
+            key
+            for key, (finished_at, _) in self._results.items()
+            if now - finished_at > self.result_window_seconds
+        ]
+        for key in expired:
+            del self._results[key]
+        while len(self._results) > self.max_results:
+            del self._results[next(iter(self._results))]
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if (
+            self.result_window_seconds > 0
+            and not task.cancelled()
+            and task.exception() is None
+        ):
+            self._results[key] = (time.monotonic(), task.result())
+
+    async def run(self, key: str, work: Callable[[], Awaitable[T]]) -> T:
+        self._evict()
+        cached = self._results.get(key)
+        if cached is not None:
+            self.stats["window_hits"] += 1
+            logger.info(f"단일 실행(single-flight): 최근 결과 재사용 ({key[:60]})")
+            return cached[1]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.stats["computed"] += 1
+            task = asyncio.ensure_future(work())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._on_done(key, done))
+        else:
+            self.stats["joined"] += 1
+            logger.info(f"단일 실행(single-flight): 진행 중인 요청에 합류 ({key[:60]})")
+        # 대기자 하나가 취소되어도 공유 계산은 계속되도록 shield 합니다.
+        return await asyncio.shield(task)
+
+
+single_flight = SingleFlight()
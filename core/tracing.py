@@ -0,0 +1,329 @@
+"""
+요청 단위 트레이싱.
+
+HTTP 요청, Gemini 호출(process_data), Supabase 쿼리, LangGraph 노드, 도구 호출,
+MCP 서버 기동을 span으로 기록합니다. 현재 span은 contextvar로 전달되므로 같은 요청에서
+만든 태스크(그래프 노드, 도구 호출 등)의 span은 자동으로 요청 span의 자식이 됩니다.
+
+끝난 span은 등록된 exporter로 보냅니다. 기본 제공 exporter는 최근 span을 메모리에
+보관하는 InMemorySpanExporter(/admin/traces에서 조회)와 JSON Lines 파일에 쓰는
+FileSpanExporter이며, SpanExporter를 구현해 add_exporter로 다른 백엔드를 붙일 수 있습니다.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from core.config import settings
+from core.logger import get_logger, request_id_var
+
+logger = get_logger(__name__)
+
+TRACE_ID_HEADER = "x-trace-id"
+# W3C traceparent: version-trace_id-parent_id-flags
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.time)
+    duration_ms: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """끝난 span을 받아 내보내는 인터페이스."""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """최근 span을 메모리에 보관합니다. 테스트와 /admin/traces 조회용입니다."""
+
+    def __init__(self, max_spans: Optional[int] = None):
+        self.spans: Deque[Span] = deque(
+            maxlen=max_spans or settings.tracing_memory_max_spans
+        )
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def get_spans(
+        self, trace_id: Optional[str] = None, name: Optional[str] = None
+    ) -> List[Span]:
+        return [
+            span
+            for span in list(self.spans)
+            if (trace_id is None or span.trace_id == trace_id)
+            and (name is None or span.name == name)
+        ]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """span을 한 줄에 하나씩 JSON으로 파일에 덧붙입니다."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.tracing_file_path
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, exporters: Optional[List[SpanExporter]] = None):
+        self.exporters: List[SpanExporter] = list(exporters or [])
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def add_exporter(self, exporter: SpanExporter) -> None:
+        self.exporters.append(exporter)
+
+    def remove_exporter(self, exporter: SpanExporter) -> None:
+        if exporter in self.exporters:
+            self.exporters.remove(exporter)
+
+    def memory_exporter(self) -> Optional[InMemorySpanExporter]:
+        for exporter in self.exporters:
+            if isinstance(exporter, InMemorySpanExporter):
+                return exporter
+        return None
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        **attributes: Any,
+    ) -> Span:
+        """
+        span을 시작합니다. 현재 span으로 설정하지는 않으므로, 스트림처럼 여러 컨텍스트에
+        걸치는 작업은 이 함수로 시작하고 end_span으로 닫습니다.
+        """
+        parent = parent or _current_span.get()
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        return Span(
+            name=name,
+            trace_id=trace_id or _new_id(16),
+            span_id=_new_id(8),
+            parent_id=parent_id,
+            attributes=attributes,
+        )
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        if span.duration_ms is not None:
+            return
+        span.duration_ms = round(span.elapsed_ms(), 3)
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            span.status = "cancelled"
+        elif error is not None:
+            span.status = "error"
+            span.error = f"{type(error).__name__}: {error}"
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Span export 실패 ({type(exporter).__name__}): {e}")
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """현재 span의 자식 span을 열고, 블록 안에서는 그것을 현재 span으로 둡니다."""
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # 비동기 제너레이터가 다른 컨텍스트에서 닫힌 경우입니다.
+                pass
+            self.end_span(span, error)
+
+    def shutdown(self) -> None:
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+
+def _default_exporters() -> List[SpanExporter]:
+    if not settings.tracing_enabled:
+        return []
+    exporters: List[SpanExporter] = []
+    for name in settings.tracing_exporters.split(","):
+        name = name.strip()
+        if name == "memory":
+            exporters.append(InMemorySpanExporter())
+        elif name == "file":
+            exporters.append(FileSpanExporter())
+        elif name:
+            logger.warning(f"알 수 없는 TRACING_EXPORTERS 항목을 무시합니다: {name}")
+    return exporters
+
+
+tracer = Tracer(_default_exporters())
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def span(name: str, **attributes: Any):
+    return tracer.span(name, **attributes)
+
+
+def traced_execute(query):
+    """Supabase(PostgREST) 쿼리 빌더를 span 안에서 실행합니다."""
+    with tracer.span(
+        "supabase.query",
+        path=getattr(query, "path", None),
+        method=getattr(query, "http_method", None),
+    ) as query_span:
+        response = query.execute()
+        data = getattr(response, "data", None)
+        if isinstance(data, list):
+            query_span.set_attribute("rows", len(data))
+        return response
+
+
+def traced_node(name: str, node):
+    """LangGraph 노드 함수를 span으로 감쌉니다. 노드 시그니처는 (state, config)입니다."""
+    if asyncio.iscoroutinefunction(node):
+
+        async def run_async_node(state, config):
+            with tracer.span("graph.node", node=name):
+                return await node(state, config)
+
+        return run_async_node
+
+    def run_node(state, config):
+        with tracer.span("graph.node", node=name):
+            return node(state, config)
+
+    return run_node
+
+
+class TracingMiddleware:
+    """
+    HTTP 요청마다 루트 span을 여는 ASGI 미들웨어.
+
+    traceparent 헤더가 있으면 그 trace에 이어 붙이고, 응답에는 X-Trace-Id 헤더를 답니다.
+    스트리밍 응답은 스트림이 끝날 때 span이 닫힙니다.
+    """
+
+    def __init__(self, app, active_tracer: Optional[Tracer] = None):
+        self.app = app
+        self.tracer = active_tracer or tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = parent_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"traceparent":
+                match = _TRACEPARENT.match(value.decode("latin-1").strip())
+                if match:
+                    trace_id, parent_id = match.groups()
+                break
+
+        with self.tracer.span(
+            "http.request",
+            method=scope.get("method"),
+            path=scope["path"],
+        ) as request_span:
+            if trace_id:
+                request_span.trace_id, request_span.parent_id = trace_id, parent_id
+            trace_header = (TRACE_ID_HEADER.encode(), request_span.trace_id.encode())
+            # 이 요청에서 남기는 로그의 request_id
+            request_id_token = request_id_var.set(request_span.trace_id)
+
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    request_span.set_attribute("status_code", message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [
+                        trace_header
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                request_id_var.reset(request_id_token)
+                # 라우터가 매칭한 경로 템플릿 (메트릭 레이블용, 경로 파라미터 값은 빠집니다)
+                route = scope.get("route")
+                if route is not None:
+                    request_span.set_attribute("route", route.path)
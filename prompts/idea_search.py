@@ -79,7 +79,7 @@ EXECUTION_PROMPT = """
     2.  **Tool Selection and Usage**:
         * If information needs to be found on the web, use `tavily-mcp` by formulating effective search queries based on `current_step_info_action`.
         * From the list of URLs obtained via `tavily-mcp`, select the URLs most relevant to the task's objective.
-        * If detailed content from the selected URLs is required, use `firecrawl-mcp` to extract the content from those pages.
+        * If detailed content from the selected URLs is required, use `firecrawl-mcp` to extract the content from those pages. When several URLs are needed, scrape them all in the same turn.
     3.  **Result Analysis and Synthesis**:
         * Carefully observe the results from tool usage and determine the next actions to achieve the current task's goal.
         * Synthesize the collected information (text, URLs, etc.) to satisfy the requirements of the current task.
@@ -93,7 +93,8 @@ EXECUTION_PROMPT = """
     ## General MCP Tool Usage Guidelines ##
     * Always call tools with valid parameters as documented in their schemas.
     * For multimedia responses (like images), you will receive a description of the content. Use this information to proceed with your task.
-    * If multiple tools need to be called in sequence, make one call at a time and wait for the results before calling the next tool.
+    * When several tool calls do not depend on each other (e.g., multiple search queries, or scraping several candidate URLs), issue them together in a single turn as parallel tool calls instead of one call per turn.
+    * Only wait for results before the next call when that call needs the output of a previous one (e.g., scraping URLs that a search has not returned yet).
 
     ## Your Current Task (Step {current_step_index}) ##
     **Primary Task:**
@@ -123,6 +124,11 @@ SUMMARY_PROMPT = """
     {step_result}
     * step_result contains information processed and collected by previous agent(s). This may include text summaries, extracted content, relevant URLs, justifications or explanations for why each URL is important, and, where possible, information about the content type (e.g., text, image, music).
 
+    **3. Collected References:**
+    references:
+    {references}
+    * Each line is one source collected by the tools during the search, in the form `[id] title (type) url` followed by a short snippet of its content.
+
     ## Final Answer Composition Guidelines ##
 
     1.  **Language and Tone**:
@@ -132,47 +138,53 @@ SUMMARY_PROMPT = """
     2.  **Content Composition**:
         * Extract **only useful details** from `step_result` that directly address the user's initial_request.
         * Combine information **concisely and without duplication** to form a coherent and logical answer.
-        * To improve readability, use appropriate section headings translated into the user's request language (e.g., "Main Answer," "Detailed Information," "References") where necessary.
+        * To improve readability, use appropriate section headings translated into the user's request language (e.g., "Main Answer," "Detailed Information") where necessary.
+
+    3.  **Citing Sources (Mandatory Requirement)**:
+        * Every piece of information that supports your answer **MUST be cited** with the id of its source from `references`, in square brackets, right after the sentence or list item it supports (e.g., `... a dreamy R&B ballad [R3].`, or `[R3][R7]` for several sources).
+        * Only use ids that appear in `references`. Do not invent ids.
+        * Do **NOT** write URLs, a "References" section, or any JSON list of sources. The server builds the reference list from the ids you cite.
+
+    4.  **Reference Notes (Mandatory Requirement)**:
+        * After the answer, write a line containing only `---REFERENCE NOTES---`.
+        * Below it, write one line per cited id in the form `[R3] explanation`, where the explanation is one sentence (in the user's language) on how that source is relevant to the user's request (this is the justification). Utilize the rationale or summary provided in `step_result`.
+        * The server removes this section from the answer and uses each line as the description of that reference.
+
+    5.  **Final Response Submission Format**:
+        * Provide the comprehensive and easy-to-understand textual answer to the user's initial_request, with the inline citations described above, followed by the reference notes section.
+
+    **Example:**
+    Today Seoul will be mostly sunny with a high of 24°C [R1], and fine dust levels are expected to stay in the "good" range [R2].
+    ---REFERENCE NOTES---
+    [R1] Provides today's weather forecast for the Seoul area (max/min temperature, weather conditions) to answer the user's weather question.
+    [R2] Provides current fine dust concentration information for Seoul.
+"""
 
-    3.  **Formatting and Including Sources (Mandatory Requirement)**:
-        * Every piece of information that supports your answer (e.g., web pages, documents, media files) **MUST have its source clearly cited.**
-        * Each source citation must be structured as a **JSON object** containing the following keys:
-            * "title": (String) The title of the URL or content. For web pages, use the content of the <title> tag if available, or a concise summary/description of the content if the title is not clear.
-            * "description": (String) An explanation of how the content of the URL is relevant to the user's request, or a summary of the key information taken from that source (this is the justification). Utilize the rationale or summary provided in `step_result`.
-            * "url": (String) The actual URL address of the referenced content.
-            * "type": (String) The type of content (e.g., "text", "article", "image", "video", "music", "webpage", "document"). Use type information from `step_result` if available; otherwise, infer it based on the URL's characteristics or content.
+CONDENSE_PROMPT = """
+    ## Your Role ##
+    You are an AI Research Condensing Agent. Your mission is to condense the results of one or more search steps into a compact set of notes that a later agent will use to write the final answer to the user's request.
 
-    4.  **Final Response Submission Format**:
-        * **Step 1 (Comprehensive Textual Answer):** First, provide a comprehensive and easy-to-understand textual answer to the user's initial_request.
-        * **Step 2 (Structured List of References):** Following the textual answer, include a list (array) of JSON objects formatted according to Guideline 3 above. This list should be presented under a section titled **"References" (or an appropriate equivalent in the user's request language, e.g., "Sources")**. This list must cite all external information sources mentioned or used in your answer.
+    ## Input Information ##
 
-    **Example (JSON output format for the "References" section):**
-    ```json
-    [
-    {{
-        "title": "Today's Seoul Weather Information - Korea Meteorological Administration",
-        "description": "Provides today's weather forecast for the Seoul area (max/min temperature, weather conditions) to answer the user's weather question.",
-        "url": "https://www.kma.go.kr/weather/forecast/mid-term-rss3.jsp?stnId=109",
-        "type": "webpage"
-    }},
-    {{
-        "title": "Real-time Fine Dust Concentration Check - Air Korea",
-        "description": "Provides current fine dust and ultrafine dust concentration information for Seoul, including air quality information.",
-        "url": "https://www.airkorea.or.kr/web/realSearch?pMENU_NO=97",
-        "type": "webpage"
-    }},
-    {{
-        "title": "Cherry Blossom Blooming Period Prediction Research Paper",
-        "description": "Research results on changes in cherry blossom blooming periods due to climate change, providing in-depth information for spring flower-related questions.",
-        "url": "https://www.example.com/research/cherryblossom_study.pdf",
-        "type": "document"
-    }},
-    {{
-        "title": "Seoul N Tower Night View (Image)",
-        "description": "A photo of N Tower showing Seoul's beautiful night view, visual material related to Seoul landmarks.",
-        "url": "https://www.example.com/images/seoul_ntower_night.jpg",
-        "type": "image"
-    }}
-    ]
-    ```
+    **1. User\\'s Initial Request:**
+    {initial_request}
+
+    **2. Step(s) Being Condensed:**
+    {step_title}
+
+    **3. Step Result:**
+    {step_result}
+
+    **4. References Collected in These Step(s):**
+    {references}
+    * Each line is one source in the form `[id] title (type) url` followed by a short snippet of its content.
+
+    ## Condensing Guidelines ##
+    * Keep **only** the findings that help answer the user's initial request: recommended items (titles, artists, creators), key facts, moods/characteristics, and the reasons they are relevant.
+    * Keep **every** relevant source: cite it with its id in square brackets (e.g., `[R3]`) right after the finding it supports, instead of writing the URL. Keep a URL only if it has no id in `references`.
+    * Remove process narration (which tools were called, retries, errors that were recovered), repetition, and boilerplate.
+    * Write in the **same language as the user's initial request**, as short bullet points.
+    * Stay under about {max_words} words.
+
+    **Condensed Notes:**
 """
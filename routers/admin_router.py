@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, Any, Optional
+
+from core.admission import admission_controller
+from core.loop_monitor import loop_monitor
+from core.tracing import tracer
+from routers.project_router import get_project_service
+from services.project_service import ProjectService
+
+router = APIRouter()
+
+
+def _get_checkpoint_store(service: ProjectService):
+    checkpoint_store = service.search_agent.checkpoint_store
+    if checkpoint_store is None:
+        raise HTTPException(
+            status_code=503, detail="체크포인트 저장소가 초기화되지 않았습니다."
+        )
+    return checkpoint_store
+
+
+@router.get("/checkpoints")
+async def checkpoint_stats(
+    service: ProjectService = Depends(get_project_service),
+) -> Dict[str, Any]:
+    return await _get_checkpoint_store(service).stats()
+
+
+@router.post("/checkpoints/compact")
+async def checkpoint_compact(
+    service: ProjectService = Depends(get_project_service),
+) -> Dict[str, Any]:
+    checkpoint_store = _get_checkpoint_store(service)
+    await checkpoint_store.run_maintenance()
+    return await checkpoint_store.stats()
+
+
+@router.get("/admission")
+async def admission_stats() -> Dict[str, Any]:
+    return admission_controller.stats()
+
+
+@router.get("/event_loop")
+async def event_loop_stats() -> Dict[str, Any]:
+    return loop_monitor.stats()
+
+
+@router.get("/traces")
+async def recent_traces(
+    trace_id: Optional[str] = None, name: Optional[str] = None, limit: int = 200
+) -> Dict[str, Any]:
+    exporter = tracer.memory_exporter()
+    if exporter is None:
+        raise HTTPException(
+            status_code=404, detail="메모리 트레이스 exporter가 설정되지 않았습니다."
+        )
+    spans = exporter.get_spans(trace_id=trace_id, name=name)[-limit:]
+    return {"count": len(spans), "spans": [span.to_dict() for span in spans]}
+
+
+@router.get("/search_cache")
+async def search_cache_stats(
+    service: ProjectService = Depends(get_project_service),
+) -> Dict[str, Any]:
+    if service.result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **service.result_cache.stats()}
+
+
+@router.get("/plan_library")
+async def plan_library_stats(
+    service: ProjectService = Depends(get_project_service),
+) -> Dict[str, Any]:
+    plan_library = service.search_agent.plan_library
+    if plan_library is None:
+        return {"enabled": False}
+    return {"enabled": True, **plan_library.stats()}
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, AsyncGenerator, Optional
+from typing import List, Dict, Any, AsyncGenerator, Literal, Optional
 from supabase import Client
+from core.config import settings
 from core.dependencies import get_supabase_client
+from core.disconnect import disconnect_checker
+from core.idempotency import run_idempotent
+from core.single_flight import request_key, single_flight
 from services.idea_service import IdeaService  # IdeaService 임포트
+from services.sse_stream import SseStreamService
 
 
 router = APIRouter()
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
 
 class ChatRequest(BaseModel):
     user_id: str
@@ -16,17 +23,71 @@ class ChatRequest(BaseModel):
     chat_history: List[Dict[str, str]]
     prompt: str
     referenced_ideas: List[str]
+    # 클라이언트 연결이 끊겼을 때 부분 답변을 저장할지(persist) 버릴지(discard).
+    # 지정하지 않으면 서버 기본값(IDEA_HELPER_ON_DISCONNECT)을 사용합니다.
+    on_disconnect: Optional[Literal["persist", "discard"]] = None
 
 
 def get_idea_service(supabase: Client = Depends(get_supabase_client)) -> IdeaService:
     return IdeaService(supabase)
 
 
+_sse_stream_service_instance = None
+
+
+def get_sse_stream_service() -> SseStreamService:
+    global _sse_stream_service_instance
+    if _sse_stream_service_instance is None:
+        _sse_stream_service_instance = SseStreamService()
+    return _sse_stream_service_instance
+
+
 @router.post("_helper")
 async def idea_helper(
-    request: ChatRequest, service: IdeaService = Depends(get_idea_service)
+    request: ChatRequest,
+    http_request: Request,
+    stream: Literal["text", "sse"] = Query("text"),
+    accept: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+    service: IdeaService = Depends(get_idea_service),
+    sse_service: SseStreamService = Depends(get_sse_stream_service),
 ) -> StreamingResponse:
+    """
+    아이디어 도우미 답변 스트리밍.
+
+    기본은 text/plain 청크 스트림이고, ?stream=sse 또는 Accept: text/event-stream이면
+    SSE로 보냅니다. SSE 모드에서 Last-Event-ID 헤더로 다시 요청하면 보관 중인 생성의
+    끊긴 지점부터 이어서 보내며 Gemini를 다시 호출하지 않습니다.
+
+    클라이언트 연결이 끊기면 Gemini 스트림을 중단합니다 (SSE 모드는 재연결 유예 후).
+    """
+    on_disconnect = request.on_disconnect or settings.idea_helper_on_disconnect
     try:
+        if stream == "sse" or (accept and "text/event-stream" in accept):
+            resumed = sse_service.resume(last_event_id, request.user_id)
+            if resumed is not None:
+                generation, after_seq = resumed
+            else:
+                generation, after_seq = (
+                    sse_service.start(
+                        request.user_id,
+                        service.generate_idea_stream(
+                            user_id=request.user_id,
+                            chat_id=request.chat_id,
+                            chat_history=request.chat_history,
+                            prompt_text=request.prompt,
+                            referenced_ideas=request.referenced_ideas,
+                            on_disconnect=on_disconnect,
+                        ),
+                    ),
+                    0,
+                )
+            return StreamingResponse(
+                generation.subscribe(after_seq),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
+            )
+
         return StreamingResponse(
             service.generate_idea_stream(
                 user_id=request.user_id,
@@ -34,6 +95,8 @@ async def idea_helper(
                 chat_history=request.chat_history,
                 prompt_text=request.prompt,
                 referenced_ideas=request.referenced_ideas,
+                disconnect_check=disconnect_checker(http_request),
+                on_disconnect=on_disconnect,
             ),
             media_type="text/plain",
         )
@@ -49,17 +112,55 @@ async def idea_helper(
         )
 
 
+@router.get("_helper/{generation_id}")
+async def idea_helper_events(
+    generation_id: str,
+    user_id: str,
+    last_event_id: Optional[str] = Header(None),
+    sse_service: SseStreamService = Depends(get_sse_stream_service),
+) -> StreamingResponse:
+    """보관 중인 SSE 생성을 다시 받습니다 (EventSource 재연결용 GET)."""
+    generation = sse_service.get(generation_id, user_id)
+    if generation is None:
+        raise HTTPException(
+            status_code=404, detail="스트림을 찾을 수 없거나 보관 기간이 지났습니다."
+        )
+    resumed = sse_service.resume(last_event_id, user_id)
+    after_seq = (
+        resumed[1]
+        if resumed is not None and resumed[0].generation_id == generation_id
+        else 0
+    )
+    return StreamingResponse(
+        generation.subscribe(after_seq),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.post("_report")
 async def idea_report(
-    request: ChatRequest, service: IdeaService = Depends(get_idea_service)
+    request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None),
+    service: IdeaService = Depends(get_idea_service),
 ) -> Dict[str, Any]:
+    payload = request.model_dump(exclude={"on_disconnect"})
     try:
-        return await service.create_idea_report(
-            user_id=request.user_id,
-            chat_id=request.chat_id,
-            chat_history=request.chat_history,
-            prompt_text=request.prompt,
-            referenced_ideas=request.referenced_ideas,
+        return await run_idempotent(
+            idempotency_key,
+            "ideas_report",
+            request.user_id,
+            payload,
+            lambda: single_flight.run(
+                request_key("ideas_report", payload),
+                lambda: service.create_idea_report(
+                    user_id=request.user_id,
+                    chat_id=request.chat_id,
+                    chat_history=request.chat_history,
+                    prompt_text=request.prompt,
+                    referenced_ideas=request.referenced_ideas,
+                ),
+            ),
         )
     except HTTPException as e:
         raise e
@@ -0,0 +1,87 @@
+"""
+검색 작업 API.
+
+작업 레지스트리와 워커 프로세스 풀은 이 API 프로세스 안에 있습니다(JobService 참고).
+uvicorn --workers 등으로 API 프로세스를 여러 개 띄우면 작업 조회/취소가 작업을 만든
+프로세스로 가야 하므로, 검색 작업을 쓰는 배포는 API 프로세스를 하나로 두거나 작업 id 기준
+sticky 라우팅을 해야 합니다.
+"""
+
+import json
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import Field
+from typing import Dict, Any
+
+from routers.project_router import ProjectSearchIdeaRequest
+from services.job_service import JobService
+
+router = APIRouter()
+
+
+JOB_MIN_PRIORITY = -10
+JOB_MAX_PRIORITY = 10
+
+
+class SearchJobRequest(ProjectSearchIdeaRequest):
+    # 클수록 먼저 실행됩니다. 클라이언트가 정하는 값이므로 범위를 제한합니다.
+    priority: int = Field(default=0, ge=JOB_MIN_PRIORITY, le=JOB_MAX_PRIORITY)
+
+
+_job_service_instance = None
+
+
+def get_job_service() -> JobService:
+    global _job_service_instance
+    if _job_service_instance is None:
+        _job_service_instance = JobService()
+    return _job_service_instance
+
+
+async def shutdown_job_service() -> None:
+    if _job_service_instance is not None:
+        await _job_service_instance.shutdown()
+
+
+@router.post("/search")
+async def submit_search_job(
+    request: SearchJobRequest, service: JobService = Depends(get_job_service)
+) -> Dict[str, Any]:
+    # 작업은 클라이언트 연결과 무관하게 실행되므로 on_disconnect는 넘기지 않습니다.
+    payload = request.model_dump(exclude={"priority", "on_disconnect"})
+    job = await service.submit(
+        kind="search_ideas",
+        user_id=request.user_id,
+        payload=payload,
+        priority=request.priority,
+    )
+    return {"job_id": job.job_id, "status": job.status}
+
+
+# 조회/취소는 작업을 제출한 user_id로만 할 수 있습니다. 다른 사용자의 작업이면 404입니다.
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str, user_id: str, service: JobService = Depends(get_job_service)
+) -> Dict[str, Any]:
+    return service.get(job_id, user_id).to_dict()
+
+
+@router.get("/{job_id}/events")
+async def stream_job(
+    job_id: str, user_id: str, service: JobService = Depends(get_job_service)
+) -> StreamingResponse:
+    service.get(job_id, user_id)  # 없거나 다른 사용자의 작업이면 404
+
+    async def event_stream():
+        async for snapshot in service.watch(job_id, user_id):
+            yield f"event: {snapshot['status']}\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.delete("/{job_id}")
+async def cancel_job(
+    job_id: str, user_id: str, service: JobService = Depends(get_job_service)
+) -> Dict[str, Any]:
+    job = await service.cancel(job_id, user_id)
+    return {"job_id": job.job_id, "status": job.status}
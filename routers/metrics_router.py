@@ -0,0 +1,176 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import List
+
+from core.admission import admission_controller
+from core.loop_monitor import loop_monitor
+from core.metrics import MetricFamily, registry
+from core.single_flight import single_flight
+from routers.idea_router import get_sse_stream_service
+from routers.project_router import current_project_service
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _collect_search_agent() -> List[MetricFamily]:
+    service = current_project_service()
+    if service is None:
+        return []
+    families: List[MetricFamily] = []
+    if service.result_cache is not None:
+        stats = service.result_cache.stats()
+        families += [
+            (
+                "search_cache_entries",
+                "gauge",
+                "시맨틱 결과 캐시 항목 수",
+                [({}, stats["entries"])],
+            ),
+            (
+                "search_cache_hits_total",
+                "counter",
+                "시맨틱 결과 캐시 적중 수",
+                [({}, stats["hits"])],
+            ),
+            (
+                "search_cache_misses_total",
+                "counter",
+                "시맨틱 결과 캐시 미스 수",
+                [({}, stats["misses"])],
+            ),
+        ]
+    plan_library = service.search_agent.plan_library
+    if plan_library is not None:
+        stats = plan_library.stats()
+        families += [
+            (
+                "plan_library_hits_total",
+                "counter",
+                "계획 라이브러리 적중 수",
+                [({}, stats["hits"])],
+            ),
+            (
+                "plan_library_misses_total",
+                "counter",
+                "계획 라이브러리 미스 수",
+                [({}, stats["misses"])],
+            ),
+        ]
+    servers = service.search_agent.mcp_pool.stats()
+    families += [
+        (
+            "mcp_server_healthy",
+            "gauge",
+            "MCP 서버 연결 상태 (1: 정상)",
+            [
+                ({"server": name}, int(stats["healthy"]))
+                for name, stats in servers.items()
+            ],
+        ),
+        (
+            "mcp_server_tools",
+            "gauge",
+            "MCP 서버가 제공하는 도구 수",
+            [
+                ({"server": name}, len(stats["tools"]))
+                for name, stats in servers.items()
+            ],
+        ),
+    ]
+    return families
+
+
+def _collect_admission() -> List[MetricFamily]:
+    stats = admission_controller.stats()
+    return [
+        (
+            "admission_in_flight",
+            "gauge",
+            "라우트 클래스별 실행 중인 요청 수",
+            [({"class": name}, s["in_flight"]) for name, s in stats.items()],
+        ),
+        (
+            "admission_queued",
+            "gauge",
+            "라우트 클래스별 대기 중인 요청 수",
+            [({"class": name}, s["queued"]) for name, s in stats.items()],
+        ),
+        (
+            "admission_admitted_total",
+            "counter",
+            "라우트 클래스별 통과한 요청 수",
+            [({"class": name}, s["admitted"]) for name, s in stats.items()],
+        ),
+        (
+            "admission_rejected_total",
+            "counter",
+            "라우트 클래스별 거절한 요청 수",
+            [
+                ({"class": name, "reason": reason}, count)
+                for name, s in stats.items()
+                for reason, count in s["rejected"].items()
+            ],
+        ),
+    ]
+
+
+def _collect_single_flight() -> List[MetricFamily]:
+    return [
+        (
+            "single_flight_requests_total",
+            "counter",
+            "single-flight 요청 수 (computed: 직접 계산, joined: 진행 중 합류, window_hits: 최근 결과 재사용)",
+            [
+                ({"outcome": outcome}, count)
+                for outcome, count in single_flight.stats.items()
+            ],
+        )
+    ]
+
+
+def _collect_sse() -> List[MetricFamily]:
+    generations = list(get_sse_stream_service().generations.values())
+    active = sum(1 for generation in generations if not generation.done)
+    return [
+        ("sse_generations_active", "gauge", "진행 중인 SSE 생성 수", [({}, active)]),
+        (
+            "sse_generations_stored",
+            "gauge",
+            "replay buffer에 보관 중인 SSE 생성 수",
+            [({}, len(generations))],
+        ),
+    ]
+
+
+def _collect_event_loop() -> List[MetricFamily]:
+    stats = loop_monitor.stats()
+    samples = [
+        ({"quantile": quantile}, stats[f"lag_ms_{key}"] / 1000)
+        for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99"))
+        if stats[f"lag_ms_{key}"] is not None
+    ]
+    return [
+        (
+            "event_loop_lag_recent_seconds",
+            "gauge",
+            "최근 이벤트 루프 지연 백분위수",
+            samples,
+        )
+    ]
+
+
+for _collector in (
+    _collect_search_agent,
+    _collect_admission,
+    _collect_single_flight,
+    _collect_sse,
+    _collect_event_loop,
+):
+    registry.register_collector(_collector)
+
+
+@router.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
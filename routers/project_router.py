@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from pydantic import BaseModel
 from supabase import Client
 
 
+from core.config import settings
 from core.dependencies import get_supabase_client
+from core.disconnect import run_until_disconnect
+from core.idempotency import run_idempotent
+from core.single_flight import request_key, single_flight
 from services.project_service import ProjectService, create_project_service
-from typing import Dict, Any
+from typing import Dict, Any, Literal, Optional
 import asyncio
+import time
 
 router = APIRouter()
 
@@ -27,15 +32,24 @@ class ProjectSearchIdeaRequest(BaseModel):
     project_id: str
     prompt: str
     ai_result_id: str = None
+    # none | memory | sqlite. 지정하지 않으면 서버 기본값(SEARCH_CHECKPOINT_MODE)을 사용합니다.
+    checkpoint_mode: Optional[Literal["none", "memory", "sqlite"]] = None
+    # memory 모드에서 최종 스냅샷 하나를 SQLite에 남길지 여부
+    persist_snapshot: bool = False
+    # 시맨틱 결과 캐시 사용 여부와 범위(user | project, 기본값: SEARCH_CACHE_SCOPE).
+    # 다른 사용자의 결과를 받을 수 있는 global은 서버 설정으로만 켤 수 있습니다.
+    use_cache: bool = True
+    cache_scope: Optional[Literal["user", "project"]] = None
+    # 클라이언트 연결이 끊겼을 때 남은 단계를 건너뛰고 부분 결과를 요약/저장할지(persist),
+    # 실행을 바로 취소할지(discard). 지정하지 않으면 서버 기본값(SEARCH_ON_DISCONNECT).
+    on_disconnect: Optional[Literal["persist", "discard"]] = None
 
 
 _project_service_instance = None
 _initialization_lock = asyncio.Lock()
 
 
-async def get_project_service(
-    supabase: Client = Depends(get_supabase_client),
-) -> ProjectService:
+async def _ensure_project_service(supabase: Client) -> ProjectService:
     global _project_service_instance
     if _project_service_instance is None:
         async with _initialization_lock:
@@ -44,14 +58,58 @@ async def get_project_service(
     return _project_service_instance
 
 
+async def get_project_service(
+    supabase: Client = Depends(get_supabase_client),
+) -> ProjectService:
+    return await _ensure_project_service(supabase)
+
+
+def current_project_service() -> Optional[ProjectService]:
+    """이미 만들어진 ProjectService. 아직 초기화 전이면 None (만들지 않습니다)."""
+    return _project_service_instance
+
+
+async def warm_up_project_service() -> Dict[str, float]:
+    """
+    ProjectService(SearchAgent 생성, 그래프 컴파일, 체크포인트 DB 연결)를 미리 만들고
+    MCP 서버를 미리 띄웁니다. 단계별 소요 시간(초)을 반환합니다.
+    """
+    timings = {}
+    start = time.perf_counter()
+    service = await _ensure_project_service(get_supabase_client())
+    timings["project_service_seconds"] = round(time.perf_counter() - start, 3)
+    if settings.warmup_mcp_servers:
+        start = time.perf_counter()
+        await service.search_agent.mcp_pool.start_all()
+        timings["mcp_servers_seconds"] = round(time.perf_counter() - start, 3)
+    return timings
+
+
+async def shutdown_project_service() -> None:
+    if _project_service_instance is not None:
+        await _project_service_instance.search_agent.close()
+
+
 @router.post("_plan")
 async def plan_recommendation(
     request: ProjectPlanGetRequest,
+    idempotency_key: Optional[str] = Header(None),
     service: ProjectService = Depends(get_project_service),
 ) -> Dict[str, Any]:
     try:
-        return await service.recommend_project_plan(
-            user_id=request.user_id, project_id=request.project_id
+        # 같은 Idempotency-Key의 재시도는 저장된 응답을 받고, 더블클릭/재시도로 동시에
+        # 들어온 같은 요청은 하나의 계산 결과를 함께 받습니다.
+        return await run_idempotent(
+            idempotency_key,
+            "projects_plan",
+            request.user_id,
+            request.model_dump(),
+            lambda: single_flight.run(
+                request_key("projects_plan", request.model_dump()),
+                lambda: service.recommend_project_plan(
+                    user_id=request.user_id, project_id=request.project_id
+                ),
+            ),
         )
     except HTTPException as e:
         raise e
@@ -66,13 +124,23 @@ async def plan_recommendation(
 @router.post("_final")
 async def plan_organization(
     request: ProjectPlanFinalGetRequest,
+    idempotency_key: Optional[str] = Header(None),
     service: ProjectService = Depends(get_project_service),
 ) -> Dict[str, Any]:
     try:
-        return await service.organize_project_plan(
-            user_id=request.user_id,
-            project_id=request.project_id,
-            plan_id=request.plan_id,
+        return await run_idempotent(
+            idempotency_key,
+            "projects_final",
+            request.user_id,
+            request.model_dump(),
+            lambda: single_flight.run(
+                request_key("projects_final", request.model_dump()),
+                lambda: service.organize_project_plan(
+                    user_id=request.user_id,
+                    project_id=request.project_id,
+                    plan_id=request.plan_id,
+                ),
+            ),
         )
     except HTTPException as e:
         raise e
@@ -84,17 +152,52 @@ async def plan_organization(
         )
 
 
+def _search_on_disconnect(request: ProjectSearchIdeaRequest):
+    """(search_ideas에 넘길 stop_event, 연결 종료 시 호출할 함수)"""
+    if (request.on_disconnect or settings.search_on_disconnect) == "discard":
+        return None, None
+    stop_event = asyncio.Event()
+    return stop_event, stop_event.set
+
+
 @router.post("_search_idea")
 async def search_idea(
     request: ProjectSearchIdeaRequest,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None),
     service: ProjectService = Depends(get_project_service),
 ) -> Dict[str, Any]:
-    try:
-        return await service.search_ideas(
+    stop_event, on_disconnect = _search_on_disconnect(request)
+
+    def search():
+        return service.search_ideas(
             user_id=request.user_id,
             project_id=request.project_id,
             prompt=request.prompt,
             ai_result_id=request.ai_result_id,
+            checkpoint_mode=request.checkpoint_mode,
+            persist_snapshot=request.persist_snapshot,
+            use_cache=request.use_cache,
+            cache_scope=request.cache_scope,
+            stop_event=stop_event,
+        )
+
+    try:
+        if not idempotency_key:
+            return await run_until_disconnect(http_request, search(), on_disconnect)
+        # 키가 있으면 검색은 요청과 분리된 작업으로 실행하고, 이 요청은 결과를 기다리기만
+        # 합니다. 연결이 끊기면 이 요청의 대기만 취소되고, 같은 키로 재시도한 요청이 남아
+        # 있으면 검색은 계속됩니다. 모두 떠나면 on_disconnect(persist) 또는 취소(discard).
+        return await run_until_disconnect(
+            http_request,
+            run_idempotent(
+                idempotency_key,
+                "projects_search_idea",
+                request.user_id,
+                request.model_dump(),
+                search,
+                on_abandon=on_disconnect,
+            ),
         )
     except HTTPException as e:
         raise e
@@ -104,3 +207,35 @@ async def search_idea(
             status_code=500,
             detail="프로젝트 계획 구성 중 알 수 없는 서버 오류가 발생했습니다.",
         )
+
+
+@router.post("_search_idea_resume")
+async def search_idea_resume(
+    request: ProjectSearchIdeaRequest,
+    http_request: Request,
+    service: ProjectService = Depends(get_project_service),
+) -> Dict[str, Any]:
+    stop_event, on_disconnect = _search_on_disconnect(request)
+    try:
+        return await run_until_disconnect(
+            http_request,
+            service.search_ideas(
+                user_id=request.user_id,
+                project_id=request.project_id,
+                prompt=request.prompt,
+                ai_result_id=request.ai_result_id,
+                checkpoint_mode=request.checkpoint_mode,
+                persist_snapshot=request.persist_snapshot,
+                resume_only=True,
+                stop_event=stop_event,
+            ),
+            on_disconnect,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"search_idea_resume 처리 중 예외: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="검색 실행 재개 중 알 수 없는 서버 오류가 발생했습니다.",
+        )
@@ -1,11 +1,14 @@
 import json
 import asyncio
-from typing import List, Dict, Any, AsyncGenerator, Optional
+import time
+from typing import List, Dict, Any, AsyncGenerator, Awaitable, Callable, Optional
 from supabase import Client
 from core import gemini
 from prompts.idea import IDEA_HELPER_PROMPT, IDEA_REPORT_PROMPT
 from fastapi import HTTPException
 from core.logger import get_logger
+from core.metrics import IDEAS_HELPER_TTFT
+from core.tracing import traced_execute
 
 logger = get_logger(__name__)
 
@@ -22,12 +25,22 @@ class IdeaService:
         chat_history: List[Dict[str, str]] = [],
         prompt_text: str = "",
         referenced_ideas: Optional[List[str]] = None,
+        disconnect_check: Optional[Callable[[], Awaitable[bool]]] = None,
+        on_disconnect: str = "persist",
     ) -> AsyncGenerator[str, None]:
+        """
+        Gemini 답변을 청크 단위로 내보내고, 끝나면 대화 쌍을 ai_chats에 저장합니다.
+
+        disconnect_check가 True를 돌려주거나 스트림이 취소되면(클라이언트 연결 종료)
+        Gemini 스트림을 닫고, on_disconnect가 "persist"면 그때까지의 답변을 저장하고
+        "discard"면 저장하지 않습니다.
+        """
+        started = time.perf_counter()
         logger.info(
             f"Generating idea stream for user_id: {user_id}, chat_id: {chat_id}"
         )
-        logger.debug(f"Prompt text: {prompt_text}")
-        logger.debug(f"Referenced ideas: {referenced_ideas}")
+        logger.debug("Prompt text: %s", prompt_text)
+        logger.debug("Referenced ideas: %s", referenced_ideas)
 
         referenced_ideas_message = []
         if referenced_ideas:
@@ -36,14 +49,16 @@ class IdeaService:
             )
             for idea_id in referenced_ideas:
                 try:
-                    response = (
+                    response = await asyncio.to_thread(
+                        traced_execute,
                         self.supabase.table("idea_record")
                         .select("title, data_content")
                         .eq("id", str(idea_id))
                         .eq("user_id", user_id)
-                        .execute()
                     )
-                    logger.debug(f"Supabase response for idea_id {idea_id}: {response}")
+                    logger.debug(
+                        "Supabase response for idea_id %s: %s", idea_id, response
+                    )
                     if response.data:
                         record = response.data[0]
                         title = record.get("title", "제목 없음")
@@ -54,7 +69,7 @@ class IdeaService:
                         referenced_ideas_message.append(
                             {"role": "user", "content": idea_text}
                         )
-                        logger.debug(f"Added referenced idea {idea_id} to messages.")
+                        logger.debug("Added referenced idea %s to messages.", idea_id)
                     else:
                         logger.warning(
                             f"Idea with ID {idea_id} not found for user {user_id}."
@@ -66,7 +81,7 @@ class IdeaService:
                     )
 
         logger.debug(
-            f"Referenced ideas messages to be used: {referenced_ideas_message}"
+            "Referenced ideas messages to be used: %s", referenced_ideas_message
         )
 
         stream_response = None
@@ -90,32 +105,96 @@ class IdeaService:
         full_response = ""
         try:
             if stream_response:
-                async for chunk in stream_response:
-                    if hasattr(chunk, "text") and chunk.text:
-                        full_response += chunk.text
-                        yield chunk.text
-                    elif isinstance(chunk, str):
-                        full_response += chunk
-                        yield chunk
+                disconnected = False
+                try:
+                    async for chunk in stream_response:
+                        text = getattr(chunk, "text", None) or (
+                            chunk if isinstance(chunk, str) else None
+                        )
+                        if text:
+                            if not full_response:
+                                IDEAS_HELPER_TTFT.observe(time.perf_counter() - started)
+                            full_response += text
+                            yield text
+                        if disconnect_check is not None and await disconnect_check():
+                            disconnected = True
+                            break
+                except (asyncio.CancelledError, GeneratorExit):
+                    disconnected = True
+                    raise
+                finally:
+                    if disconnected:
+                        # 남은 Gemini 스트림을 끝까지 받지 않도록 바로 닫습니다.
+                        await self._close_stream(stream_response)
+                        logger.info(
+                            f"Client disconnected, Gemini stream closed after {len(full_response)} chars "
+                            f"(on_disconnect: {on_disconnect})."
+                        )
+                        if on_disconnect == "persist" and full_response:
+                            await asyncio.to_thread(
+                                self._save_message_pair,
+                                user_id,
+                                chat_id,
+                                prompt_text,
+                                referenced_ideas_message,
+                                full_response,
+                            )
+                if disconnected:
+                    return
                 logger.info("Finished streaming Gemini response.")
             else:
                 logger.warning("Gemini stream_response was None, skipping streaming.")
 
-            referenced_ideas_messages_str = ""
-            for i in referenced_ideas_message:
-                referenced_ideas_messages_str += str(i)
+            await asyncio.to_thread(
+                self._save_message_pair,
+                user_id,
+                chat_id,
+                prompt_text,
+                referenced_ideas_message,
+                full_response,
+            )
 
-            message_pair = {
-                "user": {
-                    "role": "user",
-                    "content": prompt_text + referenced_ideas_messages_str,
-                },
-                "assistant": {"role": "assistant", "content": full_response},
-            }
-            logger.debug(f"Message pair to save: {message_pair}")
+        except Exception as e:
+            logger.error(
+                f"Error during streaming or saving (generate_idea_stream): {str(e)}",
+                exc_info=True,
+            )
+            yield f"스트리밍 처리 또는 저장 중 오류가 발생했습니다: {str(e)}"
+
+    @staticmethod
+    async def _close_stream(stream_response) -> None:
+        aclose = getattr(stream_response, "aclose", None)
+        if aclose is None:
+            return
+        try:
+            await aclose()
+        except Exception as e:
+            logger.warning(f"Error closing Gemini stream: {str(e)}")
 
-            try:
-                logger.info(f"Saving message pair to Supabase for chat_id: {chat_id}")
+    def _save_message_pair(
+        self,
+        user_id: str,
+        chat_id: str,
+        prompt_text: str,
+        referenced_ideas_message: List[Dict[str, str]],
+        full_response: str,
+    ) -> None:
+        referenced_ideas_messages_str = ""
+        for i in referenced_ideas_message:
+            referenced_ideas_messages_str += str(i)
+
+        message_pair = {
+            "user": {
+                "role": "user",
+                "content": prompt_text + referenced_ideas_messages_str,
+            },
+            "assistant": {"role": "assistant", "content": full_response},
+        }
+        logger.debug("Message pair to save: %s", message_pair)
+
+        try:
+            logger.info(f"Saving message pair to Supabase for chat_id: {chat_id}")
+            traced_execute(
                 self.supabase.rpc(
                     "append_message_pair",
                     {
@@ -123,20 +202,14 @@ class IdeaService:
                         "_uid": user_id,
                         "_pair": json.dumps(message_pair),
                     },
-                ).execute()
-                logger.info("Message pair saved successfully to Supabase.")
-            except Exception as e:
-                logger.error(
-                    f"Supabase RPC call error (generate_idea_stream): {str(e)}",
-                    exc_info=True,
                 )
-
+            )
+            logger.info("Message pair saved successfully to Supabase.")
         except Exception as e:
             logger.error(
-                f"Error during streaming or saving (generate_idea_stream): {str(e)}",
+                f"Supabase RPC call error (generate_idea_stream): {str(e)}",
                 exc_info=True,
             )
-            yield f"스트리밍 처리 또는 저장 중 오류가 발생했습니다: {str(e)}"
 
     async def create_idea_report(
         self,
@@ -147,8 +220,8 @@ class IdeaService:
         referenced_ideas: List[str],
     ) -> Dict[str, Any]:
         logger.info(f"Creating idea report for user_id: {user_id}, chat_id: {chat_id}")
-        logger.debug(f"Prompt text for report: {prompt_text}")
-        logger.debug(f"Referenced ideas for report: {referenced_ideas}")
+        logger.debug("Prompt text for report: %s", prompt_text)
+        logger.debug("Referenced ideas for report: %s", referenced_ideas)
 
         current_message_content = (
             prompt_text if prompt_text else "대화내용을 종합해서 리포트 작성해줘"
@@ -158,14 +231,15 @@ class IdeaService:
         response_text = ""
         try:
             logger.info("Calling Gemini API for report generation...")
-            response_text = gemini.process_data(
+            response_text = await asyncio.to_thread(
+                gemini.process_data,
                 data=current_message["content"],
                 history=chat_history,
                 system_prompt=IDEA_REPORT_PROMPT,
                 stream=False,
             )
             logger.info("Gemini API call for report successful.")
-            logger.debug(f"Generated report text (raw): {response_text[:200]}...")
+            logger.debug("Generated report text (raw): %s...", response_text[:200])
         except Exception as e:
             logger.error(
                 f"Gemini API call error (create_idea_report): {str(e)}", exc_info=True
@@ -181,15 +255,23 @@ class IdeaService:
                     f"Updating report for {len(referenced_ideas)} referenced ideas."
                 )
                 for idea_id in referenced_ideas:
-                    logger.debug(f"Updating report for idea_id: {idea_id}")
-                    self.supabase.table("idea_record").update(
-                        {"ai_report": response_text}
-                    ).eq("id", str(idea_id)).eq("user_id", user_id).execute()
+                    logger.debug("Updating report for idea_id: %s", idea_id)
+                    await asyncio.to_thread(
+                        traced_execute,
+                        self.supabase.table("idea_record")
+                        .update({"ai_report": response_text})
+                        .eq("id", str(idea_id))
+                        .eq("user_id", user_id)
+                    )
 
             logger.info(f"Updating summary for chat_id: {chat_id}")
-            self.supabase.table("ai_chats").update({"summary": response_text}).eq(
-                "id", chat_id
-            ).eq("user_id", user_id).execute()
+            await asyncio.to_thread(
+                traced_execute,
+                self.supabase.table("ai_chats")
+                .update({"summary": response_text})
+                .eq("id", chat_id)
+                .eq("user_id", user_id)
+            )
             logger.info("Report saved successfully to Supabase.")
 
             return {
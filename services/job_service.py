@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException
+
+from core.config import settings
+from core.logger import get_logger
+from services.job_worker import run_search_job
+
+logger = get_logger(__name__)
+
+JOB_FINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    user_id: str
+    payload: Dict[str, Any]
+    priority: int = 0
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    version: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "user_id": self.user_id,
+            "priority": self.priority,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "status_code": self.status_code,
+        }
+
+
+class JobService:
+    """
+    search_ideas를 API 프로세스 밖의 워커 프로세스 풀에서 실행하는 작업 큐.
+
+    - submit은 작업 id를 즉시 반환하고, 작업은 우선순위 큐에 쌓입니다 (priority가 클수록 먼저).
+    - max_concurrency개의 디스패처가 큐에서 작업을 꺼내 워커 프로세스로 보냅니다.
+    - 대기 중인 작업은 바로 취소되고, 실행 중인 작업은 워커가 취소 플래그를 감지해 중단합니다.
+    - 상태는 get으로 조회하거나 watch로 변경 시마다 받아볼 수 있습니다.
+
+    제한: 작업 레지스트리와 워커 풀은 이 인스턴스를 만든 API 프로세스에 속합니다. API
+    프로세스가 여러 개이면 다른 프로세스로 간 GET /jobs/{id}는 404가 되고, 워커 수는 API
+    프로세스 수에 묶여 따로 늘릴 수 없습니다. 여러 API 프로세스가 작업을 공유하려면 작업
+    상태를 공유 저장소(Supabase 등)에 두고 워커를 별도 프로세스로 띄워야 합니다.
+    """
+
+    def __init__(
+        self,
+        worker_processes: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        result_ttl_seconds: Optional[float] = None,
+    ):
+        self.worker_processes = worker_processes or settings.search_worker_processes
+        self.max_concurrency = min(
+            max_concurrency or settings.search_worker_concurrency,
+            self.worker_processes,
+        )
+        self.max_queue_size = max_queue_size or settings.job_queue_max_size
+        self.max_active_per_user = settings.job_max_active_per_user
+        self.result_ttl_seconds = (
+            result_ttl_seconds
+            if result_ttl_seconds is not None
+            else settings.job_result_ttl_seconds
+        )
+        self.jobs: Dict[str, Job] = {}
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        self._changed = asyncio.Condition()
+        self._dispatchers: List[asyncio.Task] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._cancel_flags = None
+
+    def start(self) -> None:
+        if self._pool is not None:
+            return
+        mp_context = multiprocessing.get_context("spawn")
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.worker_processes, mp_context=mp_context
+        )
+        self._manager = mp_context.Manager()
+        self._cancel_flags = self._manager.dict()
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch_loop())
+            for _ in range(self.max_concurrency)
+        ]
+        logger.info(
+            f"JobService started: {self.worker_processes} worker processes, "
+            f"concurrency {self.max_concurrency}"
+        )
+
+    async def shutdown(self) -> None:
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+        logger.info("JobService stopped.")
+
+    def _queued_count(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == "queued")
+
+    def _active_count(self, user_id: str) -> int:
+        return sum(
+            1
+            for job in self.jobs.values()
+            if job.user_id == user_id and job.status not in JOB_FINAL_STATUSES
+        )
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        expired = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.status in JOB_FINAL_STATUSES
+            and job.finished_at
+            and now - job.finished_at > self.result_ttl_seconds
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def submit(
+        self, kind: str, user_id: str, payload: Dict[str, Any], priority: int = 0
+    ) -> Job:
+        self._evict_expired()
+        if self._queued_count() >= self.max_queue_size:
+            logger.warning(f"Job queue is full ({self.max_queue_size}). Rejecting job.")
+            raise HTTPException(
+                status_code=429, detail="작업 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요."
+            )
+        if (
+            self.max_active_per_user > 0
+            and self._active_count(user_id) >= self.max_active_per_user
+        ):
+            logger.warning(
+                "User %s already has %d active jobs. Rejecting job.",
+                user_id,
+                self.max_active_per_user,
+            )
+            raise HTTPException(
+                status_code=429,
+                detail="진행 중인 작업이 너무 많습니다. 이전 작업이 끝난 뒤 다시 시도해주세요.",
+            )
+        self.start()
+        job = Job(
+            job_id=str(uuid4()),
+            kind=kind,
+            user_id=user_id,
+            payload=payload,
+            priority=priority,
+        )
+        self.jobs[job.job_id] = job
+        await self._queue.put((-priority, next(self._sequence), job.job_id))
+        logger.info(f"Job {job.job_id} queued (kind={kind}, priority={priority}).")
+        await self._notify(job)
+        return job
+
+    def get(self, job_id: str, user_id: str) -> Job:
+        """user_id의 작업. 다른 사용자의 작업이면 존재 여부를 드러내지 않도록 똑같이 404입니다."""
+        job = self.jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+        return job
+
+    async def cancel(self, job_id: str, user_id: str) -> Job:
+        job = self.get(job_id, user_id)
+        if job.status == "queued":
+            # 큐에 남은 항목은 디스패처가 꺼낼 때 건너뜁니다.
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            await self._notify(job)
+        elif job.status == "running":
+            self._cancel_flags[job_id] = True
+            job.status = "cancelling"
+            await self._notify(job)
+        return job
+
+    async def watch(
+        self, job_id: str, user_id: str
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """작업 상태가 바뀔 때마다 스냅샷을 내보내고, 최종 상태에서 종료합니다."""
+        job = self.get(job_id, user_id)
+        seen_version = -1
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: job.version != seen_version)
+                seen_version = job.version
+                snapshot = job.to_dict()
+            yield snapshot
+            if job.status in JOB_FINAL_STATUSES:
+                return
+
+    async def _notify(self, job: Job) -> None:
+        async with self._changed:
+            job.version += 1
+            self._changed.notify_all()
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "queued":
+                continue
+
+            job.status = "running"
+            job.started_at = time.time()
+            await self._notify(job)
+            try:
+                outcome = await loop.run_in_executor(
+                    self._pool, run_search_job, job_id, job.payload, self._cancel_flags
+                )
+            except Exception as e:
+                logger.error(f"Job {job_id} worker error: {e}", exc_info=True)
+                outcome = {"status": "failed", "error": str(e), "status_code": 500}
+            finally:
+                self._cancel_flags.pop(job_id, None)
+
+            job.status = outcome["status"]
+            job.result = outcome.get("result")
+            job.error = outcome.get("error")
+            job.status_code = outcome.get("status_code")
+            job.finished_at = time.time()
+            logger.info(
+                f"Job {job_id} finished with status {job.status} "
+                f"in {job.finished_at - job.started_at:.1f}s"
+            )
+            await self._notify(job)
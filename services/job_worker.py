@@ -0,0 +1,74 @@
+"""
+검색 작업 워커 프로세스에서 실행되는 코드.
+
+JobService가 ProcessPoolExecutor(spawn)로 이 모듈의 run_search_job을 호출합니다.
+워커 프로세스마다 이벤트 루프와 ProjectService(SearchAgent + 체크포인트 DB 연결)를
+한 번만 만들고, 이후 작업에서 재사용합니다.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+CANCEL_POLL_INTERVAL_SECONDS = 0.5
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_project_service = None
+
+
+async def _get_project_service():
+    global _project_service
+    if _project_service is None:
+        from core.dependencies import get_supabase_client
+        from services.project_service import create_project_service
+
+        # 체크포인트 보존 정책과 vacuum은 같은 DB를 여는 API 프로세스가 실행합니다.
+        _project_service = await create_project_service(
+            get_supabase_client(), checkpoint_maintenance=False
+        )
+        logger.info("워커 프로세스의 ProjectService 초기화 완료.")
+    return _project_service
+
+
+async def _watch_cancel(job_id: str, cancel_flags, task: asyncio.Task) -> None:
+    while not task.done():
+        if cancel_flags.get(job_id):
+            logger.info(f"작업 {job_id} 취소 요청 감지. 실행을 중단합니다.")
+            task.cancel()
+            return
+        await asyncio.sleep(CANCEL_POLL_INTERVAL_SECONDS)
+
+
+async def _run(job_id: str, payload: Dict[str, Any], cancel_flags) -> Dict[str, Any]:
+    service = await _get_project_service()
+    task = asyncio.create_task(service.search_ideas(**payload))
+    watcher = asyncio.create_task(_watch_cancel(job_id, cancel_flags, task))
+    try:
+        result = await task
+        return {"status": "succeeded", "result": result}
+    except asyncio.CancelledError:
+        return {"status": "cancelled"}
+    except HTTPException as e:
+        return {"status": "failed", "error": e.detail, "status_code": e.status_code}
+    except Exception as e:
+        logger.error(f"작업 {job_id} 실행 중 오류: {e}", exc_info=True)
+        return {"status": "failed", "error": str(e), "status_code": 500}
+    finally:
+        watcher.cancel()
+
+
+def run_search_job(
+    job_id: str, payload: Dict[str, Any], cancel_flags
+) -> Dict[str, Any]:
+    """워커 프로세스 진입점. 결과는 pickle 가능한 dict로 반환합니다."""
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    logger.info(f"작업 {job_id} 실행 시작.")
+    return _loop.run_until_complete(_run(job_id, payload, cancel_flags))
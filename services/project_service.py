@@ -2,21 +2,55 @@ from supabase import Client
 from core import gemini
 from prompts.plan import PLAN_RECOMMENDATION_PROMPT, PLAN_ORGANIZATION_PROMPT
 from fastapi import HTTPException
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
 import json
-from agents.search_agent import SearchAgent
-from langchain_core.messages import HumanMessage
-from uuid import uuid4
+import time
+from uuid import NAMESPACE_URL, uuid5
 from datetime import datetime
+from core.config import settings
 from core.logger import get_logger
+from core.metrics import SEARCHES_IN_FLIGHT
+from core.tracing import traced_execute
+
+if TYPE_CHECKING:
+    # langchain/langgraph/MCP 어댑터를 끌어오는 무거운 모듈이라 실제 임포트는
+    # create_project_service에서 합니다. 아이디어 라우트만 쓰는 워커는 이 비용을 치르지 않습니다.
+    from agents.result_cache import SemanticResultCache
+    from agents.search_agent import SearchAgent
 
 logger = get_logger(__name__)
 
 
+def search_thread_id(
+    user_id: str, project_id: str, ai_result_id: Optional[str], prompt: str
+) -> str:
+    """(user, project, ai_result_id, prompt 해시)로 결정되는 SearchAgent thread_id.
+
+    같은 요청의 재시도가 같은 체크포인트 스레드를 가리키도록 해, 완료된 단계를 다시
+    실행하지 않고 이어서 실행할 수 있게 합니다. 동시에 들어온 같은 요청은 SearchAgent가
+    thread_id별 락으로 차례로 실행합니다.
+    """
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return str(
+        uuid5(
+            NAMESPACE_URL,
+            f"ideameer:search:{user_id}:{project_id}:{ai_result_id or ''}:{prompt_hash}",
+        )
+    )
+
+
 class ProjectService:
-    def __init__(self, supabase: Client, search_agent: SearchAgent):
+    def __init__(
+        self,
+        supabase: Client,
+        search_agent: "SearchAgent",
+        result_cache: Optional["SemanticResultCache"] = None,
+    ):
         self.supabase = supabase
         self.search_agent = search_agent
+        self.result_cache = result_cache
         logger.info("ProjectService initialized.")
 
     async def recommend_project_plan(
@@ -28,14 +62,14 @@ class ProjectService:
         system_prompt = PLAN_RECOMMENDATION_PROMPT
         try:
             logger.info("Fetching ideas from Supabase...")
-            ideas_rows = (
+            ideas_rows = await asyncio.to_thread(
+                traced_execute,
                 self.supabase.table("ideas")
                 .select("content")
                 .eq("user_id", user_id)
                 .eq("project_id", project_id)
-                .execute()
             )
-            logger.debug(f"Supabase ideas_rows response: {ideas_rows}")
+            logger.debug("Supabase ideas_rows response: %s", ideas_rows)
 
             idea_contents: List[str] = [
                 row["content"] for row in (ideas_rows.data if ideas_rows.data else [])
@@ -46,17 +80,18 @@ class ProjectService:
                 )
 
             combined_text = "\n".join(idea_contents)
-            logger.debug(f"Combined idea text for Gemini: {combined_text[:200]}...")
+            logger.debug("Combined idea text for Gemini: %s...", combined_text[:200])
 
             logger.info("Calling Gemini API for plan recommendation...")
-            response_text = gemini.process_data(
+            response_text = await asyncio.to_thread(
+                gemini.process_data,
                 data=combined_text,
                 history=[],
                 system_prompt=system_prompt,
                 stream=False,
             )
             logger.info("Gemini API call for plan recommendation successful.")
-            logger.debug(f"Gemini response_text (raw): {response_text}")
+            logger.debug("Gemini response_text (raw): %s", response_text)
             if not response_text or not response_text.strip():
                 logger.error(
                     "Gemini response_text is empty or contains only whitespace."
@@ -128,7 +163,7 @@ class ProjectService:
                     detail="JSON 데이터 파싱 후에도 plan_data가 None입니다.",
                 )
 
-            logger.debug(f"Parsed plan_data: {plan_data}")
+            logger.debug("Parsed plan_data: %s", plan_data)
 
             insert_data = {
                 "user_id": user_id,
@@ -139,8 +174,11 @@ class ProjectService:
                 "is_ai": True,
             }
             logger.info(f"Inserting new plan into Supabase: {insert_data.get('title')}")
-            insert_response = self.supabase.table("plans").insert(insert_data).execute()
-            logger.debug(f"Supabase insert response: {insert_response}")
+            insert_response = await asyncio.to_thread(
+                traced_execute,
+                self.supabase.table("plans").insert(insert_data)
+            )
+            logger.debug("Supabase insert response: %s", insert_response)
             if insert_response.data:
                 logger.info("New project plan created successfully in Supabase.")
             else:
@@ -184,15 +222,15 @@ class ProjectService:
 
         try:
             logger.info(f"Fetching plan contents from Supabase for plan_id: {plan_id}")
-            plan_response = (
+            plan_response = await asyncio.to_thread(
+                traced_execute,
                 self.supabase.table("plans")
                 .select("contents")
                 .eq("id", plan_id)
                 .eq("user_id", user_id)
                 .eq("project_id", project_id)
-                .execute()
             )
-            logger.debug(f"Supabase plan_response: {plan_response}")
+            logger.debug("Supabase plan_response: %s", plan_response)
 
             if not plan_response.data or not plan_response.data[0].get("contents"):
                 logger.error(
@@ -204,16 +242,17 @@ class ProjectService:
                 )
 
             data_to_organize = plan_response.data[0]["contents"]
-            logger.debug(f"Data to organize: {data_to_organize[:200]}...")
+            logger.debug("Data to organize: %s...", data_to_organize[:200])
 
             logger.info("Calling Gemini API for plan organization...")
-            response_text = gemini.process_data(
+            response_text = await asyncio.to_thread(
+                gemini.process_data,
                 data=data_to_organize,
                 system_prompt=system_prompt,
                 stream=False,
             )
             logger.info("Gemini API call for plan organization successful.")
-            logger.debug(f"Organized plan text (raw): {response_text[:200]}...")
+            logger.debug("Organized plan text (raw): %s...", response_text[:200])
 
         except HTTPException:
             raise
@@ -228,7 +267,8 @@ class ProjectService:
 
         try:
             logger.info(f"Updating organized plan in Supabase for plan_id: {plan_id}")
-            update_response = (
+            update_response = await asyncio.to_thread(
+                traced_execute,
                 self.supabase.table("plans")
                 .update(
                     {
@@ -239,9 +279,8 @@ class ProjectService:
                 .eq("id", plan_id)
                 .eq("user_id", user_id)
                 .eq("project_id", project_id)
-                .execute()
             )
-            logger.debug(f"Supabase update response: {update_response}")
+            logger.debug("Supabase update response: %s", update_response)
             if update_response.data:
                 logger.info("Project plan updated successfully in Supabase.")
             else:
@@ -271,30 +310,57 @@ class ProjectService:
                 status_code=500, detail=f"데이터베이스 업데이트 중 오류: {str(e)}"
             )
 
-    async def search_ideas(
+    async def _run_search_agent(
         self,
         user_id: str,
         project_id: str,
         prompt: str,
-        ai_result_id: Optional[str] = None,
-    ) -> Dict[str, any]:
-        logger.info(
-            f"Searching ideas for user_id: {user_id}, project_id: {project_id}, prompt: {prompt}, ai_result_id: {ai_result_id}"
-        )
+        ai_result_id: Optional[str],
+        checkpoint_mode: Optional[str],
+        persist_snapshot: bool,
+        resume_only: bool,
+        stop_event: Optional[asyncio.Event] = None,
+    ) -> Tuple[Dict[str, any], Dict[str, any]]:
+        """SearchAgent를 실행(또는 재개)하고 (DB 저장용 결과, 최종 상태)를 반환합니다."""
+        from langchain_core.messages import HumanMessage
 
         initial_state = {
             "initial_request": prompt,
             "messages": [HumanMessage(content=prompt)],
         }
-        config = {"configurable": {"thread_id": str(uuid4())}}
+        thread_id = search_thread_id(user_id, project_id, ai_result_id, prompt)
+        # user_id는 계획 라이브러리 템플릿을 사용자별로 나누는 데 씁니다.
+        config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
+
+        if resume_only and checkpoint_mode is None:
+            checkpoint_mode = await self.search_agent.find_checkpoint_mode(config)
+            if checkpoint_mode is None:
+                logger.error(f"No resumable search checkpoint for thread {thread_id}")
+                raise HTTPException(
+                    status_code=404, detail="재개할 수 있는 검색 실행을 찾을 수 없습니다."
+                )
 
-        logger.info("Running SearchAgent...")
-        search_agent_final_state_values = await self.search_agent.run_async(
-            initial_state, config
-        )
+        logger.info(f"Running SearchAgent (thread_id: {thread_id})...")
+        SEARCHES_IN_FLIGHT.inc()
+        try:
+            search_agent_final_state_values = await self.search_agent.run_async(
+                initial_state,
+                config,
+                checkpoint_mode=checkpoint_mode,
+                persist_snapshot=persist_snapshot,
+                resume_only=resume_only,
+                stop_event=stop_event,
+            )
+        except LookupError as e:
+            logger.error(f"SearchAgent resume failed: {e}")
+            raise HTTPException(
+                status_code=404, detail="재개할 수 있는 검색 실행을 찾을 수 없습니다."
+            )
+        finally:
+            SEARCHES_IN_FLIGHT.dec()
         logger.info("SearchAgent run completed.")
         logger.debug(
-            f"SearchAgent final state values: {search_agent_final_state_values}"
+            "SearchAgent final state values: %s", search_agent_final_state_values
         )
 
         structured_summary_data = search_agent_final_state_values.get("final_summary")
@@ -335,12 +401,83 @@ class ProjectService:
         logger.info(
             f"Processed references from SearchAgent: {len(references_list)} items."
         )
-        logger.debug(f"References content: {references_list}")
+        logger.debug("References content: %s", references_list)
 
         processed_result_for_db = {
             "text_summary": text_summary,
             "references": references_list,
         }
+        return processed_result_for_db, search_agent_final_state_values
+
+    async def search_ideas(
+        self,
+        user_id: str,
+        project_id: str,
+        prompt: str,
+        ai_result_id: Optional[str] = None,
+        checkpoint_mode: Optional[str] = None,
+        persist_snapshot: bool = False,
+        resume_only: bool = False,
+        use_cache: bool = True,
+        cache_scope: Optional[str] = None,
+        stop_event: Optional[asyncio.Event] = None,
+    ) -> Dict[str, any]:
+        from agents.result_cache import cache_scope_key
+
+        logger.info(
+            f"Searching ideas for user_id: {user_id}, project_id: {project_id}, prompt: {prompt}, ai_result_id: {ai_result_id}, checkpoint_mode: {checkpoint_mode}"
+        )
+
+        scope_key = cache_scope_key(
+            cache_scope or settings.search_cache_scope, user_id, project_id
+        )
+        cache_hit = None
+        if use_cache and not resume_only and self.result_cache is not None:
+            cache_hit = self.result_cache.lookup(prompt, scope_key)
+
+        if cache_hit is not None:
+            cache_entry, similarity = cache_hit
+            logger.info(
+                f"Semantic cache hit (similarity {similarity:.3f}) for prompt: {prompt[:100]}"
+            )
+            # 에이전트를 실행하지 않았으므로 ai_results에 새 행을 만들거나 대화를 덧붙이지
+            # 않고, 캐시된 결과를 저장했던 행을 그대로 가리킵니다 (다른 사용자의 행은 제외).
+            return {
+                "status": "success",
+                "ai_result_id": (
+                    cache_entry.ai_result_id
+                    if cache_entry.user_id == user_id
+                    else None
+                ),
+                "result": cache_entry.result,
+                "cache": {
+                    "hit": True,
+                    "similarity": round(similarity, 4),
+                    "age_seconds": round(time.time() - cache_entry.created_at, 1),
+                },
+                "budget": None,
+            }
+
+        processed_result_for_db, final_state = await self._run_search_agent(
+            user_id=user_id,
+            project_id=project_id,
+            prompt=prompt,
+            ai_result_id=ai_result_id,
+            checkpoint_mode=checkpoint_mode,
+            persist_snapshot=persist_snapshot,
+            resume_only=resume_only,
+            stop_event=stop_event,
+        )
+        plan_steps = final_state.get("plan_steps") or []
+        completed = all(step.get("status") == "completed" for step in plan_steps)
+        budget_info = {
+            "usage": final_state.get("budget_usage") or {},
+            "truncated_steps": [
+                i
+                for i, step in enumerate(plan_steps)
+                if step.get("status") in ("partial", "skipped")
+            ],
+        }
 
         try:
             new_messages = (
@@ -353,7 +490,8 @@ class ProjectService:
 
             if ai_result_id is None:
                 logger.info("Creating new ai_results entry in Supabase...")
-                insert_result = (
+                insert_result = await asyncio.to_thread(
+                    traced_execute,
                     self.supabase.table("ai_results")
                     .insert(
                         {
@@ -364,9 +502,8 @@ class ProjectService:
                             "type": "search",
                         }
                     )
-                    .execute()
                 )
-                logger.debug(f"Supabase insert ai_results response: {insert_result}")
+                logger.debug("Supabase insert ai_results response: %s", insert_result)
                 created_id = insert_result.data[0]["id"] if insert_result.data else None
                 if created_id:
                     logger.info(f"New ai_results entry created with id: {created_id}")
@@ -375,24 +512,21 @@ class ProjectService:
                         f"Failed to create new ai_results entry. Response: {insert_result}"
                     )
                     raise HTTPException(status_code=500, detail="AI 결과 저장 실패")
-                return {
-                    "status": "success",
-                    "ai_result_id": created_id,
-                    "result": processed_result_for_db,
-                }
+                saved_ai_result_id = created_id
             else:
                 logger.info(
                     f"Appending messages to existing ai_results_id: {ai_result_id}"
                 )
-                existing_data_response = (
+                existing_data_response = await asyncio.to_thread(
+                    traced_execute,
                     self.supabase.table("ai_results")
                     .select("messages")
                     .eq("id", ai_result_id)
                     .eq("user_id", user_id)
-                    .execute()
                 )
                 logger.debug(
-                    f"Supabase select existing messages response: {existing_data_response}"
+                    "Supabase select existing messages response: %s",
+                    existing_data_response,
                 )
                 if not existing_data_response.data:
                     logger.error(
@@ -420,7 +554,8 @@ class ProjectService:
 
                 updated_messages = current_messages + list(new_messages)
 
-                update_response = (
+                update_response = await asyncio.to_thread(
+                    traced_execute,
                     self.supabase.table("ai_results")
                     .update(
                         {
@@ -430,9 +565,8 @@ class ProjectService:
                     )
                     .eq("id", ai_result_id)
                     .eq("user_id", user_id)
-                    .execute()
                 )
-                logger.debug(f"Supabase update ai_results response: {update_response}")
+                logger.debug("Supabase update ai_results response: %s", update_response)
                 if update_response.data:
                     logger.info(
                         f"Successfully appended messages to ai_results_id: {ai_result_id}"
@@ -442,12 +576,7 @@ class ProjectService:
                         f"Failed to update ai_results_id: {ai_result_id}. Response: {update_response}"
                     )
                     raise HTTPException(status_code=500, detail="AI 결과 업데이트 실패")
-
-                return {
-                    "status": "success",
-                    "ai_result_id": ai_result_id,
-                    "result": processed_result_for_db,
-                }
+                saved_ai_result_id = ai_result_id
 
         except HTTPException:
             raise
@@ -457,6 +586,28 @@ class ProjectService:
                 status_code=500, detail=f"아이디어 검색 결과 처리 중 오류: {str(e)}"
             )
 
+        if (
+            use_cache
+            and self.result_cache is not None
+            and completed
+            and processed_result_for_db["text_summary"]
+        ):
+            self.result_cache.store(
+                prompt,
+                scope_key,
+                processed_result_for_db,
+                ai_result_id=saved_ai_result_id,
+                user_id=user_id,
+            )
+
+        return {
+            "status": "success",
+            "ai_result_id": saved_ai_result_id,
+            "result": processed_result_for_db,
+            "cache": {"hit": False},
+            "budget": budget_info,
+        }
+
     async def create_new_project(
         self, user_id: str, title: str, description: Optional[str] = None
     ) -> Dict[str, any]:
@@ -468,8 +619,11 @@ class ProjectService:
                 "description": description,
                 "last_accessed_at": datetime.now().isoformat(),
             }
-            response = self.supabase.table("projects").insert(insert_data).execute()
-            logger.debug(f"Supabase create project response: {response}")
+            response = await asyncio.to_thread(
+                traced_execute,
+                self.supabase.table("projects").insert(insert_data)
+            )
+            logger.debug("Supabase create project response: %s", response)
             if response.data:
                 project_id = response.data[0]["id"]
                 logger.info(f"New project created successfully with id: {project_id}")
@@ -496,14 +650,14 @@ class ProjectService:
             f"Updating last_accessed_at for project_id: {project_id}, user_id: {user_id}"
         )
         try:
-            response = (
+            response = await asyncio.to_thread(
+                traced_execute,
                 self.supabase.table("projects")
                 .update({"last_accessed_at": datetime.now().isoformat()})
                 .eq("id", project_id)
                 .eq("user_id", user_id)
-                .execute()
             )
-            logger.debug(f"Supabase update_project_last_accessed response: {response}")
+            logger.debug("Supabase update_project_last_accessed response: %s", response)
             if not response.data:
                 logger.warning(
                     f"Update last_accessed_at for project {project_id} might not have affected any rows or returned no data."
@@ -519,8 +673,16 @@ class ProjectService:
             )
 
 
-async def create_project_service(supabase: Client) -> ProjectService:
+async def create_project_service(
+    supabase: Client, checkpoint_maintenance: bool = True
+) -> ProjectService:
+    from agents.result_cache import SemanticResultCache
+    from agents.search_agent import SearchAgent
+
     search_agent = SearchAgent()
-    await search_agent.setup_graph()
+    await search_agent.setup_graph(checkpoint_maintenance=checkpoint_maintenance)
     logger.info("SearchAgent instance created and graph set up for ProjectService.")
-    return ProjectService(supabase=supabase, search_agent=search_agent)
+    result_cache = SemanticResultCache() if settings.search_cache_enabled else None
+    return ProjectService(
+        supabase=supabase, search_agent=search_agent, result_cache=result_cache
+    )
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from core.config import settings
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def format_sse(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """SSE 프레임 하나. data는 JSON으로 직렬화해 한 줄로 보냅니다."""
+    frame = f"id: {event_id}\n" if event_id else ""
+    return f"{frame}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """'<generation_id>:<seq>' 형태의 Last-Event-ID를 (generation_id, seq)로 나눕니다."""
+    if not value or ":" not in value:
+        return None
+    generation_id, _, seq = value.rpartition(":")
+    try:
+        return generation_id, int(seq)
+    except ValueError:
+        return None
+
+
+class StreamGeneration:
+    """
+    생성 하나의 SSE 이벤트 기록(replay buffer).
+
+    원본 스트림은 클라이언트 연결과 별개의 태스크가 끝까지 읽어 이벤트로 쌓고, 구독자는
+    원하는 seq 이후의 이벤트를 받아 갑니다. 짧은 청크는 coalesce 창(시간/크기) 단위로
+    합쳐 하나의 delta 이벤트로 만듭니다.
+    """
+
+    def __init__(self, generation_id: str, user_id: str):
+        self.generation_id = generation_id
+        self.user_id = user_id
+        self.events: List[Tuple[int, str, Any]] = []
+        self.done = False
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.subscribers = 0
+        self._abandon_handle: Optional[asyncio.TimerHandle] = None
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.generation_id}:{seq}"
+
+    def _append(self, event: str, data: Any) -> None:
+        self.events.append((len(self.events) + 1, event, data))
+        # 기다리던 구독자를 깨우고, 다음 대기용 이벤트로 교체합니다.
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            self._append("delta", {"text": "".join(self._pending)})
+            self._pending = []
+            self._pending_chars = 0
+
+    def _add_chunk(self, text: str) -> None:
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if self._pending_chars >= settings.sse_coalesce_max_chars:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                settings.sse_coalesce_window_ms / 1000, self._flush
+            )
+
+    async def produce(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                if chunk:
+                    self._add_chunk(chunk)
+            self._flush()
+            self._append("done", {})
+        except asyncio.CancelledError:
+            self._flush()
+            self._append("error", {"message": "생성이 취소되었습니다."})
+            raise
+        except Exception as e:
+            logger.error(f"스트림 생성 {self.generation_id} 오류: {e}", exc_info=True)
+            self._flush()
+            self._append("error", {"message": f"스트리밍 중 오류가 발생했습니다: {e}"})
+        finally:
+            self.done = True
+            self.finished_at = time.time()
+
+    def _cancel_if_abandoned(self) -> None:
+        self._abandon_handle = None
+        if self.subscribers == 0 and not self.done and self.task is not None:
+            logger.info(
+                f"SSE 생성 {self.generation_id}: 재연결이 없어 생성을 취소합니다."
+            )
+            self.task.cancel()
+
+    def _attach(self) -> None:
+        self.subscribers += 1
+        if self._abandon_handle is not None:
+            self._abandon_handle.cancel()
+            self._abandon_handle = None
+
+    def _detach(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done:
+            # 구독자가 모두 끊겨도 재연결할 수 있도록 유예 시간 뒤에 취소합니다.
+            self._abandon_handle = asyncio.get_running_loop().call_later(
+                settings.sse_abandon_grace_seconds, self._cancel_if_abandoned
+            )
+
+    async def subscribe(self, after_seq: int = 0) -> AsyncGenerator[str, None]:
+        """after_seq 이후의 이벤트를 SSE 프레임으로 내보내고, 생성이 끝나면 종료합니다."""
+        self._attach()
+        try:
+            async for frame in self._frames(after_seq):
+                yield frame
+        finally:
+            self._detach()
+
+    async def _frames(self, after_seq: int) -> AsyncGenerator[str, None]:
+        yield f"retry: {settings.sse_retry_ms}\n\n"
+        yield format_sse(
+            "start",
+            {"generation_id": self.generation_id, "resumed": after_seq > 0},
+        )
+        position = min(max(after_seq, 0), len(self.events))
+        while True:
+            changed = self._changed
+            while position < len(self.events):
+                seq, event, data = self.events[position]
+                position += 1
+                yield format_sse(event, data, self.event_id(seq))
+            if self.done:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), settings.sse_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # 프록시/모바일망이 유휴 연결을 끊지 않도록 주석 프레임을 보냅니다.
+                yield ": ping\n\n"
+
+
+class SseStreamService:
+    """
+    /ideas_helper SSE 모드의 생성별 replay buffer 관리.
+
+    연결이 끊겨도 SSE_ABANDON_GRACE_SECONDS 동안은 생성이 계속되고, 같은 사용자가
+    Last-Event-ID로 다시 연결하면 Gemini를 다시 호출하지 않고 끊긴 지점부터 이어서 받습니다.
+    유예 시간 안에 재연결이 없으면 생성을 취소합니다. 끝난 생성은
+    SSE_REPLAY_TTL_SECONDS 동안, 최대 SSE_REPLAY_MAX_GENERATIONS개까지 보관합니다.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_generations: Optional[int] = None,
+    ):
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None else settings.sse_replay_ttl_seconds
+        )
+        self.max_generations = max_generations or settings.sse_replay_max_generations
+        self.generations: "OrderedDict[str, StreamGeneration]" = OrderedDict()
+
+    def _evict(self) -> None:
+        now = time.time()
+        expired = [
+            generation_id
+            for generation_id, generation in self.generations.items()
+            if generation.done and now - generation.finished_at > self.ttl_seconds
+        ]
+        for generation_id in expired:
+            del self.generations[generation_id]
+        # 개수 상한을 넘으면 끝난 생성부터 오래된 순으로 버립니다.
+        for generation_id in list(self.generations):
+            if len(self.generations) <= self.max_generations:
+                break
+            if self.generations[generation_id].done:
+                del self.generations[generation_id]
+
+    def start(self, user_id: str, source: AsyncIterator[str]) -> StreamGeneration:
+        self._evict()
+        generation = StreamGeneration(uuid4().hex, user_id)
+        generation.task = asyncio.create_task(generation.produce(source))
+        self.generations[generation.generation_id] = generation
+        logger.info(f"SSE 생성 {generation.generation_id} 시작 (user_id: {user_id})")
+        return generation
+
+    def get(self, generation_id: str, user_id: str) -> Optional[StreamGeneration]:
+        self._evict()
+        generation = self.generations.get(generation_id)
+        if generation is None or generation.user_id != user_id:
+            return None
+        return generation
+
+    def resume(
+        self, last_event_id: Optional[str], user_id: str
+    ) -> Optional[Tuple[StreamGeneration, int]]:
+        """Last-Event-ID에 해당하는 생성과 이어 받을 seq. 없거나 만료되었으면 None."""
+        parsed = parse_last_event_id(last_event_id)
+        if parsed is None:
+            return None
+        generation = self.get(parsed[0], user_id)
+        if generation is None:
+            logger.info(f"재연결 요청한 SSE 생성 {parsed[0]}이 없거나 만료되었습니다.")
+            return None
+        logger.info(f"SSE 생성 {generation.generation_id}을 seq {parsed[1]} 이후부터 재전송합니다.")
+        return generation, parsed[1]
@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+
+from core.admission import (
+    ADMISSION_WAIT,
+    AdmissionController,
+    AdmissionRejected,
+    RouteClass,
+    RouteClassLimiter,
+)
+
+
+def make_limiter(
+    max_concurrency=1,
+    max_per_user=1,
+    max_queue=10,
+    max_wait_seconds=5.0,
+    weights=None,
+    name="test",
+) -> RouteClassLimiter:
+    route_class = RouteClass(
+        name, ("/test",), max_concurrency, max_per_user, max_queue, max_wait_seconds
+    )
+    return RouteClassLimiter(route_class, weights or {})
+
+
+async def wait_queued(limiter: RouteClassLimiter, count: int) -> None:
+    for _ in range(100):
+        if limiter.queued == count:
+            return
+        await asyncio.sleep(0)
+    raise AssertionError(f"queued={limiter.queued}, expected {count}")
+
+
+async def wait_admitted(order: list, count: int) -> None:
+    for _ in range(100):
+        if len(order) == count:
+            return
+        await asyncio.sleep(0)
+    raise AssertionError(f"admitted={order}, expected {count}")
+
+
+@pytest.mark.asyncio
+async def test_acquire_without_waiting_when_capacity_is_free():
+    limiter = make_limiter(max_concurrency=2)
+
+    assert await limiter.acquire("a") == 0.0
+    assert limiter.in_flight == 1
+    limiter.release("a", 0.1)
+    assert limiter.in_flight == 0
+    assert limiter.stats()["admitted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queued_users_are_served_fairly():
+    limiter = make_limiter()
+    order = []
+
+    async def request(user_id):
+        await limiter.acquire(user_id)
+        order.append(user_id)
+
+    await limiter.acquire("holder")
+    tasks = []
+    # a가 먼저 두 건을 줄 세워도 b가 a의 두 번째 요청보다 먼저 들어가야 합니다.
+    for user_id in ("a", "a", "b"):
+        tasks.append(asyncio.create_task(request(user_id)))
+        await wait_queued(limiter, len(tasks))
+
+    limiter.release("holder", 0.1)
+    for count, expected in enumerate(("a", "b", "a"), start=1):
+        await wait_admitted(order, count)
+        assert order[-1] == expected
+        limiter.release(expected, 0.1)
+    await asyncio.gather(*tasks)
+    assert order == ["a", "b", "a"]
+    assert limiter.in_flight == 0
+    assert limiter.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_per_user_limit_lets_other_users_pass():
+    limiter = make_limiter(max_concurrency=2, max_per_user=1)
+
+    await limiter.acquire("a")
+    second = asyncio.create_task(limiter.acquire("a"))
+    await wait_queued(limiter, 1)
+
+    assert await limiter.acquire("b") == 0.0
+    assert not second.done()
+    limiter.release("a", 0.1)
+    await second
+    assert limiter.in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_user_weights_favor_heavier_user():
+    limiter = make_limiter(weights={"heavy": 2.0})
+    order = []
+
+    async def request(user_id):
+        await limiter.acquire(user_id)
+        order.append(user_id)
+        limiter.release(user_id, 0.1)
+
+    await limiter.acquire("holder")
+    tasks = []
+    for user_id in ("light", "light", "heavy", "heavy", "heavy"):
+        tasks.append(asyncio.create_task(request(user_id)))
+        await wait_queued(limiter, len(tasks))
+    limiter.release("holder", 0.1)
+    await asyncio.gather(*tasks)
+
+    # heavy는 한 번에 1/2씩만 가상 시간을 쓰므로 light 한 건마다 두 건씩 들어갑니다.
+    assert order == ["light", "heavy", "heavy", "light", "heavy"]
+
+
+@pytest.mark.asyncio
+async def test_wait_timeout_rejects_and_leaves_queue():
+    limiter = make_limiter(max_wait_seconds=0.05)
+    await limiter.acquire("a")
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        await limiter.acquire("b")
+
+    assert excinfo.value.reason == "timeout"
+    assert excinfo.value.retry_after >= 1
+    assert limiter.queued == 0
+    assert limiter.stats()["rejected"]["timeout"] == 1
+    # 떠난 대기자에게 자리가 넘어가지 않아야 합니다.
+    limiter.release("a", 0.1)
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    limiter = make_limiter(max_queue=0)
+    await limiter.acquire("a")
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        await limiter.acquire("b")
+
+    assert excinfo.value.reason == "queue_full"
+    assert limiter.stats()["rejected"]["queue_full"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_removed():
+    limiter = make_limiter()
+    await limiter.acquire("a")
+    waiter = asyncio.create_task(limiter.acquire("b"))
+    await wait_queued(limiter, 1)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert limiter.queued == 0
+    limiter.release("a", 0.1)
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_time_is_exported_per_route_class():
+    limiter = make_limiter(name="wait-metric")
+    await limiter.acquire("a")
+    waiter = asyncio.create_task(limiter.acquire("b"))
+    await wait_queued(limiter, 1)
+    await asyncio.sleep(0.02)
+    limiter.release("a", 0.1)
+    await waiter
+
+    lines = ADMISSION_WAIT.render()
+    assert 'admission_wait_seconds_count{class="wait-metric"} 2' in lines
+    assert 'admission_wait_seconds_bucket{class="wait-metric",le="0.005"} 1' in lines
+
+
+def test_classify_routes():
+    controller = AdmissionController()
+
+    assert controller.classify("/jobs/search").route_class.name == "jobs"
+    assert controller.classify("/projects_search_idea").route_class.name == "search"
+    assert controller.classify("/ideas_helper").route_class.name == "stream"
+    assert controller.classify("/health") is None
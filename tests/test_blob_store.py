@@ -0,0 +1,84 @@
+import os
+import time
+
+from agents.blob_store import BlobStore
+
+
+def age_all_files(directory, seconds=7200):
+    past = time.time() - seconds
+    for root, _, files in os.walk(directory):
+        for name in files:
+            os.utime(os.path.join(root, name), (past, past))
+
+
+def test_same_content_gets_same_id():
+    store = BlobStore()
+
+    assert store.put({"a": 1}) == store.put({"a": 1})
+    assert store.put("text") != store.put("other text")
+    assert len(store) == 3
+
+
+def test_memory_cache_evicts_least_recently_used():
+    store = BlobStore(cache_max_items=2)
+    a, b = store.put("a"), store.put("b")
+    store.get_text(a)  # a를 최근 사용으로 올립니다.
+
+    c = store.put("c")
+
+    assert store.get_text(b) is None
+    assert store.get_text(a) == "a"
+    assert store.get_text(c) == "c"
+    assert len(store) == 2
+
+
+def test_evicted_blob_is_reloaded_from_directory(tmp_path):
+    store = BlobStore(directory=str(tmp_path), cache_max_items=1)
+    first = store.put({"messages": ["첫 단계"]})
+    store.put({"messages": ["둘째 단계"]})
+
+    assert len(store) == 1
+    assert store.get_json(first) == {"messages": ["첫 단계"]}
+
+
+def test_gc_keeps_blobs_of_live_threads(tmp_path):
+    store = BlobStore(directory=str(tmp_path))
+    live = store.put("live transcript", thread_id="live-thread")
+    pruned = store.put("pruned transcript", thread_id="pruned-thread")
+    orphan = store.put("orphan transcript")
+    age_all_files(tmp_path)
+
+    result = store.collect_garbage(["live-thread"], grace_seconds=60)
+
+    assert result == {"deleted_blobs": 2, "deleted_threads": 1}
+    assert store.get_text(live) == "live transcript"
+    assert pruned not in store
+    assert orphan not in store
+
+
+def test_gc_spares_recent_files(tmp_path):
+    store = BlobStore(directory=str(tmp_path))
+    blob_id = store.put("아직 레지스트리에 없는 실행", thread_id="new-thread")
+
+    result = store.collect_garbage([], grace_seconds=3600)
+
+    assert result == {"deleted_blobs": 0, "deleted_threads": 0}
+    assert blob_id in store
+
+
+def test_rewriting_blob_renews_grace_period(tmp_path):
+    store = BlobStore(directory=str(tmp_path))
+    blob_id = store.put("shared")
+    age_all_files(tmp_path)
+
+    store.put("shared")
+
+    assert store.collect_garbage([], grace_seconds=60)["deleted_blobs"] == 0
+    assert blob_id in store
+
+
+def test_gc_without_directory_is_noop():
+    store = BlobStore()
+    store.put("memory only")
+
+    assert store.collect_garbage([]) == {"deleted_blobs": 0, "deleted_threads": 0}
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+
+from agents.budget import Budget, BudgetTracker
+
+
+@pytest.mark.parametrize(
+    "used, expected",
+    [(2, None), (3, "max_tool_calls")],
+)
+def test_tool_calls_stop_only_above_limit(used, expected):
+    # 도구 호출은 요청 시점에 세므로 한도와 같은 수는 아직 허용합니다.
+    assert Budget(max_tool_calls=2).exceeded({"tool_calls": used}) == expected
+
+
+@pytest.mark.parametrize(
+    "key, used, expected",
+    [
+        ("llm_iterations", 1, None),
+        ("llm_iterations", 2, "max_llm_iterations"),
+        ("input_tokens", 999, None),
+        ("input_tokens", 1000, "max_input_tokens"),
+        ("output_tokens", 1000, "max_output_tokens"),
+    ],
+)
+def test_other_limits_stop_when_reached(key, used, expected):
+    budget = Budget(max_llm_iterations=2, max_input_tokens=1000, max_output_tokens=1000)
+
+    assert budget.exceeded({key: used}) == expected
+
+
+def test_zero_limit_is_unlimited():
+    assert Budget().exceeded({"tool_calls": 10**6, "llm_iterations": 10**6}) is None
+
+
+def ai_message(tool_calls=0, input_tokens=0, output_tokens=0):
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "search", "args": {}, "id": f"call-{i}"} for i in range(tool_calls)
+        ],
+        usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        },
+    )
+
+
+def test_tracker_counts_requested_tool_calls_once():
+    tracker = BudgetTracker(step_budget=Budget(max_tool_calls=2), run_budget=Budget())
+    messages = [ai_message(tool_calls=2, input_tokens=100, output_tokens=10)]
+
+    tracker.observe(messages)
+    messages.append(ToolMessage(content="결과", tool_call_id="call-0"))
+    tracker.observe(messages)
+
+    assert tracker.usage == {
+        "tool_calls": 2,
+        "llm_iterations": 1,
+        "input_tokens": 100,
+        "output_tokens": 10,
+    }
+    assert tracker.exhausted() is None
+
+    messages.append(ai_message(tool_calls=1))
+    tracker.observe(messages)
+    assert tracker.exhausted() == "step:max_tool_calls"
+
+
+def test_tracker_adds_previous_steps_to_run_budget():
+    tracker = BudgetTracker(
+        step_budget=Budget(max_llm_iterations=5),
+        run_budget=Budget(max_llm_iterations=5),
+        run_usage={"llm_iterations": 4},
+    )
+
+    assert tracker.exhausted() is None
+    tracker.observe([ai_message()])
+
+    assert tracker.exhausted() == "run:max_llm_iterations"
+
+
+def test_step_limit_is_reported_before_run_limit():
+    tracker = BudgetTracker(
+        step_budget=Budget(max_llm_iterations=1),
+        run_budget=Budget(max_llm_iterations=1),
+    )
+    tracker.observe([ai_message()])
+
+    assert tracker.exhausted() == "step:max_llm_iterations"
+
+
+def test_stop_event_ends_run():
+    stop_event = asyncio.Event()
+    tracker = BudgetTracker(
+        step_budget=Budget(), run_budget=Budget(), stop_event=stop_event
+    )
+
+    assert tracker.exhausted() is None
+    stop_event.set()
+    assert tracker.exhausted() == "run:cancelled"
+
+
+def test_overrides_ignore_unknown_fields():
+    budget = Budget(max_tool_calls=5).with_overrides(
+        {"max_tool_calls": 1, "unknown": 3}
+    )
+
+    assert budget.max_tool_calls == 1
@@ -0,0 +1,230 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+
+from core.config import settings
+from core.disconnect import run_until_disconnect
+from core.idempotency import IdempotencyStore
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    store = IdempotencyStore(
+        db_path=str(tmp_path / "idempotency.db"),
+        ttl_seconds=60,
+        lock_timeout_seconds=60,
+    )
+    yield store
+    await store.close()
+
+
+def counting_work(result):
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return result
+
+    return work, calls
+
+
+@pytest.mark.asyncio
+async def test_completed_key_replays_stored_response(store):
+    work, calls = counting_work({"id": 1, "text": "결과"})
+
+    first = await store.run("key", "fp", work)
+    second = await store.run("key", "fp", work)
+
+    assert first == second == {"id": 1, "text": "결과"}
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_execution(store):
+    work, calls = counting_work({"id": 2})
+
+    results = await asyncio.gather(*(store.run("key", "fp", work) for _ in range(5)))
+
+    assert results == [{"id": 2}] * 5
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_reused_key_with_different_body_is_rejected(store):
+    work, _ = counting_work({"id": 3})
+    await store.run("key", "fp", work)
+
+    with pytest.raises(HTTPException) as excinfo:
+        await store.run("key", "other-fp", work)
+
+    assert excinfo.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_failed_work_releases_key(store):
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await store.run("key", "fp", failing)
+
+    work, calls = counting_work({"id": 4})
+    assert await store.run("key", "fp", work) == {"id": 4}
+    assert len(calls) == 1
+
+
+class FakeRequest:
+    """run_until_disconnect가 보는 만큼만 흉내 낸 요청."""
+
+    def __init__(self):
+        self.disconnected = False
+        self.url = SimpleNamespace(path="/projects_search_idea")
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def gated_work(result):
+    """release가 set될 때까지 끝나지 않는 작업."""
+    release = asyncio.Event()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await release.wait()
+        return result
+
+    return work, calls, release
+
+
+@pytest.mark.asyncio
+async def test_retry_gets_result_after_first_caller_disconnects(store):
+    work, calls, release = gated_work({"id": "shared"})
+    first_request, retry_request = FakeRequest(), FakeRequest()
+
+    first = asyncio.create_task(
+        run_until_disconnect(
+            first_request, store.run("key", "fp", work), interval=0.01
+        )
+    )
+    await asyncio.sleep(0.05)
+    retry = asyncio.create_task(
+        run_until_disconnect(
+            retry_request, store.run("key", "fp", work), interval=0.01
+        )
+    )
+    await asyncio.sleep(0.05)
+
+    # 로드밸런서 타임아웃으로 첫 요청의 연결이 끊깁니다.
+    first_request.disconnected = True
+    with pytest.raises(HTTPException) as excinfo:
+        await first
+    assert excinfo.value.status_code == 499
+
+    release.set()
+    assert await asyncio.wait_for(retry, 5) == {"id": "shared"}
+    assert len(calls) == 1
+    # 결과는 저장되어 이후 재시도에서도 재생됩니다.
+    assert await store.run("key", "fp", work) == {"id": "shared"}
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_work_is_cancelled_when_last_waiter_leaves(store):
+    work, calls, _ = gated_work({"id": "lost"})
+    waiter = asyncio.create_task(store.run("key", "fp", work))
+    await asyncio.sleep(0.05)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await asyncio.sleep(0.05)
+
+    # 취소된 실행은 키를 남기지 않으므로 재시도가 다시 실행합니다.
+    retry_work, retry_calls = counting_work({"id": "retried"})
+    assert await store.run("key", "fp", retry_work) == {"id": "retried"}
+    assert len(calls) == 1
+    assert len(retry_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_on_abandon_lets_work_finish_and_store_result(store):
+    stop = asyncio.Event()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await stop.wait()
+        return {"id": "partial"}
+
+    waiter = asyncio.create_task(store.run("key", "fp", work, on_abandon=stop.set))
+    await asyncio.sleep(0.05)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert stop.is_set()
+
+    replay, replay_calls = counting_work({"id": "unused"})
+    assert await asyncio.wait_for(store.run("key", "fp", replay), 5) == {
+        "id": "partial"
+    }
+    assert len(calls) == 1
+    assert replay_calls == []
+
+
+@pytest.mark.asyncio
+async def test_waits_for_row_claimed_by_another_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_poll_interval_seconds", 0.01)
+    db_path = str(tmp_path / "idempotency.db")
+    owner = IdempotencyStore(db_path=db_path, ttl_seconds=60, lock_timeout_seconds=60)
+    other = IdempotencyStore(db_path=db_path, ttl_seconds=60, lock_timeout_seconds=60)
+    try:
+        # 다른 워커 프로세스가 키를 선점한 상태를 만듭니다.
+        assert await owner._claim("key", "fp") is None
+        work, calls = counting_work({"id": "other"})
+        waiting = asyncio.create_task(other.run("key", "fp", work))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        owner_work, _ = counting_work({"id": "owner"})
+        await owner._execute("key", owner_work)
+
+        assert await asyncio.wait_for(waiting, 5) == {"id": "owner"}
+        assert calls == []
+    finally:
+        await owner.close()
+        await other.close()
+
+
+@pytest.mark.asyncio
+async def test_stale_claim_is_taken_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_poll_interval_seconds", 0.01)
+    db_path = str(tmp_path / "idempotency.db")
+    crashed = IdempotencyStore(db_path=db_path, ttl_seconds=60, lock_timeout_seconds=60)
+    survivor = IdempotencyStore(
+        db_path=db_path, ttl_seconds=60, lock_timeout_seconds=0.05
+    )
+    try:
+        # 선점한 프로세스가 완료하지 못하고 죽은 경우입니다.
+        assert await crashed._claim("key", "fp") is None
+        await asyncio.sleep(0.1)
+
+        work, calls = counting_work({"id": "retried"})
+        started = time.monotonic()
+        assert await survivor.run("key", "fp", work) == {"id": "retried"}
+        assert len(calls) == 1
+        assert time.monotonic() - started < 5
+
+        # 이어받은 실행의 결과는 다른 프로세스에서도 재생됩니다.
+        replay, replay_calls = counting_work({"id": "unused"})
+        assert await crashed.run("key", "fp", replay) == {"id": "retried"}
+        assert replay_calls == []
+    finally:
+        await crashed.close()
+        await survivor.close()
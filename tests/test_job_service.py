@@ -0,0 +1,43 @@
+import pytest
+from fastapi import HTTPException
+
+from services.job_service import Job, JobService
+
+
+def make_service() -> JobService:
+    # 워커 풀은 submit에서만 시작하므로, 작업을 레지스트리에 직접 넣어 둡니다.
+    service = JobService(worker_processes=1)
+    service.jobs["job-1"] = Job(
+        job_id="job-1", kind="search_ideas", user_id="owner", payload={}
+    )
+    return service
+
+
+def test_owner_can_read_job():
+    service = make_service()
+
+    assert service.get("job-1", "owner").to_dict()["user_id"] == "owner"
+
+
+@pytest.mark.parametrize("job_id, user_id", [("job-1", "other"), ("missing", "owner")])
+def test_other_user_and_unknown_job_are_both_not_found(job_id, user_id):
+    service = make_service()
+
+    with pytest.raises(HTTPException) as excinfo:
+        service.get(job_id, user_id)
+
+    assert excinfo.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_other_user_cannot_cancel_job():
+    service = make_service()
+
+    with pytest.raises(HTTPException) as excinfo:
+        await service.cancel("job-1", "other")
+
+    assert excinfo.value.status_code == 404
+    assert service.jobs["job-1"].status == "queued"
+
+    job = await service.cancel("job-1", "owner")
+    assert job.status == "cancelled"
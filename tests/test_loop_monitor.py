@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from core.loop_monitor import (
+    EventLoopBlockedError,
+    LoopBlockGuardMiddleware,
+    LoopLagMonitor,
+)
+
+
+async def blocking(request):
+    time.sleep(0.3)
+    return PlainTextResponse("blocked")
+
+
+async def cooperative(request):
+    await asyncio.sleep(0.3)
+    return PlainTextResponse("ok")
+
+
+async def start_monitor() -> LoopLagMonitor:
+    monitor = LoopLagMonitor(interval_ms=10, threshold_ms=50, fail_ms=100)
+    monitor.start()
+    # 앱 시작 시처럼 틱이 돌고 있는 상태에서 요청을 보냅니다.
+    await asyncio.sleep(0.05)
+    return monitor
+
+
+def make_app(monitor: LoopLagMonitor):
+    app = Starlette(
+        routes=[Route("/blocking", blocking), Route("/cooperative", cooperative)]
+    )
+    return LoopBlockGuardMiddleware(app, monitor=monitor)
+
+
+@pytest.mark.asyncio
+async def test_handler_calling_time_sleep_fails_request():
+    monitor = await start_monitor()
+    try:
+        transport = httpx.ASGITransport(app=make_app(monitor))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with pytest.raises(EventLoopBlockedError) as excinfo:
+                await client.get("/blocking")
+    finally:
+        await monitor.stop()
+
+    message = str(excinfo.value)
+    assert "GET /blocking" in message
+    # watchdog가 잡은 루프 스레드 스택에 막은 호출이 보여야 합니다.
+    assert "time.sleep" in message
+    assert monitor.stats()["blocking_events"]
+
+
+@pytest.mark.asyncio
+async def test_awaiting_handler_passes():
+    monitor = await start_monitor()
+    try:
+        transport = httpx.ASGITransport(app=make_app(monitor))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/cooperative")
+    finally:
+        await monitor.stop()
+
+    assert response.status_code == 200
+    assert response.text == "ok"
+    assert monitor.violations_since(0) == []
+
+
+@pytest.mark.asyncio
+async def test_guard_is_inactive_without_running_monitor():
+    monitor = LoopLagMonitor(interval_ms=10, threshold_ms=50, fail_ms=100)
+    transport = httpx.ASGITransport(app=make_app(monitor))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/blocking")
+
+    assert response.status_code == 200
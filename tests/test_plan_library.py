@@ -0,0 +1,81 @@
+from agents.plan_library import PlanLibrary, request_signature
+
+SOURCE_REQUEST = "'Hey Jude'와 비슷한 노래를 찾아줘"
+NEW_REQUEST = "'Let It Be'와 비슷한 노래를 찾아줘"
+PLAN_STEPS = [
+    {
+        "plan_sequence": 1,
+        "task": "Hey Jude의 분위기와 장르 조사",
+        "action": "search Hey Jude genre and mood",
+    },
+    {
+        "plan_sequence": 2,
+        "task": "Hey Jude와 비슷한 곡 목록 정리",
+        "action": "compile songs similar to Hey Jude",
+    },
+]
+
+
+def make_library(path=None):
+    library = PlanLibrary(path)
+    library.record_success(SOURCE_REQUEST, PLAN_STEPS, scope="user-1")
+    return library
+
+
+def test_signature_uses_whole_words():
+    assert request_signature(SOURCE_REQUEST) == "similar:music"
+    # "구글"의 "글", "곡선"의 "곡"은 미디어 키워드가 아닙니다.
+    assert request_signature("구글에서 곡선 디자인 찾아줘") is None
+
+
+def test_same_user_reuses_template_with_new_subject():
+    library = make_library()
+
+    match = library.match(NEW_REQUEST, scope="user-1")
+
+    assert match is not None
+    template, plan_steps = match
+    assert template.scope == "user-1"
+    assert [step["task"] for step in plan_steps] == [
+        "Let It Be의 분위기와 장르 조사",
+        "Let It Be와 비슷한 곡 목록 정리",
+    ]
+    assert all("Hey Jude" not in step["action"] for step in plan_steps)
+    assert all(NEW_REQUEST in step["action"] for step in plan_steps)
+    assert all(step["status"] == "not_started" for step in plan_steps)
+
+
+def test_other_user_does_not_get_template():
+    library = make_library()
+
+    assert library.match(NEW_REQUEST, scope="user-2") is None
+    assert library.match(NEW_REQUEST) is None
+    assert library.stats()["misses"] == 2
+
+
+def test_request_without_subject_is_not_matched_or_stored():
+    library = make_library()
+
+    assert library.match("비슷한 노래를 찾아줘", scope="user-1") is None
+    library.record_success("비슷한 노래를 찾아줘", PLAN_STEPS, scope="user-1")
+    assert sum(library.stats()["signatures"].values()) == 1
+
+
+def test_failing_template_is_not_reused():
+    library = make_library()
+    template, _ = library.match(NEW_REQUEST, scope="user-1")
+
+    library.record_outcome(template.template_id, succeeded=False)
+
+    assert library.match(NEW_REQUEST, scope="user-1") is None
+
+
+def test_scope_survives_reload(tmp_path):
+    path = str(tmp_path / "plan_library.json")
+    make_library(path)
+
+    reloaded = PlanLibrary(path)
+
+    assert reloaded.match(NEW_REQUEST, scope="user-2") is None
+    assert reloaded.match(NEW_REQUEST, scope="user-1") is not None
+    assert reloaded.stats()["scopes"] == 1
@@ -0,0 +1,45 @@
+from agents.search_agent import merge_plan_steps
+
+
+def make_steps():
+    return [
+        {"plan_sequence": 1, "task": "검색", "status": "not_started", "result": ""},
+        {"plan_sequence": 2, "task": "정리", "status": "not_started", "result": ""},
+    ]
+
+
+def test_none_keeps_current_steps():
+    steps = make_steps()
+
+    assert merge_plan_steps(steps, None) is steps
+
+
+def test_list_replaces_whole_plan():
+    new_plan = [{"plan_sequence": 1, "task": "새 계획"}]
+
+    assert merge_plan_steps(make_steps(), new_plan) is new_plan
+
+
+def test_index_patch_updates_only_that_step():
+    steps = make_steps()
+
+    merged = merge_plan_steps(steps, {1: {"status": "completed", "result": "완료"}})
+
+    assert merged[1] == {
+        "plan_sequence": 2,
+        "task": "정리",
+        "status": "completed",
+        "result": "완료",
+    }
+    # 다른 단계는 복사하지 않고 그대로 공유합니다.
+    assert merged[0] is steps[0]
+    # 이전 상태는 바뀌지 않습니다.
+    assert steps[1]["status"] == "not_started"
+    assert merged is not steps
+
+
+def test_string_index_from_serialized_checkpoint():
+    merged = merge_plan_steps(make_steps(), {"0": {"status": "in_progress"}})
+
+    assert merged[0]["status"] == "in_progress"
+    assert merged[1]["status"] == "not_started"
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from agents.plan_stream import IncrementalPlanParser
+
+STEPS = [
+    {"step": 0, "action": "search", "task": "곡 \"Hey Jude\" {가사} 찾기 [1]"},
+    {"step": 1, "action": "scrape", "task": "역슬래시 \\ 와 ] } 포함", "urls": ["a", "b"]},
+    {"step": 2, "action": "summarize", "task": "정리", "meta": {"nested": [1, {"x": 2}]}},
+]
+PLAN = json.dumps(STEPS, ensure_ascii=False, indent=2)
+RESPONSE = f"[참고] 아래는 계획입니다 [1].\n```json\n{PLAN}\n```\n끝 [2]"
+
+
+def feed_chunks(chunks):
+    parser = IncrementalPlanParser()
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(chunk))
+    return parser, completed
+
+
+def test_whole_response_in_one_chunk():
+    parser, completed = feed_chunks([RESPONSE])
+
+    assert completed == STEPS
+    assert parser.entries == STEPS
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16])
+def test_any_chunk_size_gives_same_steps(size):
+    chunks = [RESPONSE[i : i + size] for i in range(0, len(RESPONSE), size)]
+
+    _, completed = feed_chunks(chunks)
+
+    assert completed == STEPS
+
+
+def test_each_step_is_emitted_when_its_object_closes():
+    parser = IncrementalPlanParser()
+    # 들여쓰기된 첫 객체의 닫는 괄호 (문자열 안의 '}'는 건너뜁니다).
+    first_end = PLAN.index("\n  }") + len("\n  }")
+
+    assert parser.feed(RESPONSE[: RESPONSE.index(PLAN) + first_end - 1]) == []
+    emitted = parser.feed(PLAN[first_end - 1])
+
+    assert emitted == [STEPS[0]]
+
+
+def test_bracket_at_chunk_end_waits_for_next_chunk():
+    parser = IncrementalPlanParser()
+
+    assert parser.feed("설명 [") == []
+    assert parser.feed("  ") == []
+    assert parser.feed('{"step": 0}]') == [{"step": 0}]
+
+
+def test_brackets_in_prose_are_not_plan_start():
+    parser, completed = feed_chunks(["[참고] ", "[1] 설명 ", '[{"step": 0}]'])
+
+    assert completed == [{"step": 0}]
+
+
+def test_invalid_object_is_skipped():
+    _, completed = feed_chunks(['[{"step": 0, }, {"step": 1}]'])
+
+    assert completed == [{"step": 1}]
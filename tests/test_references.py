@@ -0,0 +1,117 @@
+from agents.references import (
+    REFERENCE_NOTES_MARKER,
+    assemble_references,
+    index_references,
+    split_reference_notes,
+)
+
+
+def candidate(url, title="", snippet="", ref_type="webpage"):
+    return {"url": url, "title": title or url, "snippet": snippet, "type": ref_type}
+
+
+def test_new_candidates_are_numbered_in_order():
+    updates = index_references(
+        None,
+        [candidate("https://a.com/1", "A"), candidate("https://b.com/2", "B")],
+        step_index=0,
+    )
+
+    assert list(updates) == ["R1", "R2"]
+    assert updates["R1"] == {
+        "id": "R1",
+        "url": "https://a.com/1",
+        "title": "A",
+        "snippet": "",
+        "type": "webpage",
+        "steps": [0],
+    }
+
+
+def test_same_url_variants_share_one_id():
+    existing = {
+        "R1": {
+            "id": "R1",
+            **candidate("https://example.com/song", "원래 제목", "원래 요약"),
+            "steps": [0],
+        }
+    }
+
+    updates = index_references(
+        existing,
+        [
+            candidate("https://www.Example.com/song/?utm_source=x#top", "새 제목"),
+            candidate("https://example.com/song", "또 다른 제목"),
+            candidate("https://other.com/page", "다른 자료"),
+        ],
+        step_index=2,
+    )
+
+    assert sorted(updates) == ["R1", "R2"]
+    # 먼저 본 제목과 요약을 유지합니다.
+    assert updates["R1"]["title"] == "원래 제목"
+    assert updates["R1"]["snippet"] == "원래 요약"
+    assert updates["R1"]["steps"] == [2]
+    # 번호는 기존 참고 자료 다음부터 이어집니다.
+    assert updates["R2"]["url"] == "https://other.com/page"
+
+
+def test_missing_title_and_snippet_are_filled_from_later_candidate():
+    existing = {
+        "R1": {"id": "R1", **candidate("https://a.com"), "steps": [0]},
+    }
+
+    updates = index_references(
+        existing, [candidate("https://a.com", "제목", "요약")], step_index=1
+    )
+
+    assert updates["R1"]["title"] == "제목"
+    assert updates["R1"]["snippet"] == "요약"
+
+
+def test_split_reference_notes():
+    text = (
+        "요약 본문 [R1] 그리고 [R2].\n\n"
+        f"{REFERENCE_NOTES_MARKER}\n"
+        "[R1] 같은 분위기의 곡입니다.\n"
+        "- [R2]: 가사 출처입니다.\n"
+        "[R1] 중복된 노트\n"
+    )
+
+    body, notes = split_reference_notes(text)
+
+    assert body == "요약 본문 [R1] 그리고 [R2]."
+    assert notes == {"R1": "같은 분위기의 곡입니다.", "R2": "가사 출처입니다."}
+
+
+def test_split_without_marker_keeps_text():
+    assert split_reference_notes("본문만 있음 [R1]") == ("본문만 있음 [R1]", {})
+    assert split_reference_notes(None) == ("", {})
+
+
+def test_assemble_uses_notes_then_snippet():
+    references = {
+        "R1": {"id": "R1", **candidate("https://a.com", "A", "a 요약"), "steps": [0]},
+        "R2": {"id": "R2", **candidate("https://b.com", "B", "b 요약"), "steps": [1]},
+    }
+
+    assembled = assemble_references(
+        references, ["R2", "R9", "R1"], notes={"R2": "B가 관련된 이유"}
+    )
+
+    assert assembled == [
+        {
+            "id": "R2",
+            "title": "B",
+            "description": "B가 관련된 이유",
+            "url": "https://b.com",
+            "type": "webpage",
+        },
+        {
+            "id": "R1",
+            "title": "A",
+            "description": "a 요약",
+            "url": "https://a.com",
+            "type": "webpage",
+        },
+    ]
@@ -0,0 +1,83 @@
+from agents.result_cache import SemanticResultCache, cache_scope_key
+
+PROMPT = "'Hey Jude'와 비슷한 분위기의 노래를 찾아줘"
+
+
+def make_cache(**kwargs):
+    return SemanticResultCache(
+        threshold=kwargs.get("threshold", 0.9),
+        ttl_seconds=kwargs.get("ttl_seconds", 60),
+        max_entries=kwargs.get("max_entries", 10),
+    )
+
+
+def test_scope_keys():
+    assert cache_scope_key("user", "u1", "p1") == "user:u1"
+    assert cache_scope_key("project", "u1", "p1") == "project:u1:p1"
+    # 다른 사용자의 같은 project_id와 섞이지 않습니다.
+    assert cache_scope_key("project", "u2", "p1") != cache_scope_key(
+        "project", "u1", "p1"
+    )
+
+
+def test_hit_within_same_scope():
+    cache = make_cache()
+    scope = cache_scope_key("project", "u1", "p1")
+    cache.store(PROMPT, scope, {"final_summary": "결과"}, ai_result_id="r1", user_id="u1")
+
+    hit = cache.lookup(PROMPT, scope)
+
+    assert hit is not None
+    entry, similarity = hit
+    assert entry.result == {"final_summary": "결과"}
+    assert entry.ai_result_id == "r1"
+    assert similarity > 0.99
+
+
+def test_other_users_result_is_not_returned():
+    cache = make_cache()
+    cache.store(PROMPT, cache_scope_key("project", "u1", "p1"), {"final_summary": "u1"})
+
+    assert cache.lookup(PROMPT, cache_scope_key("project", "u2", "p1")) is None
+    assert cache.lookup(PROMPT, cache_scope_key("user", "u1", "p1")) is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_closer_entry_in_other_scope_does_not_hide_own_entry():
+    cache = make_cache(threshold=0.5)
+    own_scope = cache_scope_key("user", "u1", "p1")
+    cache.store(PROMPT + " 부탁해", own_scope, {"final_summary": "own"})
+    cache.store(PROMPT, cache_scope_key("user", "u2", "p1"), {"final_summary": "other"})
+
+    hit = cache.lookup(PROMPT, own_scope)
+
+    assert hit is not None
+    assert hit[0].result == {"final_summary": "own"}
+
+
+def test_dissimilar_prompt_misses():
+    cache = make_cache()
+    scope = cache_scope_key("user", "u1", "p1")
+    cache.store(PROMPT, scope, {"final_summary": "결과"})
+
+    assert cache.lookup("클래식 피아노 협주곡 추천", scope) is None
+
+
+def test_expired_entries_are_evicted():
+    cache = make_cache(ttl_seconds=60)
+    scope = cache_scope_key("user", "u1", "p1")
+    cache.store(PROMPT, scope, {"final_summary": "결과"})
+    cache._entries[0].created_at -= 120
+
+    assert cache.lookup(PROMPT, scope) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_oldest_entries_are_dropped_over_capacity():
+    cache = make_cache(max_entries=2)
+    scope = cache_scope_key("user", "u1", "p1")
+    for index, prompt in enumerate(["첫 번째 요청", "두 번째 요청", "세 번째 요청"]):
+        cache.store(prompt, scope, {"final_summary": str(index)})
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("첫 번째 요청", scope, threshold=0.99) is None
@@ -0,0 +1,57 @@
+import pytest
+
+from agents.tool_distill import distill_text, estimate_tokens, truncate_to_tokens
+
+LONG_TEXT = "\n\n".join(
+    f"Paragraph {i}: general filler sentence number {i} about unrelated topics."
+    for i in range(200)
+)
+
+
+@pytest.mark.parametrize("max_tokens", [0, -1, -100])
+def test_non_positive_cap_returns_empty_text(max_tokens):
+    assert truncate_to_tokens("some text " * 100, max_tokens) == ""
+
+
+@pytest.mark.parametrize("max_tokens", [1, 5, 50, 500])
+def test_truncate_respects_cap(max_tokens):
+    text = "가나다라마바사 abcdefg " * 500
+
+    truncated = truncate_to_tokens(text, max_tokens)
+
+    assert estimate_tokens(truncated) <= max_tokens
+    assert text.startswith(truncated)
+
+
+def test_text_within_cap_is_unchanged():
+    assert truncate_to_tokens("short", 100) == "short"
+
+
+def test_distill_caps_long_output():
+    distilled = distill_text(LONG_TEXT, "filler", max_tokens=100, chunk_chars=300)
+
+    assert estimate_tokens(distilled) <= 100
+    assert distilled
+
+
+def test_distill_keeps_chunk_relevant_to_query():
+    text = LONG_TEXT.replace(
+        "Paragraph 150: general filler sentence number 150 about unrelated topics.",
+        "Bohemian Rhapsody lyrics were written by Freddie Mercury in 1975.",
+    )
+
+    distilled = distill_text(
+        text, "Bohemian Rhapsody lyrics Freddie Mercury", max_tokens=60, chunk_chars=200
+    )
+
+    assert "Bohemian Rhapsody" in distilled
+    assert estimate_tokens(distilled) <= 60
+
+
+def test_short_html_is_converted_without_cap():
+    html = "<html><body><nav>menu</nav><p>본문 내용입니다.</p></body></html>"
+
+    distilled = distill_text(html, "본문", max_tokens=100)
+
+    assert "본문 내용입니다." in distilled
+    assert "menu" not in distilled